@@ -0,0 +1,93 @@
+# coding=utf-8
+"""
+Throughput of demultiplexing ``logs``/``attach`` streams: docker-py's
+``frames_iter`` against :func:`dce.utils.demux.demux_chunks` and
+:func:`dce.utils.demux.demux_raw`.
+
+    $ python -m benchmarks.demux [megabytes] [line size]
+"""
+from __future__ import print_function
+
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+
+from docker.utils.socket import frames_iter
+
+from dce.consts import DEFAULT_STREAM_CHUNK_SIZE
+from dce.utils.demux import demux_chunks, demux_raw
+
+
+def make_stream(megabytes, line_size):
+    rnd = random.Random(42)
+    frames = []
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        n = max(1, int(rnd.expovariate(1.0 / line_size)))
+        frames.append(struct.pack('>BxxxL', rnd.choice((1, 2)), n) + b'x' * n)
+        size += n + 8
+    return b''.join(frames)
+
+
+class SocketReader(object):
+    def __init__(self, sock):
+        self.readinto = sock.recv_into
+
+
+def connected(data):
+    # every reader gets the stream from a socket, as from the docker daemon
+    reader, writer = socket.socketpair()
+
+    def write():
+        writer.sendall(data)
+        writer.close()
+
+    thread = threading.Thread(target=write)
+    thread.daemon = True
+    thread.start()
+    return reader
+
+
+def consume(frames):
+    total = 0
+    for _, payload in frames:
+        total += len(payload)
+    return total
+
+
+def chunks(sock, size=DEFAULT_STREAM_CHUNK_SIZE):
+    return iter(lambda: sock.recv(size), b'')
+
+
+def timed(fn, data):
+    sock = connected(data)
+    start = time.time()
+    try:
+        fn(sock)
+    finally:
+        sock.close()
+    return time.time() - start
+
+
+def main(megabytes=64, line_size=120, repeat=3):
+    data = make_stream(megabytes, line_size)
+    mb = len(data) / 1024.0 / 1024
+    cases = (
+        # frames_iter yields bare payloads, it drops the stream type
+        ('docker frames_iter', lambda sock: consume((None, p) for p in frames_iter(sock))),
+        ('demux_chunks', lambda sock: consume(demux_chunks(chunks(sock)))),
+        ('demux_raw', lambda sock: consume(demux_raw(SocketReader(sock)))),
+    )
+    results = {}
+    for name, fn in cases:
+        best = min(timed(fn, data) for _ in range(repeat))
+        results[name] = best
+        print('%-20s %8.1f ms  %8.1f MB/s' % (name, best * 1000, mb / best))
+    return results
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
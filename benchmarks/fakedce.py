@@ -0,0 +1,176 @@
+# coding=utf-8
+"""
+In-process fake DCE controller serving ``/{dce,api}/version``, ``/info``,
+``/ping`` and the ``/{dce,api}/nodes/<addr>/docker/...`` node proxy.
+
+    server = FakeDCE(latency=0.005, services=10000).start()
+    client = BaseDCEAPIClient(server.base_url, discovery_cache=None)
+    ...
+    server.stop()
+"""
+import json
+import re
+import threading
+import time
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib_parse import urlsplit
+
+from .payloads import make_container
+from .payloads import make_node
+from .payloads import make_service
+from .payloads import make_task
+
+DCE_VERSION = '2.10.0'
+DOCKER_API_VERSION = '1.30'
+
+_CONTROLLER = re.compile(r'^/(dce|api)(/.*)$')
+_NODE_PROXY = re.compile(r'^/nodes/([^/]+)/docker(/.*)$')
+_DOCKER_VERSION = re.compile(r'^/v[0-9.]+(/.*)$')
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes, don't let them wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake.requests += 1
+        with fake.slots:
+            if fake.latency:
+                time.sleep(fake.latency)
+            status, body = fake.route(urlsplit(self.path).path)
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain' if body == b'OK' else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+class FakeDCE(object):
+    """
+    :param latency: seconds every response is delayed by
+    :param services: number of services, tasks and containers per node listed
+    :param nodes: number of nodes, reachable through the node proxy as ``10.0.0.<n>``
+    :param legacy: serve the controller API under ``/api`` only, like DCE < 2.7
+    :param info_padding: extra bytes in the ``/info`` payloads
+    :param max_concurrency: number of requests handled at the same time, the others queue
+    """
+
+    def __init__(self, latency=0, services=100, nodes=8, containers=20, legacy=False, info_padding=0,
+                 max_concurrency=None):
+        self.latency = latency
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else _Unbounded()
+        self.legacy = legacy
+        self.requests = 0
+        self.nodes = [make_node(i) for i in range(nodes)]
+        padding = 'x' * info_padding
+        self._bodies = {
+            'version': _encode({'DCEVersion': DCE_VERSION, 'ApiVersion': DOCKER_API_VERSION}),
+            'info': _encode({'Name': 'dce-controller', 'ClusterUuid': 'fake-cluster', 'VirtTech': 'docker',
+                             'Nodes': len(self.nodes), 'Padding': padding}),
+            'docker_version': _encode({'ApiVersion': DOCKER_API_VERSION, 'Version': '17.06.2-ee'}),
+            'services': _encode([make_service(i) for i in range(services)]),
+            'tasks': _encode([make_task(i) for i in range(services)]),
+            'nodes': _encode(self.nodes),
+            'containers': _encode([make_container(i) for i in range(containers)]),
+        }
+        self._node_info = dict(
+            (n['Status']['Addr'], _encode({'Name': n['Description']['Hostname'], 'Padding': padding}))
+            for n in self.nodes
+        )
+        self._server = None
+        self._thread = None
+
+    @property
+    def node_addrs(self):
+        return sorted(self._node_info)
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+    def node_url(self, addr):
+        return '%s/%s/nodes/%s/docker' % (self.base_url, 'api' if self.legacy else 'dce', addr)
+
+    def start(self):
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-dce')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def route(self, path):
+        m = _CONTROLLER.match(path)
+        if not m or (self.legacy and m.group(1) == 'dce'):
+            return _not_found(path)
+        path = m.group(2)
+        m = _NODE_PROXY.match(path)
+        if m:
+            return self._docker(m.group(1), m.group(2))
+        if path == '/version':
+            return 200, self._bodies['version']
+        if path == '/info':
+            return 200, self._bodies['info']
+        if path == '/ping':
+            return 200, b'OK'
+        return _not_found(path)
+
+    def _docker(self, addr, path):
+        if addr not in self._node_info:
+            return _not_found(addr)
+        m = _DOCKER_VERSION.match(path)
+        if m:
+            path = m.group(1)
+        if path == '/_ping':
+            return 200, b'OK'
+        if path == '/version':
+            return 200, self._bodies['docker_version']
+        if path == '/info':
+            return 200, self._node_info[addr]
+        if path in ('/services', '/tasks', '/nodes'):
+            return 200, self._bodies[path[1:]]
+        if path == '/containers/json':
+            return 200, self._bodies['containers']
+        return _not_found(path)
+
+
+class _Unbounded(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def _encode(obj):
+    return json.dumps(obj).encode('utf-8')
+
+
+def _not_found(what):
+    return 404, _encode({'message': 'page not found: %s' % what})
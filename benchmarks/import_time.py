@@ -0,0 +1,45 @@
+# coding=utf-8
+"""
+Wall time of ``import dce`` in fresh interpreters, with and without docker-py.
+
+    $ python -m benchmarks.import_time [repeat]
+"""
+from __future__ import print_function
+
+import json
+import subprocess
+import sys
+
+STATEMENTS = (
+    ('import dce', 'import dce'),
+    ('dce.DCEAPIClient', 'import dce; dce.DCEAPIClient'),
+    ('dce.DCEDockerClient', 'import dce; dce.DCEDockerClient'),
+)
+
+SCRIPT = '''
+import json, sys, time
+start = time.time()
+{0}
+print(json.dumps({{'seconds': time.time() - start, 'modules': len(sys.modules),
+                  'docker': 'docker' in sys.modules}}))
+'''
+
+
+def _run(statement):
+    out = subprocess.check_output([sys.executable, '-c', SCRIPT.format(statement)])
+    return json.loads(out.decode('utf-8'))
+
+
+def main(repeat=10):
+    results = {}
+    for name, statement in STATEMENTS:
+        runs = [_run(statement) for _ in range(repeat)]
+        best = min(r['seconds'] for r in runs)
+        results[name] = {'seconds': best, 'modules': runs[0]['modules'], 'docker': runs[0]['docker']}
+        print('%-22s %7.1f ms  %4d modules  docker-py %s' % (
+            name, best * 1000, runs[0]['modules'], 'loaded' if runs[0]['docker'] else 'not loaded'))
+    return results
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,84 @@
+# coding=utf-8
+"""
+Synthetic Docker API objects shaped like what a DCE cluster returns.
+"""
+
+
+def make_service(i, tenants=20, stacks=200):
+    return {
+        'ID': 'svc%021d' % i,
+        'Version': {'Index': 1000 + i},
+        'CreatedAt': '2017-11-08T09:30:52.123456789Z',
+        'UpdatedAt': '2017-11-09T10:11:12.987654321Z',
+        'Spec': {
+            'Name': 'service-%d' % i,
+            'Labels': {
+                'com.docker.stack.namespace': 'stack-%d' % (i % stacks),
+                'io.daocloud.dce.authz.tenant': 'tenant-%d' % (i % tenants),
+                'io.daocloud.dce.authz.owner': 'user-%d' % (i % 50),
+                'io.daocloud.dce.app': 'app-%d' % (i % stacks),
+            },
+            'TaskTemplate': {
+                'ContainerSpec': {
+                    'Image': 'daocloud.io/library/nginx:1.13@sha256:%064x' % i,
+                    'Labels': {'io.daocloud.dce.container': 'true'},
+                    'Env': ['KEY_%d=value' % k for k in range(10)],
+                    'Mounts': [{'Type': 'volume', 'Source': 'data-%d' % i, 'Target': '/data'}],
+                },
+                'Resources': {'Limits': {'MemoryBytes': 268435456}, 'Reservations': {}},
+                'RestartPolicy': {'Condition': 'any', 'MaxAttempts': 0},
+                'Placement': {'Constraints': ['node.role == worker']},
+            },
+            'Mode': {'Replicated': {'Replicas': 2}},
+            'EndpointSpec': {'Mode': 'vip', 'Ports': [
+                {'Protocol': 'tcp', 'TargetPort': 80, 'PublishedPort': 30000 + i % 2000}]},
+        },
+        'Endpoint': {
+            'Spec': {'Mode': 'vip'},
+            'Ports': [{'Protocol': 'tcp', 'TargetPort': 80, 'PublishedPort': 30000 + i % 2000,
+                       'PublishMode': 'ingress'}],
+            'VirtualIPs': [{'NetworkID': 'net%021d' % (i % 10), 'Addr': '10.0.%d.%d/24' % (i // 250 % 250, i % 250)}],
+        },
+    }
+
+
+def make_container(i):
+    return {
+        'Id': '%064x' % i,
+        'Names': ['/service-%d.1.%025d' % (i, i)],
+        'Image': 'daocloud.io/library/nginx:1.13',
+        'ImageID': 'sha256:%064x' % (i % 100),
+        'Command': 'nginx -g daemon off;',
+        'Created': 1510133452,
+        'State': 'running',
+        'Status': 'Up 2 days',
+        'Ports': [{'PrivatePort': 80, 'Type': 'tcp'}],
+        'Labels': {'com.docker.swarm.service.name': 'service-%d' % i,
+                   'com.docker.swarm.task.id': 'task%021d' % i},
+        'HostConfig': {'NetworkMode': 'default'},
+        'Mounts': [],
+    }
+
+
+def make_task(i):
+    return {
+        'ID': 'task%021d' % i,
+        'Version': {'Index': 2000 + i},
+        'ServiceID': 'svc%021d' % i,
+        'NodeID': 'node%021d' % (i % 200),
+        'Slot': 1,
+        'Status': {'Timestamp': '2017-11-08T09:30:52.123456789Z', 'State': 'running', 'Message': 'started',
+                   'ContainerStatus': {'ContainerID': '%064x' % i, 'PID': 1000 + i}},
+        'DesiredState': 'running',
+    }
+
+
+def make_node(i):
+    return {
+        'ID': 'node%021d' % i,
+        'Version': {'Index': 10 + i},
+        'Spec': {'Role': 'manager' if i < 3 else 'worker', 'Availability': 'active', 'Labels': {}},
+        'Description': {'Hostname': 'node-%d' % i},
+        'Status': {'State': 'ready', 'Addr': '10.0.0.%d' % (i + 1)},
+        'ManagerStatus': {'Addr': '10.0.0.%d:2377' % (i + 1), 'Reachability': 'reachable'} if i < 3 else None,
+    }
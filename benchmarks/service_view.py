@@ -0,0 +1,54 @@
+# coding=utf-8
+"""
+Memory and property access time of ``DCEService`` vs ``ServiceView``.
+
+    $ python -m benchmarks.service_view [count]
+"""
+from __future__ import print_function
+
+import functools
+import gc
+import json
+import sys
+import timeit
+import tracemalloc
+
+from dce.dockerutils.client import DCEService
+from dce.models import ServiceView
+from .payloads import make_service
+
+PROPERTIES = ('name', 'tenant', 'owner', 'app_name', 'is_system', 'endpoint_ports')
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objects, size
+
+
+def _access(objects):
+    for o in objects:
+        for p in PROPERTIES:
+            getattr(o, p)
+
+
+def main(count=30000):
+    # every model is built from its own decoded payload, as with a real listing
+    body = json.dumps([make_service(i) for i in range(count)])
+    results = {}
+    for name, build in (('DCEService', lambda: [DCEService(attrs=a) for a in json.loads(body)]),
+                        ('ServiceView', lambda: [ServiceView(a) for a in json.loads(body)])):
+        objects, size = _measure(build)
+        access = min(timeit.repeat(functools.partial(_access, objects), number=1, repeat=3))
+        results[name] = {'memory_bytes': size, 'access_seconds': access}
+        print('%-12s %8.1f MB  %6.0f B/object  access %7.1f ms' % (
+            name, size / 1e6, size / float(count), access * 1000))
+        del objects
+    return results
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,235 @@
+# coding=utf-8
+"""
+Client benchmarks against an in-process :class:`benchmarks.fakedce.FakeDCE`:
+client construction, request throughput, cluster fan-out, large listings
+and their memory, the response cache and load balancing over several
+controllers.
+
+    $ python -m benchmarks.suite --output before.json
+    $ python -m benchmarks.suite --output after.json --compare before.json
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from dce.api.client import BaseDCEAPIClient
+from dce.api.discovery import DiscoveryCache
+from dce.dockerutils.client import DCEDockerAPIClient
+from dce.dockerutils.client import DCEDockerClient
+from dce.dockerutils.fanout import fan_out
+from dce.models import ServiceView
+from dce.transport import BreakerRegistry
+from dce.transport import ResponseCache
+from .fakedce import FakeDCE
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.time()
+        fn()
+        samples.append(time.time() - start)
+    return samples
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p99_ms': samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000,
+    }
+
+
+def _traced(fn):
+    # timed apart from the tracemalloc run, tracing slows allocations down severalfold
+    gc.collect()
+    start = time.time()
+    fn()
+    elapsed = time.time() - start
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {'seconds': elapsed, 'peak_bytes': peak}
+
+
+def bench_construction(server, repeat):
+    cache = DiscoveryCache()
+    BaseDCEAPIClient(server.base_url, discovery_cache=cache)
+    node_url = server.node_url(server.node_addrs[0])
+    return {
+        'negotiate': _summary(_timed(lambda: BaseDCEAPIClient(server.base_url, discovery_cache=None), repeat)),
+        'discovery_cache': _summary(_timed(lambda: BaseDCEAPIClient(server.base_url, discovery_cache=cache),
+                                           repeat)),
+        'docker_client': _summary(_timed(lambda: DCEDockerAPIClient(base_url=node_url), repeat)),
+    }
+
+
+def bench_throughput(server, requests, threads):
+    client = BaseDCEAPIClient(server.base_url, discovery_cache=None, num_pools=threads, pool_maxsize=threads)
+    sequential = _timed(client._fetch_info, requests)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        concurrent = list(executor.map(lambda _: _timed(client._fetch_info, 1)[0], range(requests)))
+    elapsed = time.time() - start
+
+    result = {
+        'sequential': _summary(sequential),
+        'concurrent': _summary(concurrent),
+        'threads': threads,
+    }
+    result['sequential']['requests_per_second'] = len(sequential) / sum(sequential)
+    result['concurrent']['requests_per_second'] = requests / elapsed
+    return result
+
+
+def bench_fan_out(server, repeat):
+    breakers = BreakerRegistry()
+    clients = [DCEDockerAPIClient(base_url=server.node_url(addr), breakers=breakers) for addr in server.node_addrs]
+
+    def sequential():
+        for c in clients:
+            c.info()
+
+    def concurrent():
+        result = fan_out(clients, 'info')
+        assert result.ok, result.errors
+
+    return {
+        'nodes': len(clients),
+        'sequential': _summary(_timed(sequential, repeat)),
+        'fan_out': _summary(_timed(concurrent, repeat)),
+    }
+
+
+def bench_controllers(servers, requests, threads):
+    """
+    Threaded throughput against the first controller only vs. balanced over all of them.
+    """
+    urls = [s.base_url for s in servers]
+    results = {'controllers': len(urls)}
+    for name, kwargs in (('single', {'base_url': urls[0]}), ('balanced', {'controllers': urls})):
+        client = BaseDCEAPIClient(discovery_cache=None, num_pools=threads, pool_maxsize=threads, **kwargs)
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: client._fetch_info(), range(requests)))
+        results[name] = {'requests_per_second': requests / (time.time() - start)}
+    return results
+
+
+def bench_response_cache(server, repeat):
+    """
+    Repeated buffered service listings, as JSON and as service views, without
+    and with an always revalidating response cache: unchanged bodies are
+    matched by hash and their views reused.
+    """
+    url = server.node_url(server.node_addrs[0])
+    results = {}
+    for name, cache in (('uncached', None), ('cached', ResponseCache(policies={'/services': 0}))):
+        client = DCEDockerAPIClient(base_url=url, response_cache=cache)
+        results[name] = _summary(_timed(client.services, repeat))
+        views = DCEDockerClient.from_api_client(client).service_views
+        results[name + '_views'] = _summary(_timed(views, repeat))
+        if cache is not None:
+            results[name]['hit_rate'] = cache.stats()['hit_rate']
+    return results
+
+
+def bench_listing(server):
+    client = DCEDockerAPIClient(base_url=server.node_url(server.node_addrs[0]))
+    services, buffered = _traced(client.services)
+    count = len(services)
+    del services
+    _, streamed = _traced(lambda: sum(1 for _ in client.iter_services()))
+    _, views = _traced(lambda: [ServiceView(a) for a in client.iter_services()])
+    return {'services': count, 'buffered': buffered, 'streamed': streamed, 'service_views': views}
+
+
+def run(latency=0, services=5000, nodes=16, requests=500, threads=16, repeat=20, controllers=3):
+    config = {'latency': latency, 'services': services, 'nodes': nodes, 'requests': requests,
+              'threads': threads, 'repeat': repeat, 'controllers': controllers}
+    with FakeDCE(latency=latency, services=services, nodes=nodes) as server:
+        results = {
+            'construction': bench_construction(server, repeat),
+            'throughput': bench_throughput(server, requests, threads),
+            'fan_out': bench_fan_out(server, repeat),
+            'listing': bench_listing(server),
+            'response_cache': bench_response_cache(server, repeat),
+        }
+    # every fake controller handles requests one at a time, like a saturated one
+    servers = [FakeDCE(latency=latency or 0.01, services=0, nodes=0, max_concurrency=1).start()
+               for _ in range(controllers)]
+    try:
+        results['controllers'] = bench_controllers(servers, requests, threads)
+    finally:
+        for s in servers:
+            s.stop()
+    return {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time()},
+        'config': config,
+        'results': results,
+    }
+
+
+def _flatten(obj, prefix=''):
+    for key, value in sorted(obj.items()):
+        name = prefix + key
+        if isinstance(value, dict):
+            for item in _flatten(value, name + '.'):
+                yield item
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+def compare(baseline, current):
+    """
+    Print every metric of ``current`` next to ``baseline`` and their ratio.
+    """
+    old = dict(_flatten(baseline['results']))
+    for name, value in _flatten(current['results']):
+        if name in old and old[name]:
+            print('%-50s %14.3f %14.3f %7.2fx' % (name, old[name], value, value / float(old[name])))
+        else:
+            print('%-50s %14s %14.3f' % (name, '-', value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every fake response')
+    parser.add_argument('--services', type=int, default=5000)
+    parser.add_argument('--nodes', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--controllers', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args(argv)
+
+    report = run(latency=args.latency, services=args.services, nodes=args.nodes, requests=args.requests,
+                 threads=args.threads, repeat=args.repeat, controllers=args.controllers)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    elif not args.output:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        print()
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# coding=utf-8
+"""
+Compare ``convert_docker_datetime`` + ``strptime`` with ``parse_docker_timestamps``.
+
+    $ python -m benchmarks.timestamps [count]
+"""
+from __future__ import print_function
+
+import calendar
+import random
+import sys
+import timeit
+from datetime import datetime
+
+from dce.dockerutils.timestamps import parse_docker_timestamps
+from dce.dockerutils.tools import convert_docker_datetime
+
+
+def make_timestamps(count):
+    rnd = random.Random(42)
+    return ['2017-11-%02dT%02d:%02d:%02d.%09dZ' % (
+        rnd.randint(1, 28), rnd.randint(0, 23), rnd.randint(0, 59), rnd.randint(0, 59), rnd.randint(0, 999999999)
+    ) for _ in range(count)]
+
+
+def legacy(values):
+    # what callers do today: clean the string, then parse it again
+    result = []
+    for v in values:
+        dt = datetime.strptime(convert_docker_datetime(v), '%Y-%m-%dT%H:%M:%S.%fZ')
+        result.append(calendar.timegm(dt.timetuple()) + dt.microsecond / 1e6)
+    return result
+
+
+def main(count=20000, repeat=3):
+    values = make_timestamps(count)
+    results = {}
+    for name, fn in (('convert_docker_datetime+strptime', lambda: legacy(values)),
+                     ('parse_docker_timestamps', lambda: parse_docker_timestamps(values)),
+                     ('parse_docker_timestamps(as_array)', lambda: parse_docker_timestamps(values, as_array=True))):
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        results[name] = best
+        print('%-36s %8.1f ms  %10.0f ts/s' % (name, best * 1000, count / best))
+    return results
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
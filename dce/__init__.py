@@ -1,11 +1,18 @@
 from .api.client import DCEAPIClient
 from .client import DCEClient
-from .dockerutils import (
-    DCEDockerClient,
-    DCEDockerAPIClient,
-    dce_docker_api_client,
-    get_local_dce_api_client,
-    get_local_dce_client,
-    get_node_docker_api_clients,
-    get_node_docker_clients
-)
+from .utils.lazy import lazy_exports
+
+# docker-py takes most of the import time, load it on first use only
+lazy_exports(__name__, dict((name, '.dockerutils') for name in (
+    'DCEDockerClient',
+    'DCEDockerAPIClient',
+    'cluster_fan_out',
+    'dce_docker_api_client',
+    'fan_out',
+    'get_local_dce_api_client',
+    'get_local_dce_client',
+    'get_node_docker_api_clients',
+    'get_node_docker_clients',
+    'iter_cluster_fan_out',
+    'iter_fan_out',
+)))
@@ -0,0 +1,220 @@
+# coding=utf-8
+"""
+asyncio flavour of :class:`dce.api.client.BaseDCEAPIClient`.
+
+Requires ``aiohttp`` (``pip install dce[async]``) and Python 3.5+.
+"""
+import asyncio
+
+import aiohttp
+import requests
+from requests.structures import CaseInsensitiveDict
+from semantic_version import Version as _V
+from six.moves.urllib_parse import urlparse
+
+from ..consts import DEFAULT_NUM_POOLS
+from ..consts import DEFAULT_TIMEOUT_SECONDS
+from ..consts import DEFAULT_USER_AGENT
+from ..consts import MINIMUM_DCE_VERSION
+from ..errors import APIError
+from ..errors import InvalidVersion
+from ..errors import create_api_error_from_http_exception
+from .discovery import DISCOVERY_CACHE
+
+
+def to_requests_response(resp, content):
+    """
+    Wrap an aiohttp response and its body into a :class:`requests.Response`, so
+    the synchronous error mapping can be reused as is.
+    """
+    response = requests.Response()
+    response.status_code = resp.status
+    response.reason = resp.reason
+    response.url = str(resp.url)
+    response.headers = CaseInsensitiveDict(resp.headers)
+    response.encoding = resp.charset or 'utf-8'
+    response._content = content
+    return response
+
+
+def raise_for_status(resp, content, create_error=create_api_error_from_http_exception):
+    if resp.status < 400:
+        return
+    try:
+        to_requests_response(resp, content).raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        raise create_error(e)
+
+
+class AsyncSessionMixin(object):
+    """
+    Owns an :class:`aiohttp.ClientSession` that is created lazily on the running
+    loop, unless one is shared in through ``session``.
+    """
+
+    def _init_session(self, session, token, username, password, timeout, user_agent, limit):
+        self._session = session
+        self._own_session = session is None
+        self._limit = limit
+        self.timeout = timeout
+        self.headers = {'User-Agent': user_agent}
+        if token:
+            self.headers['X-DCE-Access-Token'] = token
+        self.auth = aiohttp.BasicAuth(username, password) if username and password else None
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._limit, ssl=False),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._own_session = True
+        return self._session
+
+    async def close(self):
+        if self._own_session and self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _request(self, method, url, json=False, binary=False, create_error=None, **kwargs):
+        headers = dict(self.headers)
+        headers.update(kwargs.pop('headers', None) or {})
+        kwargs.setdefault('timeout', aiohttp.ClientTimeout(total=self.timeout))
+        async with self.session.request(method, url, headers=headers, auth=self.auth, **kwargs) as resp:
+            content = await resp.read()
+        raise_for_status(resp, content, create_error or create_api_error_from_http_exception)
+        response = to_requests_response(resp, content)
+        if json:
+            return response.json()
+        if binary:
+            return content
+        return response.text
+
+
+class AsyncDCEAPIClient(AsyncSessionMixin):
+    """
+    Usage::
+
+        async with AsyncDCEAPIClient('http://192.168.100.30', username='admin', password='admin') as client:
+            info = await client.info()
+            containers = await client.docker('192.168.100.31').containers()
+    """
+
+    def __init__(self, base_url=None, token=None,
+                 username=None, password=None, timeout=DEFAULT_TIMEOUT_SECONDS,
+                 user_agent=DEFAULT_USER_AGENT, min_version=MINIMUM_DCE_VERSION,
+                 session=None, limit=DEFAULT_NUM_POOLS, discovery_cache=DISCOVERY_CACHE):
+        if base_url.endswith('/'):
+            base_url = base_url[:-1]
+        if not base_url.startswith('http://') or base_url.startswith('https://'):
+            base_url = 'http://' + base_url
+        self.base_url = base_url
+        self.host = urlparse(self.base_url).hostname
+        self.token = token
+        self.username = username
+        self.password = password
+        self.min_version = min_version
+        self.discovery_cache = discovery_cache
+        self._init_session(session, token, username, password, timeout, user_agent, limit)
+        self._prefix = None
+        self._versions = None
+        # created on first use, inside the loop that negotiates
+        self._negotiate_lock = None
+        discovered = discovery_cache.get(self.base_url) if discovery_cache else None
+        if discovered:
+            self._prefix, self._versions = discovered
+            self._check_min_version()
+
+    async def __aenter__(self):
+        await self.negotiate()
+        return self
+
+    def _check_min_version(self):
+        dce_version = self._versions.get('DCEVersion')
+        if _V(dce_version) < _V(self.min_version):
+            raise InvalidVersion('DCE Version {} < {} is not supported'
+                                 .format(dce_version, self.min_version))
+
+    async def negotiate(self):
+        """
+        Resolve the API prefix (``/dce`` or ``/api``), once.
+        """
+        if self._prefix is not None:
+            return self._prefix
+        if self._negotiate_lock is None:
+            self._negotiate_lock = asyncio.Lock()
+        async with self._negotiate_lock:
+            if self._prefix is not None:
+                return self._prefix
+            try:
+                prefix = 'dce'
+                versions = await self._get_json('/{@}/version', prefix)
+            except (APIError, ValueError):
+                prefix = 'api'
+                versions = await self._get_json('/{@}/version', prefix)
+            self._versions = versions
+            self._check_min_version()
+            self._prefix = prefix
+            if self.discovery_cache:
+                self.discovery_cache.set(self.base_url, prefix, versions)
+        return self._prefix
+
+    async def _url(self, path, *args, **kwargs):
+        if '@' not in kwargs:
+            kwargs['@'] = await self.negotiate()
+        return '{0}{1}'.format(self.base_url, path.format(*args, **kwargs))
+
+    async def _get_json(self, path, prefix=None):
+        url = await self._url(path, **({'@': prefix} if prefix else {}))
+        return await self._request('GET', url, json=True)
+
+    @property
+    def prefix(self):
+        return self._prefix
+
+    @property
+    def dce_version(self):
+        """
+        Available once negotiated, e.g. inside ``async with``.
+        """
+        return self._versions.get('DCEVersion') if self._versions else None
+
+    async def version(self):
+        self._versions = await self._get_json('/{@}/version')
+        return self._versions
+
+    async def info(self):
+        return await self._get_json('/{@}/info')
+
+    async def ping(self):
+        return await self._request('GET', await self._url('/{@}/ping'))
+
+    async def now(self):
+        return await self._get_json('/{@}/now')
+
+    def docker(self, node_addr=None, timeout=None):
+        """
+        :param node_addr: advertised address of a node, None for the controller's docker endpoint
+        :return: :class:`dce.dockerutils.aio.AsyncDCEDockerAPIClient` sharing this client's session
+        """
+        from ..dockerutils.aio import AsyncDCEDockerAPIClient
+
+        if self._prefix is None:
+            raise RuntimeError('call negotiate() first')
+        if node_addr:
+            base_url = '{0}/{1}/nodes/{2}/docker'.format(self.base_url, self._prefix, node_addr)
+        else:
+            base_url = '{0}/{1}/docker'.format(self.base_url, self._prefix)
+        return AsyncDCEDockerAPIClient(
+            base_url, token=self.token, username=self.username, password=self.password,
+            timeout=timeout or self.timeout, session=self.session
+        )
+
+    def __repr__(self):
+        return "<AsyncDCEClient '%s'>" % self.host
@@ -1,4 +1,5 @@
 # coding=utf-8
+import threading
 
 import requests
 import urllib3
@@ -6,13 +7,28 @@ from requests.auth import HTTPBasicAuth
 from semantic_version import Version as _V
 from six.moves.urllib_parse import urlparse
 
+from ..consts import DEFAULT_CONNECT_TIMEOUT_SECONDS
+from ..consts import DEFAULT_INFO_TTL
+from ..consts import DEFAULT_NUM_POOLS
+from ..consts import DEFAULT_POOL_MAXSIZE
 from ..consts import DEFAULT_TIMEOUT_SECONDS
 from ..consts import DEFAULT_USER_AGENT
+from ..consts import DEFAULT_VERSION_TTL
 from ..consts import MINIMUM_DCE_VERSION
+from ..errors import APIError
 from ..errors import InvalidVersion
 from ..errors import create_api_error_from_http_exception
-from ..utils.cached_property import cached_property
+from ..transport import BREAKERS
+from ..transport import ControllerPool
+from ..transport import DEFAULT_RETRY
+from ..transport import INSTRUMENTATION
+from ..transport import PooledHTTPAdapter
+from ..transport import pool_stats
+from ..utils.capabilities import capability_table
+from ..utils.capabilities import feature_name
 from ..utils.decorators import minimum_version
+from .discovery import DISCOVERY_CACHE
+from .metadata import MetadataCache
 
 urllib3.disable_warnings()
 
@@ -20,8 +36,26 @@ urllib3.disable_warnings()
 class BaseDCEAPIClient(requests.Session):
     def __init__(self, base_url=None, token=None,
                  username=None, password=None, timeout=DEFAULT_TIMEOUT_SECONDS,
-                 user_agent=DEFAULT_USER_AGENT, min_version=MINIMUM_DCE_VERSION):
+                 user_agent=DEFAULT_USER_AGENT, min_version=MINIMUM_DCE_VERSION,
+                 num_pools=DEFAULT_NUM_POOLS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 lazy=False, discovery_cache=DISCOVERY_CACHE, metadata_ttls=None,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT_SECONDS, retry=DEFAULT_RETRY, breakers=BREAKERS,
+                 controllers=None, response_cache=None):
         super(BaseDCEAPIClient, self).__init__()
+        adapter = PooledHTTPAdapter(pool_connections=num_pools, pool_maxsize=pool_maxsize,
+                                    retry=retry, breakers=breakers, connect_timeout=connect_timeout,
+                                    cache=response_cache)
+        self.breakers = breakers
+        self.response_cache = response_cache
+        if controllers is not None and not isinstance(controllers, ControllerPool):
+            controllers = ControllerPool(controllers)
+        self.controllers = controllers
+        if controllers is not None:
+            base_url = base_url or controllers.urls[0]
+            if controllers.ping is None:
+                controllers.ping = self._ping_controller
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
         if base_url.endswith('/'):
             base_url = base_url[:-1]
         if not base_url.startswith('http://') or base_url.startswith('https://'):
@@ -39,17 +73,49 @@ class BaseDCEAPIClient(requests.Session):
         self.verify = False
         if token:
             self.headers['X-DCE-Access-Token'] = token
-        self._retrieve_versions_prefix()
-        if _V(self.dce_version) < _V(min_version):
+        self.discovery_cache = discovery_cache
+        self._prefix = None
+        self._versions = None
+        self._negotiate_lock = threading.Lock()
+        ttls = {'info': DEFAULT_INFO_TTL, 'version': DEFAULT_VERSION_TTL}
+        ttls.update(metadata_ttls or {})
+        self.metadata = MetadataCache({'info': self._fetch_info, 'version': self.version}, ttls=ttls)
+        discovered = discovery_cache.get(self.base_url) if discovery_cache else None
+        if discovered:
+            self._prefix, self._versions = discovered
+            self.metadata.put('version', self._versions)
+            self._check_min_version()
+        elif not lazy:
+            self._retrieve_versions_prefix()
+
+    def _check_min_version(self):
+        dce_version = self._versions.get('DCEVersion')
+        if _V(dce_version) < _V(self.min_version):
             raise InvalidVersion('DCE Version {} < {} is not supported'
-                                 .format(self.dce_version, min_version))
+                                 .format(dce_version, self.min_version))
+
+    def request(self, method, url, *args, **kwargs):
+        if self.controllers is None:
+            return super(BaseDCEAPIClient, self).request(method, url, *args, **kwargs)
+        return self.controllers.send(super(BaseDCEAPIClient, self).request, method, url, *args, **kwargs)
+
+    def _ping_controller(self, url):
+        # straight to ``url``, bypassing the controller pool
+        response = super(BaseDCEAPIClient, self).request('GET', '{0}/{1}/ping'.format(url, self.prefix),
+                                                         timeout=self.timeout)
+        return self._result(response)
 
     def _raise_for_status(self, response):
         """Raises stored :class:`APIError`, if one occurred."""
         try:
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
-            raise create_api_error_from_http_exception(e)
+            try:
+                raise create_api_error_from_http_exception(e)
+            except Exception as error:
+                if INSTRUMENTATION.enabled:
+                    INSTRUMENTATION.record_error(response, error)
+                raise
 
     def _result(self, response, json=False, binary=False):
         assert not (json and binary)
@@ -80,29 +146,80 @@ class BaseDCEAPIClient(requests.Session):
         return self.delete(url, **self._set_request_timeout(kwargs))
 
     def _url(self, path, *args, **kwargs):
-        kwargs.setdefault('@', self.prefix)
+        if '@' not in kwargs:
+            kwargs['@'] = self.prefix
         return '{0}{1}'.format(self.base_url, path.format(*args, **kwargs))
 
+    @property
+    def prefix(self):
+        if self._prefix is None:
+            self._retrieve_versions_prefix()
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self, value):
+        self._prefix = value
+
     def _retrieve_versions_prefix(self):
-        try:
-            self.prefix = 'dce'
-            self.version()
-        except:
-            self.prefix = 'api'
-            self.version()
+        with self._negotiate_lock:
+            if self._prefix is not None:
+                return
+            try:
+                prefix = 'dce'
+                versions = self._fetch_versions(prefix)
+            except (APIError, ValueError):
+                # controllers older than 2.7 only serve /api
+                prefix = 'api'
+                versions = self._fetch_versions(prefix)
+            self._versions = versions
+            self.metadata.put('version', versions)
+            self._check_min_version()
+            self._prefix = prefix
+            if self.discovery_cache:
+                self.discovery_cache.set(self.base_url, prefix, versions)
+
+    def _fetch_versions(self, prefix):
+        return self._result(self._get(self._url('/{@}/version', **{'@': prefix})), json=True)
 
     def version(self):
         self._versions = self._result(self._get(self._url('/{@}/version')), json=True)
+        self.metadata.put('version', self._versions)
         return self._versions
 
-    @cached_property
+    @property
     def dce_version(self):
-        return self._versions.get('DCEVersion')
+        if self._versions is None:
+            self._retrieve_versions_prefix()
+        return self.metadata.get('version').get('DCEVersion')
 
-    @cached_property
-    def info(self):
+    @property
+    def capabilities(self):
+        """
+        ``{feature name: supported}`` for every version guarded feature, e.g.
+        ``dce.api.client.BaseDCEAPIClient.mode``.
+        """
+        return dict((feature_name(f), supported) for f, supported in capability_table(self.dce_version).items())
+
+    def supports(self, feature):
+        """
+        :param feature: the name of a guarded method of this client, e.g.
+            ``mode``, or a feature name given to the version decorators
+        """
+        attr = getattr(type(self), feature, None)
+        features = getattr(getattr(attr, 'fget', attr), 'features', None) or (feature,)
+        table = capability_table(self.dce_version)
+        return all(table.get(f, False) for f in features)
+
+    def _fetch_info(self):
         return self._result(self._get(self._url('/{@}/info')), json=True)
 
+    @property
+    def info(self):
+        """
+        ``/{@}/info``, cached by :attr:`metadata`.
+        """
+        return self.metadata.get('info')
+
     @property
     def cluster_uuid(self):
         return self.info.get('ClusterUuid')
@@ -129,6 +246,15 @@ class BaseDCEAPIClient(requests.Session):
     def network_driver(self):
         return self.info.get('NetworkDriver')
 
+    def pool_stats(self):
+        return pool_stats(self)
+
+    def breaker_state(self):
+        """
+        :return: 'closed', 'open' or 'half-open'
+        """
+        return self.breakers.for_url(self.base_url).state if self.breakers is not None else None
+
     def ping(self):
         return self._result(self._get(self._url('/{@}/ping')))
 
@@ -0,0 +1,120 @@
+# coding=utf-8
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from ..consts import DEFAULT_DISCOVERY_TTL
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+
+class DiscoveryCache(object):
+    """
+    Remembers the negotiated API prefix and ``/{@}/version`` payload of DCE
+    controllers, keyed by base url, so new clients can skip negotiation.
+
+    Entries live in memory and, if ``path`` is given, are also persisted to a
+    JSON file shared by short-lived processes. The file is re-read when it
+    changed, and updates are merged into its current content under an
+    exclusive lock on ``<path>.lock``, so concurrent processes keep each
+    other's entries.
+    """
+
+    def __init__(self, ttl=DEFAULT_DISCOVERY_TTL, path=None):
+        self.ttl = ttl
+        self.path = path
+        self._entries = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self, base_url):
+        """
+        :return: (prefix, versions) or None
+        """
+        with self._lock:
+            entry = self._load().get(base_url)
+        if not entry:
+            return None
+        if self.ttl and time.time() - entry['updated'] > self.ttl:
+            return None
+        return entry['prefix'], entry['versions']
+
+    def set(self, base_url, prefix, versions):
+        entry = {
+            'prefix': prefix,
+            'versions': versions,
+            'updated': time.time(),
+        }
+        self._update(lambda entries: entries.update({base_url: entry}))
+
+    def invalidate(self, base_url=None):
+        if base_url is None:
+            self._update(lambda entries: entries.clear())
+        else:
+            self._update(lambda entries: entries.pop(base_url, None))
+
+    def _update(self, change):
+        with self._lock:
+            change(self._load())
+            if not self.path:
+                return
+            try:
+                with self._file_lock():
+                    entries = self._read()
+                    change(entries)
+                    self._write(entries)
+            except (IOError, OSError):
+                return
+            self._entries = entries
+
+    def _load(self):
+        if not self.path:
+            if self._entries is None:
+                self._entries = {}
+        elif self._entries is None or self._mtime != self._file_mtime():
+            self._mtime = self._file_mtime()
+            self._entries = self._read()
+        return self._entries
+
+    def _file_mtime(self):
+        # every write renames a new file over the old one
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, entries):
+        tmp = '%s.%s.tmp' % (self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(entries, f)
+        os.rename(tmp, self.path)
+        self._mtime = self._file_mtime()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+DISCOVERY_CACHE = DiscoveryCache(path=os.getenv('DCE_DISCOVERY_CACHE'))
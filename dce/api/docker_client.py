@@ -1,10 +1,12 @@
 from .client import BaseDCEAPIClient
-from ..dockerutils import DCEDockerClient
-from ..dockerutils import dce_docker_api_client
 
 
 class DockerMixin(BaseDCEAPIClient):
+    # dockerutils pulls in docker-py, only import it when a docker client is asked for
+
     def docker_api_client(self):
+        from ..dockerutils import dce_docker_api_client
+
         return dce_docker_api_client(
             self.base_url,
             token=self.token,
@@ -13,6 +15,8 @@ class DockerMixin(BaseDCEAPIClient):
         )
 
     def docker_client(self):
+        from ..dockerutils import DCEDockerClient
+
         return DCEDockerClient(
             self.base_url,
             token=self.token,
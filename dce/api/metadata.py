@@ -0,0 +1,130 @@
+# coding=utf-8
+import threading
+import time
+
+
+class _Field(object):
+    __slots__ = ('value', 'updated', 'loading', 'error', 'hits', 'misses', 'stale_hits', 'refreshes', 'errors')
+
+    def __init__(self):
+        self.value = None
+        self.updated = None
+        self.loading = None  # threading.Event while a load is in flight
+        self.error = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.errors = 0
+
+
+class MetadataCache(object):
+    """
+    Per-client cache of slowly changing cluster metadata (``/{@}/info``,
+    ``/{@}/version``).
+
+    * every field has its own TTL;
+    * once a field expired, readers keep getting the stale value while a
+      single background thread refreshes it (stale-while-revalidate), unless it
+      is older than ``ttl + max_stale``;
+    * concurrent misses of the same field share one request (single flight).
+    """
+
+    def __init__(self, loaders, ttls=None, default_ttl=60, stale_while_revalidate=True, max_stale=None):
+        self.loaders = loaders
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale = max_stale
+        self._fields = dict((name, _Field()) for name in loaders)
+        self._lock = threading.Lock()
+
+    def ttl(self, name):
+        return self.ttls.get(name, self.default_ttl)
+
+    def get(self, name):
+        field = self._fields[name]
+        with self._lock:
+            if field.updated is not None:
+                age = time.time() - field.updated
+                ttl = self.ttl(name)
+                if not ttl or age < ttl:
+                    field.hits += 1
+                    return field.value
+                if self.stale_while_revalidate and (self.max_stale is None or age < ttl + self.max_stale):
+                    field.stale_hits += 1
+                    if field.loading is None:
+                        self._start_load(field)
+                        thread = threading.Thread(target=self._load, args=(name, field))
+                        thread.daemon = True
+                        thread.start()
+                    return field.value
+            field.misses += 1
+            loading = field.loading
+            if loading is None:
+                self._start_load(field)
+        if loading is not None:
+            # another thread is already fetching it
+            loading.wait()
+            with self._lock:
+                if field.error is not None and field.updated is None:
+                    raise field.error
+                return field.value
+        self._load(name, field)
+        with self._lock:
+            if field.error is not None:
+                raise field.error
+            return field.value
+
+    def put(self, name, value):
+        field = self._fields[name]
+        with self._lock:
+            field.value = value
+            field.updated = time.time()
+            field.error = None
+
+    def invalidate(self, name=None):
+        """
+        Drop a field (all fields if ``name`` is None), the next read fetches it again.
+        """
+        with self._lock:
+            for n, field in self._fields.items():
+                if name is None or n == name:
+                    field.updated = None
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return dict((name, {
+                'ttl': self.ttl(name),
+                'age': None if f.updated is None else now - f.updated,
+                'loading': f.loading is not None,
+                'hits': f.hits,
+                'misses': f.misses,
+                'stale_hits': f.stale_hits,
+                'refreshes': f.refreshes,
+                'errors': f.errors,
+                'last_error': f.error,
+            }) for name, f in self._fields.items())
+
+    @staticmethod
+    def _start_load(field):
+        field.loading = threading.Event()
+        field.error = None
+
+    def _load(self, name, field):
+        try:
+            value = self.loaders[name]()
+        except Exception as e:
+            with self._lock:
+                field.errors += 1
+                field.error = e
+        else:
+            with self._lock:
+                field.value = value
+                field.updated = time.time()
+                field.refreshes += 1
+        finally:
+            with self._lock:
+                loading, field.loading = field.loading, None
+            loading.set()
@@ -14,3 +14,42 @@ DEFAULT_USER_AGENT = "dce-sdk-python/{0}".format(version)
 DOCKER_MODE = 'docker'
 KUBE_MODE = 'kubernetes'
 DCE_MODES = {DOCKER_MODE, KUBE_MODE}
+
+DEFAULT_NUM_POOLS = 25
+DEFAULT_POOL_MAXSIZE = 10
+
+DEFAULT_DOCKER_CLIENTS_MAXSIZE = 256
+DEFAULT_DOCKER_CLIENTS_IDLE_TIMEOUT = 600
+
+DEFAULT_DISCOVERY_TTL = 3600
+
+DEFAULT_FAN_OUT_WORKERS = 32
+
+DEFAULT_INFO_TTL = 60
+DEFAULT_VERSION_TTL = 600
+
+DEFAULT_STREAM_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5
+# read timeout of calls through the node proxy, a hung node fails fast
+DEFAULT_NODE_TIMEOUT_SECONDS = 30
+
+DEFAULT_TOPOLOGY_REFRESH_INTERVAL = 60
+DEFAULT_TOPOLOGIES_MAXSIZE = 16
+DEFAULT_HEALTH_CHECK_INTERVAL = 10
+
+DEFAULT_BATCH_INSPECT_WORKERS = DEFAULT_POOL_MAXSIZE
+
+DEFAULT_RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
+
+DEFAULT_LOG_STREAMS = DEFAULT_FAN_OUT_WORKERS
+DEFAULT_LOG_REORDER_WINDOW = 0.5
+DEFAULT_LOG_BUFFER_LINES = 10000
+
+DEFAULT_STATS_INTERVAL = 10
+DEFAULT_STATS_CAPACITY = 360
+
+DEFAULT_CLEANUP_PER_NODE = 2
+
+# seconds stop() waits for a background thread
+DEFAULT_STOP_TIMEOUT = 5
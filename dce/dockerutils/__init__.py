@@ -1,8 +1,35 @@
-from .client import DCEDockerClient, DCEDockerAPIClient
-from .tools import (
-    dce_docker_api_client,
-    get_local_dce_api_client,
-    get_local_dce_client,
-    get_node_docker_api_clients,
-    get_node_docker_clients
-)
+from ..utils.lazy import lazy_exports
+
+lazy_exports(__name__, {
+    'DCEDockerClient': '.client',
+    'DCEDockerAPIClient': '.client',
+    'patch_docker_service_model': '.client',
+    'BatchResult': '.batch',
+    'batch_inspect': '.batch',
+    'DiskUsageReport': '.diskusage',
+    'DiskUsageScanner': '.diskusage',
+    'ClusterEventWatcher': '.events',
+    'EventWatcher': '.events',
+    'FanOutResult': '.fanout',
+    'fan_out': '.fanout',
+    'iter_fan_out': '.fanout',
+    'ServiceInventory': '.inventory',
+    'LogAggregator': '.logs',
+    'LogLine': '.logs',
+    'service_log_targets': '.logs',
+    'StatsRing': '.stats',
+    'StatsSampler': '.stats',
+    'ClusterTopology': '.topology',
+    'parse_docker_timestamp': '.timestamps',
+    'parse_docker_timestamps': '.timestamps',
+    'cluster_fan_out': '.tools',
+    'dce_docker_api_client': '.tools',
+    'get_cluster_topology': '.tools',
+    'get_local_dce_api_client': '.tools',
+    'get_local_dce_client': '.tools',
+    'get_node_docker_api_clients': '.tools',
+    'get_node_docker_clients': '.tools',
+    'iter_cluster_fan_out': '.tools',
+    'scan_cluster_disk_usage': '.tools',
+    'tail_service_logs': '.tools',
+})
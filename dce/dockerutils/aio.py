@@ -0,0 +1,95 @@
+# coding=utf-8
+"""
+asyncio flavour of the DCE docker proxy client, see :class:`dce.api.aio.AsyncDCEAPIClient`.
+"""
+import json
+
+from six.moves.urllib_parse import quote_plus
+
+from ..api.aio import AsyncSessionMixin
+from ..consts import DEFAULT_NUM_POOLS
+from .client import DEFAULT_TIMEOUT_SECONDS
+from .client import NODE_PROXY_PATH
+from .client import create_api_error_from_http_exception
+
+
+class AsyncDCEDockerAPIClient(AsyncSessionMixin):
+    def __init__(self, base_url=None, token=None, username=None, password=None,
+                 timeout=DEFAULT_TIMEOUT_SECONDS, user_agent='DiskCleaner/DCE-Plugin',
+                 session=None, limit=DEFAULT_NUM_POOLS):
+        self.base_url = base_url
+        self.token = token
+        self.username = username
+        self.password = password
+        self._init_session(session, token, username, password, timeout, user_agent, limit)
+
+    def __repr__(self):
+        return "<AsyncDCEDockerClient '%s'>" % self.base_url
+
+    @property
+    def node_addr(self):
+        m = NODE_PROXY_PATH.search(self.base_url)
+        return m.group(1) if m else None
+
+    def _url(self, pathfmt, *args):
+        args = [quote_plus(arg, safe="/:") for arg in args]
+        return '{0}{1}'.format(self.base_url, pathfmt.format(*args))
+
+    def _call(self, method, url, json=False, **kwargs):
+        return self._request(method, url, json=json, create_error=create_api_error_from_http_exception, **kwargs)
+
+    @staticmethod
+    def _filters(params, filters):
+        if filters:
+            params['filters'] = json.dumps(filters)
+        return params
+
+    def version(self):
+        return self._call('GET', self._url('/version'), json=True)
+
+    def info(self):
+        return self._call('GET', self._url('/info'), json=True)
+
+    def ping(self):
+        return self._call('GET', self._url('/_ping'))
+
+    def containers(self, all=False, filters=None):
+        params = self._filters({'all': 1 if all else 0}, filters)
+        return self._call('GET', self._url('/containers/json'), json=True, params=params)
+
+    def inspect_container(self, container):
+        return self._call('GET', self._url('/containers/{0}/json', container), json=True)
+
+    def images(self, all=False, filters=None):
+        params = self._filters({'all': 1 if all else 0}, filters)
+        return self._call('GET', self._url('/images/json'), json=True, params=params)
+
+    def df(self):
+        return self._call('GET', self._url('/system/df'), json=True)
+
+    def services(self, filters=None):
+        return self._call('GET', self._url('/services'), json=True, params=self._filters({}, filters))
+
+    def inspect_service(self, service):
+        return self._call('GET', self._url('/services/{0}', service), json=True)
+
+    def tasks(self, filters=None):
+        return self._call('GET', self._url('/tasks'), json=True, params=self._filters({}, filters))
+
+    def nodes(self, filters=None):
+        return self._call('GET', self._url('/nodes'), json=True, params=self._filters({}, filters))
+
+    def inspect_node(self, node_id):
+        return self._call('GET', self._url('/nodes/{0}', node_id), json=True)
+
+    def create_service_raw(self, service_spec, auth_header=None):
+        headers = {'Content-Type': 'application/json'}
+        if auth_header:
+            headers['X-Registry-Auth'] = auth_header
+        return self._call('POST', self._url('/services/create'), json=True, headers=headers,
+                          data=json.dumps(service_spec))
+
+    def update_service_raw(self, service_id, version, service_spec):
+        url = self._url('/services/{0}/update', service_id)
+        return self._call('POST', url, params={'version': version}, headers={'Content-Type': 'application/json'},
+                          data=json.dumps(service_spec))
@@ -0,0 +1,74 @@
+# coding=utf-8
+from concurrent.futures import ThreadPoolExecutor
+
+from docker.errors import NotFound
+
+from ..consts import DEFAULT_BATCH_INSPECT_WORKERS
+
+INSPECTORS = {
+    'service': 'inspect_service',
+    'container': 'inspect_container',
+    'node': 'inspect_node',
+    'task': 'inspect_task',
+    'network': 'inspect_network',
+    'volume': 'inspect_volume',
+    'image': 'inspect_image',
+}
+
+
+class BatchResult(object):
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.not_found = set()
+
+    @property
+    def ok(self):
+        return not self.errors and not self.not_found
+
+    def __repr__(self):
+        return '<BatchResult results=%d not_found=%d errors=%d>' % (
+            len(self.results), len(self.not_found), len(self.errors))
+
+
+def batch_inspect(client, kind, ids, max_workers=DEFAULT_BATCH_INSPECT_WORKERS, single_flight=None):
+    """
+    Inspect many ``kind`` objects (see :data:`INSPECTORS`) of ``client`` at
+    most ``max_workers`` at a time. Duplicate ids are inspected once and,
+    given a :class:`dce.utils.memo.SingleFlight`, so are ids another batch
+    is already inspecting.
+
+    :return: :class:`BatchResult`; missing ids are in ``not_found``, any
+        other failure in ``errors``
+    """
+    inspect = getattr(client, INSPECTORS[kind])
+    unique = list(dict.fromkeys(ids))
+    result = BatchResult()
+    if not unique:
+        return result
+
+    def run(resource_id):
+        try:
+            if single_flight is None:
+                return resource_id, inspect(resource_id), None
+            return resource_id, single_flight.do((kind, resource_id), lambda: inspect(resource_id)), None
+        except Exception as e:
+            return resource_id, None, e
+
+    if len(unique) == 1 or max_workers <= 1:
+        done = [run(i) for i in unique]
+    else:
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(unique)))
+        try:
+            done = list(executor.map(run, unique))
+        finally:
+            executor.shutdown(wait=False)
+
+    for resource_id, value, error in done:
+        if error is None:
+            result.results[resource_id] = value
+        elif isinstance(error, NotFound):
+            result.not_found.add(resource_id)
+        else:
+            result.errors[resource_id] = error
+    return result
@@ -1,4 +1,5 @@
 # encoding=utf-8
+import re
 from functools import partial
 
 import docker.models.services
@@ -10,14 +11,38 @@ from docker import APIClient as Client
 from docker import DockerClient
 from docker.errors import APIError, ImageNotFound, NotFound
 from docker.tls import TLSConfig
-from docker.transport import SSLAdapter, UnixAdapter
+from docker.transport import UnixAdapter
+from docker.utils import convert_filters
 from docker.utils.utils import kwargs_from_env
 from requests.auth import HTTPBasicAuth
 
 from .envs import DEV_DOCKER_HOST
 from .envs import DEV_DOCKER_PASS
 from .envs import DEV_DOCKER_USER
+from .batch import batch_inspect
+from .registry import ClientRegistry
+from ..consts import DEFAULT_BATCH_INSPECT_WORKERS
+from ..consts import DEFAULT_CONNECT_TIMEOUT_SECONDS
+from ..consts import DEFAULT_DOCKER_CLIENTS_IDLE_TIMEOUT
+from ..consts import DEFAULT_DOCKER_CLIENTS_MAXSIZE
+from ..consts import DEFAULT_NODE_TIMEOUT_SECONDS
+from ..consts import DEFAULT_NUM_POOLS
+from ..consts import DEFAULT_POOL_MAXSIZE
+from ..consts import DEFAULT_STREAM_CHUNK_SIZE
 from ..errors import NotAuthorizedError
+from ..models.service import DEFAULT_FIELDS as DEFAULT_SERVICE_VIEW_FIELDS
+from ..models.service import ServiceView
+from ..transport import BREAKERS
+from ..transport import ControllerPool
+from ..transport import DEFAULT_RETRY
+from ..transport import INSTRUMENTATION
+from ..transport import PooledHTTPAdapter
+from ..transport import pool_stats
+from ..transport.cache import CachedResponse
+from ..utils.demux import STDOUT
+from ..utils.demux import demux_chunks
+from ..utils.jsonstream import iter_json_array
+from ..utils.memo import SingleFlight
 
 try:
     from docker.transport import NpipeAdapter
@@ -26,16 +51,29 @@ except ImportError:
 
 urllib3.disable_warnings()
 SWARM_CLIENT = None
-DOCKER_CLIENTS = {}
+DOCKER_CLIENTS = ClientRegistry(maxsize=DEFAULT_DOCKER_CLIENTS_MAXSIZE,
+                                idle_timeout=DEFAULT_DOCKER_CLIENTS_IDLE_TIMEOUT)
 DEFAULT_TIMEOUT_SECONDS = 180
+NODE_PROXY_PATH = re.compile(r'/(?:dce|api)/nodes/([^/]+)/docker')
 
 
 class DCEDockerAPIClient(Client):
     def __init__(self, base_url=None, version=None,
                  token=None, timeout=60, hostname='', username=None, password=None,
-                 user_agent='DiskCleaner/DCE-Plugin', tls=False, num_pools=25):
+                 user_agent='DiskCleaner/DCE-Plugin', tls=False, num_pools=DEFAULT_NUM_POOLS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT_SECONDS, retry=DEFAULT_RETRY, breakers=BREAKERS,
+                 controllers=None, response_cache=None, node_timeout=DEFAULT_NODE_TIMEOUT_SECONDS):
         super(DCEDockerAPIClient, self).__init__()
         self._hostname = ''
+        self.breakers = breakers
+        # an opt-in dce.transport.ResponseCache for read-mostly GET endpoints
+        self.response_cache = response_cache
+        # a dce.transport.ControllerPool spreading node proxy calls over every controller
+        if controllers is not None and not isinstance(controllers, ControllerPool):
+            controllers = ControllerPool(controllers)
+        self.controllers = controllers
+        self._inflight = SingleFlight()
         if base_url.startswith('http+unix://'):
             self._custom_adapter = UnixAdapter(
                 base_url, timeout, pool_connections=num_pools
@@ -44,19 +82,37 @@ class DCEDockerAPIClient(Client):
             # self._unmount('http://', 'https://')
             self.base_url = 'http+docker://localunixsocket'
         else:
-            # Use SSLAdapter for the ability to specify SSL version
+            # docker.APIClient unmounts the default http(s) adapters when it
+            # falls back to the local unix socket, mount keep-alive pools instead
+            # TLS options go to the same pools, not to a separate docker SSLAdapter
+            ssl_options = {}
             if isinstance(tls, TLSConfig):
-                tls.configure_client(self)
-            elif tls:
-                self._custom_adapter = SSLAdapter(pool_connections=num_pools)
-                self.mount('https://', self._custom_adapter)
+                ssl_options = dict(ssl_version=tls.ssl_version, assert_hostname=tls.assert_hostname,
+                                   assert_fingerprint=tls.assert_fingerprint)
+            self._pooled_adapter = PooledHTTPAdapter(
+                pool_connections=num_pools, pool_maxsize=pool_maxsize, pool_block=pool_block,
+                retry=retry, breakers=breakers, connect_timeout=connect_timeout, cache=response_cache,
+                **ssl_options
+            )
+            self.mount('http://', self._pooled_adapter)
+            self.mount('https://', self._pooled_adapter)
             self.base_url = base_url
+            if node_timeout and timeout and NODE_PROXY_PATH.search(base_url):
+                # calls passing their own timeout, e.g. stop(), keep it
+                timeout = min(timeout, node_timeout)
             self.timeout = timeout
             self.headers['User-Agent'] = user_agent
             self._version = version
             self.token = token
             self.username = username
             self.password = password
+            self.verify = False
+            if isinstance(tls, TLSConfig):
+                self.ssl_version = tls.ssl_version
+                if tls.verify:
+                    self.verify = tls.ca_cert or True
+                if tls.cert:
+                    self.cert = tls.cert
             if username and password:
                 self.auth = HTTPBasicAuth(username, password)
             if token:
@@ -68,9 +124,27 @@ class DCEDockerAPIClient(Client):
     def __repr__(self):
         return "<DCEDockerClient '%s'>" % self.base_url
 
-    def request_(self, *args, **kwargs):
-        kwargs.setdefault('verify', False)
-        return requests.api.request(*args, **kwargs)
+    def request_(self, method, url, *args, **kwargs):
+        kwargs.setdefault('verify', self.verify)
+        if self.controllers is None:
+            return Client.request(self, method, url, *args, **kwargs)
+        return self.controllers.send(partial(Client.request, self), method, url, *args, **kwargs)
+
+    def pool_stats(self):
+        """
+        :return: per host connection pool statistics, see :func:`dce.transport.pool_stats`
+        """
+        return pool_stats(self)
+
+    def breaker_state(self):
+        """
+        :return: 'closed', 'open' or 'half-open' for the node (or host) behind this client
+        """
+        return self.breakers.for_url(self.base_url).state if self.breakers is not None else None
+
+    @property
+    def circuit_open(self):
+        return self.breaker_state() == 'open'
 
     def _url_(self, pathfmt, *args, **kwargs):
         for arg in args:
@@ -84,12 +158,117 @@ class DCEDockerAPIClient(Client):
         args = map(quote_f, args)
         return '{0}{1}'.format(self.base_url, pathfmt.format(*args))
 
+    @property
+    def node_addr(self):
+        """
+        Advertised address of the node when talking through the DCE node proxy.
+        """
+        m = NODE_PROXY_PATH.search(self.base_url)
+        return m.group(1) if m else None
+
     @property
     def hostname(self):
         if not self._hostname:
             self._hostname = self.info()['Name']
         return self._hostname
 
+    def _iter_result(self, url, params=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """
+        Stream a JSON array response and yield its elements as they are parsed.
+        """
+        response = self._get(url, params=params, stream=True)
+        try:
+            self._raise_for_status(response)
+            for item in iter_json_array(response.iter_content(chunk_size)):
+                yield item
+        finally:
+            response.close()
+
+    @staticmethod
+    def _filter_params(filters, **params):
+        if filters:
+            params['filters'] = convert_filters(filters)
+        return params
+
+    def iter_services(self, filters=None):
+        return self._iter_result(self._url('/services'), self._filter_params(filters))
+
+    def iter_tasks(self, filters=None):
+        return self._iter_result(self._url('/tasks'), self._filter_params(filters))
+
+    def iter_nodes(self, filters=None):
+        return self._iter_result(self._url('/nodes'), self._filter_params(filters))
+
+    def iter_containers(self, all=False, size=False, filters=None):
+        params = self._filter_params(filters, all=1 if all else 0, size=1 if size else 0, limit=-1)
+        return self._iter_result(self._url('/containers/json'), params)
+
+    def _open_logs(self, container, stdout=True, stderr=True, timestamps=False, tail='all', since=None,
+                   follow=False):
+        params = {'stdout': int(bool(stdout)), 'stderr': int(bool(stderr)),
+                  'timestamps': int(bool(timestamps)), 'follow': int(bool(follow)), 'tail': tail}
+        if since is not None:
+            params['since'] = since
+        response = self._get(self._url('/containers/{0}/logs', container), params=params, stream=True,
+                             timeout=None if follow else self.timeout)
+        try:
+            self._raise_for_status(response)
+        except Exception:
+            response.close()
+            raise
+        return response
+
+    @staticmethod
+    def _iter_frames(response, tty, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        # stream() hands out every http chunk as soon as it arrives, read()
+        # would wait for chunk_size bytes of a followed log
+        chunks = response.raw.stream(chunk_size, decode_content=False)
+        if tty:
+            return ((STDOUT, memoryview(chunk)) for chunk in chunks)
+        return demux_chunks(chunks, chunk_size)
+
+    def iter_log_frames(self, container, stdout=True, stderr=True, timestamps=False, tail='all', since=None,
+                        follow=False, tty=None, chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+        """
+        Stream the logs of ``container`` as ``(stream, payload)`` pairs,
+        ``stream`` being :data:`dce.utils.demux.STDOUT`, ``STDERR`` or
+        ``SYSTEMERR``.
+
+        Payloads are ``memoryview`` s valid until the next pair is requested,
+        see :class:`dce.utils.demux.FrameDemuxer`.
+
+        :param tty: whether the container has a tty, inspected if None; the
+            logs of those are not multiplexed and only come as ``STDOUT``
+        :param since: a unix timestamp, ``'seconds.nanoseconds'`` for sub-second precision
+        """
+        if tty is None:
+            tty = self.inspect_container(container)['Config']['Tty']
+        response = self._open_logs(container, stdout, stderr, timestamps, tail, since, follow)
+        try:
+            for frame in self._iter_frames(response, tty, chunk_size):
+                yield frame
+        finally:
+            response.close()
+
+    def inspect_many(self, kind, ids, max_workers=DEFAULT_BATCH_INSPECT_WORKERS):
+        """
+        Inspect many services, containers, nodes, ... concurrently, sharing
+        in-flight inspects of the same id with other threads of this client.
+
+        :param kind: 'service', 'container', 'node', 'task', 'network', 'volume' or 'image'
+        :return: :class:`dce.dockerutils.batch.BatchResult`
+        """
+        return batch_inspect(self, kind, ids, max_workers=max_workers, single_flight=self._inflight)
+
+    def inspect_services(self, ids, max_workers=DEFAULT_BATCH_INSPECT_WORKERS):
+        return self.inspect_many('service', ids, max_workers)
+
+    def inspect_containers(self, ids, max_workers=DEFAULT_BATCH_INSPECT_WORKERS):
+        return self.inspect_many('container', ids, max_workers)
+
+    def inspect_nodes(self, ids, max_workers=DEFAULT_BATCH_INSPECT_WORKERS):
+        return self.inspect_many('node', ids, max_workers)
+
     def create_service_raw(self, service_spec, auth_header=None):
         headers = {}
         if auth_header:
@@ -107,30 +286,39 @@ class DCEDockerAPIClient(Client):
         try:
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
-            raise self.create_api_error_from_http_exception(e)
+            try:
+                raise self.create_api_error_from_http_exception(e)
+            except Exception as error:
+                if INSTRUMENTATION.enabled:
+                    INSTRUMENTATION.record_error(response, error)
+                raise
 
     def create_api_error_from_http_exception(self, e):
-        """
-        Create a suitable APIError from requests.exceptions.HTTPError.
-        """
-        response = e.response
-        try:
-            explanation = response.json()['message']
-        except ValueError:
-            explanation = response.content.strip()
-        cls = APIError
-        if response.status_code == 404:
-            if explanation and ('No such image' in str(explanation) or
-                                        'not found: does not exist or no pull access'
-                                    in str(explanation) or
-                                        'repository does not exist' in str(explanation)):
-                cls = ImageNotFound
-            else:
-                cls = NotFound
-        if response.status_code == 401:
-            cls = NotAuthorizedError
-
-        raise cls(e, response=response, explanation=explanation)
+        return create_api_error_from_http_exception(e)
+
+
+def create_api_error_from_http_exception(e):
+    """
+    Create a suitable APIError from requests.exceptions.HTTPError.
+    """
+    response = e.response
+    try:
+        explanation = response.json()['message']
+    except ValueError:
+        explanation = response.content.strip()
+    cls = APIError
+    if response.status_code == 404:
+        if explanation and ('No such image' in str(explanation) or
+                                    'not found: does not exist or no pull access'
+                                in str(explanation) or
+                                    'repository does not exist' in str(explanation)):
+            cls = ImageNotFound
+        else:
+            cls = NotFound
+    if response.status_code == 401:
+        cls = NotAuthorizedError
+
+    raise cls(e, response=response, explanation=explanation)
 
 
 class DCEService(docker.models.services.Service):
@@ -175,18 +363,26 @@ class DCEService(docker.models.services.Service):
         return self.attrs.get('Endpoint', {}).get('Ports', [])
 
 
-# monkey patch TODO: may not patch to default docker module
-docker.models.services.Service = DCEService
-docker.models.services.ServiceCollection.model = DCEService
+class DCEServiceCollection(docker.models.services.ServiceCollection):
+    model = DCEService
+
+
+def patch_docker_service_model():
+    """
+    Make every docker-py ``DockerClient`` build :class:`DCEService` models, as
+    importing this module used to. :class:`DCEDockerClient` does so without it.
+    """
+    docker.models.services.Service = DCEService
+    docker.models.services.ServiceCollection.model = DCEService
 
 
 def dce_docker_api_client(base_url='http+unix://var/run/docker.sock', token=None, username=None, password=None,
                           hostname='', timeout=DEFAULT_TIMEOUT_SECONDS, tls=False, dev=False):
-    global DOCKER_CLIENTS
     if dev and base_url.endswith('.sock'):
         return DCEDockerAPIClient(DEV_DOCKER_HOST, username=DEV_DOCKER_USER, password=DEV_DOCKER_PASS)
-    key = tuple(map(str, [base_url, token, username, password, hostname, timeout, tls]))
-    if not base_url in DOCKER_CLIENTS:
+    key = (base_url, token, username, password, hostname, timeout, tls)
+
+    def factory():
         kwargs = kwargs_from_env(assert_hostname=False)
         kwargs['base_url'] = base_url
         kwargs['timeout'] = timeout
@@ -194,11 +390,69 @@ def dce_docker_api_client(base_url='http+unix://var/run/docker.sock', token=None
         kwargs['username'] = username
         kwargs['password'] = password
         kwargs['token'] = token
-        DOCKER_CLIENTS[key] = DCEDockerAPIClient(**kwargs)
+        return DCEDockerAPIClient(**kwargs)
 
-    return DOCKER_CLIENTS[key]
+    return DOCKER_CLIENTS.get_or_create(key, factory)
 
 
 class DCEDockerClient(DockerClient):
     def __init__(self, *args, **kwargs):
         self.api = dce_docker_api_client(*args, **kwargs)
+
+    @classmethod
+    def from_api_client(cls, api):
+        """
+        Wrap an existing :class:`DCEDockerAPIClient` instead of looking one up.
+        """
+        client = cls.__new__(cls)
+        client.api = api
+        return client
+
+    @property
+    def services(self):
+        return DCEServiceCollection(client=self)
+
+    def iter_services(self, filters=None):
+        """
+        Like ``services.list()`` but yields models while the listing is downloaded.
+        """
+        for attrs in self.api.iter_services(filters=filters):
+            yield self.services.prepare_model(attrs)
+
+    def iter_service_views(self, filters=None, fields=DEFAULT_SERVICE_VIEW_FIELDS, keep_attrs=False):
+        """
+        Yields compact :class:`dce.models.ServiceView` objects holding only ``fields``.
+        """
+        for attrs in self.api.iter_services(filters=filters):
+            yield ServiceView(attrs, fields=fields, client=self.api, keep_attrs=keep_attrs)
+
+    def service_views(self, filters=None, fields=DEFAULT_SERVICE_VIEW_FIELDS):
+        """
+        The :class:`dce.models.ServiceView` s of a buffered listing. Through a
+        ``response_cache``, the views of a listing that did not change are
+        reused instead of decoded and built again.
+        """
+        api = self.api
+        response = api._get(api._url('/services'), params=api._filter_params(filters))
+
+        def build(services):
+            return [ServiceView(attrs, fields=fields, client=api) for attrs in services]
+
+        if isinstance(response, CachedResponse):
+            return list(response.models(('service_views', fields), build))
+        return build(api._result(response, True))
+
+    def iter_containers(self, all=False, filters=None):
+        """
+        Yields containers built from the listing summary, without the
+        per-container inspect ``containers.list()`` does.
+        """
+        for attrs in self.api.iter_containers(all=all, filters=filters):
+            yield self.containers.prepare_model(attrs)
+
+    def iter_nodes(self, filters=None):
+        for attrs in self.api.iter_nodes(filters=filters):
+            yield self.nodes.prepare_model(attrs)
+
+    def iter_tasks(self, filters=None):
+        return self.api.iter_tasks(filters=filters)
@@ -0,0 +1,356 @@
+# coding=utf-8
+"""
+Disk usage of images, containers, volumes and build cache across the
+cluster, from ``/system/df`` of every node, and its cleanup.
+"""
+import logging
+import threading
+from collections import deque
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .fanout import fan_out
+from .fanout import node_key
+from ..consts import DEFAULT_CLEANUP_PER_NODE
+from ..consts import DEFAULT_FAN_OUT_WORKERS
+
+log = logging.getLogger(__name__)
+
+UNTAGGED = '<none>:<none>'
+
+CleanupAction = namedtuple('CleanupAction', ['node', 'kind', 'target', 'size'])
+
+
+def _size(value):
+    # -1 when the daemon did not compute it
+    return value if value and value > 0 else 0
+
+
+class ImageUsage(object):
+    """
+    One image, by id (the digest of its config), over every node it is on.
+
+    ``reclaimable`` sums, over the nodes where no container uses the image,
+    the size of its layers shared with no other image of the node: what
+    removing it frees there.
+    """
+
+    __slots__ = ('id', 'tags', 'digests', 'size', 'nodes', 'unused_nodes', 'reclaimable', 'created')
+
+    def __init__(self, image_id, size, created):
+        self.id = image_id
+        self.size = size
+        self.created = created
+        self.tags = set()
+        self.digests = set()
+        self.nodes = []
+        self.unused_nodes = []
+        self.reclaimable = 0
+
+    def __repr__(self):
+        return '<ImageUsage %s nodes=%d unused=%d>' % (self.id[:19], len(self.nodes), len(self.unused_nodes))
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'tags': sorted(self.tags),
+            'digests': sorted(self.digests),
+            'size': self.size,
+            'nodes': sorted(self.nodes),
+            'unused_nodes': sorted(self.unused_nodes),
+            'reclaimable': self.reclaimable,
+        }
+
+
+class NodeUsage(object):
+    """
+    Disk usage of one node. Only what cleanup needs is kept of ``/system/df``:
+    ``(id, tags, created, unique size)`` of unused images, ``(name, size)`` of
+    unused volumes and ``(id, size)`` of stopped containers.
+    """
+
+    __slots__ = ('node', 'layers_size', 'images_size', 'images_reclaimable', 'containers_size',
+                 'containers_reclaimable', 'volumes_size', 'volumes_reclaimable', 'build_cache_size',
+                 'build_cache_reclaimable', 'unused_images', 'unused_volumes', 'stopped_containers')
+
+    def __init__(self, node):
+        self.node = node
+        self.layers_size = 0
+        self.images_size = self.images_reclaimable = 0
+        self.containers_size = self.containers_reclaimable = 0
+        self.volumes_size = self.volumes_reclaimable = 0
+        self.build_cache_size = self.build_cache_reclaimable = 0
+        self.unused_images = []
+        self.unused_volumes = []
+        self.stopped_containers = []
+
+    def __repr__(self):
+        return '<NodeUsage %s reclaimable=%d>' % (self.node, self.reclaimable)
+
+    @property
+    def reclaimable(self):
+        return (self.images_reclaimable + self.containers_reclaimable + self.volumes_reclaimable +
+                self.build_cache_reclaimable)
+
+    def as_dict(self):
+        return {
+            'layers_size': self.layers_size,
+            'images': {'size': self.images_size, 'reclaimable': self.images_reclaimable,
+                       'unused': len(self.unused_images)},
+            'containers': {'size': self.containers_size, 'reclaimable': self.containers_reclaimable,
+                           'stopped': len(self.stopped_containers)},
+            'volumes': {'size': self.volumes_size, 'reclaimable': self.volumes_reclaimable,
+                        'unused': len(self.unused_volumes)},
+            'build_cache': {'size': self.build_cache_size, 'reclaimable': self.build_cache_reclaimable},
+            'reclaimable': self.reclaimable,
+        }
+
+
+class DiskUsageReport(object):
+    """
+    ``/system/df`` of every node, with images deduplicated by id across nodes.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.images = {}
+        self.errors = {}
+
+    def __repr__(self):
+        return '<DiskUsageReport nodes=%d images=%d reclaimable=%d>' % (
+            len(self.nodes), len(self.images), self.reclaimable)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def reclaimable(self):
+        return sum(n.reclaimable for n in self.nodes.values())
+
+    @property
+    def layers_size(self):
+        """
+        Bytes of image layers on disk, summed over the nodes.
+        """
+        return sum(n.layers_size for n in self.nodes.values())
+
+    @property
+    def unique_images_size(self):
+        """
+        Bytes of the distinct images of the cluster, each counted once.
+        """
+        return sum(i.size for i in self.images.values())
+
+    def unused_volumes(self):
+        """
+        :return: [(node, volume name, size), ...], largest first
+        """
+        volumes = [(n.node, name, size) for n in self.nodes.values() for name, size in n.unused_volumes]
+        return sorted(volumes, key=lambda v: v[2], reverse=True)
+
+    def top_images(self, n=10):
+        """
+        :return: the ``n`` images freeing the most bytes cluster-wide
+        """
+        return sorted(self.images.values(), key=lambda i: i.reclaimable, reverse=True)[:n]
+
+    def add(self, node, df):
+        usage = self.nodes[node] = NodeUsage(node)
+        usage.layers_size = _size(df.get('LayersSize'))
+
+        for image in df.get('Images') or ():
+            size = _size(image.get('Size'))
+            unique = max(size - _size(image.get('SharedSize')), 0)
+            usage.images_size += size
+            entry = self.images.get(image['Id'])
+            if entry is None:
+                entry = self.images[image['Id']] = ImageUsage(image['Id'], size, image.get('Created', 0))
+            entry.tags.update(t for t in image.get('RepoTags') or () if t != UNTAGGED)
+            entry.digests.update(image.get('RepoDigests') or ())
+            entry.nodes.append(node)
+            if image.get('Containers') == 0:
+                entry.unused_nodes.append(node)
+                entry.reclaimable += unique
+                usage.images_reclaimable += unique
+                tags = tuple(t for t in image.get('RepoTags') or () if t != UNTAGGED)
+                usage.unused_images.append((image['Id'], tags, image.get('Created', 0), unique))
+
+        for container in df.get('Containers') or ():
+            size = _size(container.get('SizeRw'))
+            usage.containers_size += size
+            if container.get('State') not in ('running', 'paused', 'restarting'):
+                usage.containers_reclaimable += size
+                usage.stopped_containers.append((container['Id'], size))
+
+        for volume in df.get('Volumes') or ():
+            data = volume.get('UsageData') or {}
+            size = _size(data.get('Size'))
+            usage.volumes_size += size
+            if data.get('RefCount') == 0:
+                usage.volumes_reclaimable += size
+                usage.unused_volumes.append((volume['Name'], size))
+
+        for record in df.get('BuildCache') or ():
+            size = _size(record.get('Size'))
+            usage.build_cache_size += size
+            if not record.get('InUse') and not record.get('Shared'):
+                usage.build_cache_reclaimable += size
+        return usage
+
+    def summary(self):
+        """
+        A compact, JSON serializable view of the report.
+        """
+        return {
+            'reclaimable': self.reclaimable,
+            'layers_size': self.layers_size,
+            'unique_images_size': self.unique_images_size,
+            'nodes': dict((node, usage.as_dict()) for node, usage in self.nodes.items()),
+            'images': [i.as_dict() for i in self.top_images(len(self.images)) if i.reclaimable],
+            'unused_volumes': self.unused_volumes(),
+            'errors': dict((node, str(e)) for node, e in self.errors.items()),
+        }
+
+
+class CleanupResult(object):
+    def __init__(self):
+        self.done = []
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def freed(self):
+        """
+        :return: {node: bytes}, as estimated by the report, or reported by the
+            daemon for the build cache
+        """
+        freed = {}
+        for action in self.done:
+            freed[action.node] = freed.get(action.node, 0) + action.size
+        return freed
+
+    def __repr__(self):
+        return '<CleanupResult done=%d errors=%d>' % (len(self.done), len(self.errors))
+
+
+class DiskUsageScanner(object):
+    """
+    Scans and cleans the disks of every node behind ``clients``, e.g.
+    ``get_node_docker_api_clients()``.
+
+    :meth:`scan` collects ``/system/df`` of all nodes concurrently,
+    :meth:`cleanup` removes what a report found reclaimable, in parallel over
+    the nodes but with at most ``per_node`` removals at a time on each.
+    """
+
+    def __init__(self, clients, max_workers=DEFAULT_FAN_OUT_WORKERS, per_node=DEFAULT_CLEANUP_PER_NODE,
+                 timeout=None):
+        self.clients = dict((node_key(c), c) for c in (getattr(c, 'api', c) for c in clients))
+        self.max_workers = max_workers
+        self.per_node = per_node
+        self.timeout = timeout
+
+    def scan(self):
+        """
+        :return: a :class:`DiskUsageReport`, unreachable nodes are in its ``errors``
+        """
+        result = fan_out(list(self.clients.values()), 'df', max_workers=self.max_workers,
+                         timeout=self.timeout, skip_open=True)
+        report = DiskUsageReport()
+        for node in sorted(result.results):
+            report.add(node, result.results[node])
+        report.errors.update(result.errors)
+        return report
+
+    def plan(self, report, images=True, volumes=True, containers=False, build_cache=False, keep_image=None):
+        """
+        The :class:`CleanupAction` s of ``report``, per node.
+
+        :param keep_image: ``keep_image(image_usage)``, true for images not to remove
+        """
+        actions = {}
+        for node, usage in report.nodes.items():
+            todo = actions[node] = []
+            if containers:
+                todo.extend(CleanupAction(node, 'container', c, size) for c, size in usage.stopped_containers)
+            if images:
+                # children are newer than their parents, removing a parent first fails
+                for image_id, tags, _, size in sorted(usage.unused_images, key=lambda i: i[2], reverse=True):
+                    if keep_image is not None and keep_image(report.images[image_id]):
+                        continue
+                    todo.append(CleanupAction(node, 'image', (image_id, tags), size))
+            if volumes:
+                todo.extend(CleanupAction(node, 'volume', name, size) for name, size in usage.unused_volumes)
+            if build_cache and usage.build_cache_reclaimable:
+                todo.append(CleanupAction(node, 'build_cache', None, 0))
+        return actions
+
+    def cleanup(self, report, images=True, volumes=True, containers=False, build_cache=False, keep_image=None,
+                dry_run=False):
+        """
+        Remove the unused images and volumes (and stopped containers, build
+        cache) of ``report``. Failures, e.g. an image that got used since the
+        scan, are collected in the result and do not stop the cleanup.
+
+        :param dry_run: only return the planned actions in ``result.done``
+        :return: a :class:`CleanupResult`
+        """
+        plan = self.plan(report, images, volumes, containers, build_cache, keep_image)
+        result = CleanupResult()
+        if dry_run:
+            result.done = [a for node in sorted(plan) for a in plan[node]]
+            return result
+
+        lock = threading.Lock()
+
+        def lane(node, queue):
+            client = self.clients[node]
+            while True:
+                try:
+                    action = queue.popleft()
+                except IndexError:
+                    return
+                try:
+                    done = self._run(client, action)
+                except Exception as e:
+                    log.warning('Could not remove %s %s on %s: %s', action.kind, action.target, node, e)
+                    with lock:
+                        result.errors.append((action, e))
+                else:
+                    with lock:
+                        result.done.append(done)
+
+        queues = [(node, deque(plan[node])) for node in sorted(plan) if node in self.clients and plan[node]]
+        # lanes of every node are interleaved so all nodes start right away
+        lanes = [(node, queue) for i in range(self.per_node) for node, queue in queues if i < len(queue)]
+        if not lanes:
+            return result
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(lanes)))
+        try:
+            for future in [executor.submit(lane, node, queue) for node, queue in lanes]:
+                future.result()
+        finally:
+            executor.shutdown(wait=False)
+        return result
+
+    @staticmethod
+    def _run(client, action):
+        if action.kind == 'container':
+            client.remove_container(action.target)
+        elif action.kind == 'image':
+            image_id, tags = action.target
+            # an image with several tags is only deleted with its last tag
+            for reference in tags or (image_id,):
+                client.remove_image(reference)
+        elif action.kind == 'volume':
+            client.remove_volume(action.target)
+        elif action.kind == 'build_cache':
+            response = client._result(client._post(client._url('/build/prune')), True)
+            return action._replace(size=response.get('SpaceReclaimed') or 0)
+        else:
+            raise ValueError('Unknown cleanup action {0}'.format(action.kind))
+        return action
@@ -0,0 +1,239 @@
+# coding=utf-8
+import json
+import logging
+import threading
+from collections import namedtuple
+
+import six
+from docker.utils import convert_filters
+
+from ..consts import DEFAULT_STOP_TIMEOUT
+from ..utils.sockets import shutdown_response
+
+log = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['type', 'action', 'id', 'attributes', 'time_nano', 'scope', 'node', 'raw'])
+
+
+def parse_event(raw, node=None):
+    actor = raw.get('Actor') or {}
+    time_nano = raw.get('timeNano') or int(raw.get('time', 0)) * 1000000000
+    return Event(
+        type=raw.get('Type') or 'container',
+        action=raw.get('Action') or raw.get('status'),
+        id=actor.get('ID') or raw.get('id'),
+        attributes=actor.get('Attributes') or {},
+        time_nano=time_nano,
+        scope=raw.get('scope'),
+        node=node,
+        raw=raw,
+    )
+
+
+class EventDispatcher(object):
+    def __init__(self):
+        self._subscribers = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, type=None, action=None):
+        """
+        Call ``callback(event)`` for events matching ``type`` (e.g. ``'service'``)
+        and ``action`` (e.g. ``'update'``), each a string, a collection of strings
+        or None for any.
+
+        :return: a token for :meth:`unsubscribe`
+        """
+        types = (type,) if isinstance(type, six.string_types) else type
+        actions = (action,) if isinstance(action, six.string_types) else action
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = (callback, types and frozenset(types), actions and frozenset(actions))
+            return self._next_token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for callback, types, actions in subscribers:
+            if types and event.type not in types:
+                continue
+            if actions and event.action not in actions:
+                continue
+            try:
+                callback(event)
+            except Exception:
+                log.exception('Event subscriber %r failed on %s %s', callback, event.type, event.action)
+
+
+class EventWatcher(EventDispatcher):
+    """
+    Keeps a ``/events`` stream of one docker client open in a background
+    thread and dispatches typed :class:`Event` objects to subscribers.
+
+    On disconnect it reconnects with ``since`` set to the last seen event, with
+    exponential backoff, and drops events replayed at that same timestamp, so
+    no event is lost or delivered twice.
+    """
+
+    def __init__(self, client, filters=None, since=None, reconnect_delay=1, max_reconnect_delay=30,
+                 dispatcher=None):
+        super(EventWatcher, self).__init__()
+        self.client = getattr(client, 'api', client)
+        self.node = getattr(self.client, 'node_addr', None)
+        self.filters = filters
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.dispatcher = dispatcher or self
+        self.last_time_nano = int(since * 1000000000) if since else None
+        self.reconnects = 0
+        self.received = 0
+        self._seen_at_last = set()
+        self._response = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='dce-events-%s' % (self.node or 'controller'))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=DEFAULT_STOP_TIMEOUT):
+        self._stopped.set()
+        response = self._response
+        if response is not None:
+            # unblocks the reading thread
+            shutdown_response(response)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _params(self):
+        params = {}
+        if self.last_time_nano:
+            params['since'] = '%d.%09d' % divmod(self.last_time_nano, 1000000000)
+        if self.filters:
+            params['filters'] = convert_filters(self.filters)
+        return params
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            try:
+                response = self.client._get(self.client._url('/events'), params=self._params(),
+                                            stream=True, timeout=None)
+                self._response = response
+                self.client._raise_for_status(response)
+                delay = self.reconnect_delay
+                for line in response.iter_lines():
+                    if line:
+                        self._handle(json.loads(line.decode('utf-8') if isinstance(line, bytes) else line))
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                log.warning('Event stream of %s failed: %s', self.node or self.client.base_url, e)
+            finally:
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+            if self._stopped.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+            self.reconnects += 1
+
+    def _handle(self, raw):
+        event = parse_event(raw, node=self.node)
+        key = (event.id, event.type, event.action)
+        if self.last_time_nano is not None:
+            if event.time_nano < self.last_time_nano:
+                return
+            if event.time_nano == self.last_time_nano:
+                if key in self._seen_at_last:
+                    return
+                self._seen_at_last.add(key)
+            else:
+                self._seen_at_last = {key}
+        else:
+            self._seen_at_last = {key}
+        self.last_time_nano = event.time_nano
+        self.received += 1
+        self.dispatcher.dispatch(event)
+
+
+class ClusterEventWatcher(EventDispatcher):
+    """
+    One :class:`EventWatcher` per client, e.g. from ``get_node_docker_api_clients``,
+    all dispatching to the same subscribers. ``event.node`` tells the nodes apart.
+    """
+
+    def __init__(self, clients, filters=None, **kwargs):
+        super(ClusterEventWatcher, self).__init__()
+        self.watchers = [EventWatcher(c, filters=filters, dispatcher=self, **kwargs) for c in clients]
+
+    def start(self):
+        for w in self.watchers:
+            w.start()
+        return self
+
+    def stop(self, timeout=DEFAULT_STOP_TIMEOUT):
+        for w in self.watchers:
+            w.stop(timeout)
+
+    def stats(self):
+        return dict((w.node or w.client.base_url, {
+            'running': w.running,
+            'received': w.received,
+            'reconnects': w.reconnects,
+            'last_time_nano': w.last_time_nano,
+        }) for w in self.watchers)
+
+
+def bind_inventory(watcher, inventory):
+    """
+    Keep a :class:`dce.dockerutils.inventory.ServiceInventory` in sync with service events.
+    """
+
+    def on_service(event):
+        if event.action == 'remove':
+            inventory.remove(event.id)
+        else:
+            inventory.update(event.id)
+
+    return watcher.subscribe(on_service, type='service', action=('create', 'update', 'remove'))
+
+
+def bind_metadata(watcher, metadata):
+    """
+    Invalidate ``info`` of a :class:`dce.api.metadata.MetadataCache` when the
+    cluster membership or daemon configuration changes.
+    """
+
+    def on_change(event):
+        metadata.invalidate('info')
+
+    return watcher.subscribe(on_change, type=('node', 'daemon'))
+
+
+def bind_topology(watcher, topology):
+    """
+    Refresh a :class:`dce.dockerutils.topology.ClusterTopology` as soon as nodes
+    join, leave or change, instead of waiting for its next periodic refresh.
+    """
+
+    def on_node(event):
+        try:
+            topology.refresh()
+        except Exception as e:
+            log.warning('Cluster topology refresh failed: %s', e)
+
+    return watcher.subscribe(on_node, type='node')
@@ -0,0 +1,124 @@
+# coding=utf-8
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from ..consts import DEFAULT_FAN_OUT_WORKERS
+from ..errors import CircuitOpenError
+from ..errors import FanOutTimeout
+
+
+def node_key(client):
+    """
+    Identify a per-node client by its advertised address, falling back to its url.
+    """
+    return getattr(client, 'node_addr', None) or getattr(client, 'base_url', client)
+
+
+class FanOutResult(object):
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return '<FanOutResult results=%d errors=%d>' % (len(self.results), len(self.errors))
+
+
+def _resolve_call(call, args, kwargs):
+    if callable(call):
+        return lambda client: call(client, *args, **kwargs)
+    return lambda client: getattr(client, call)(*args, **kwargs)
+
+
+def iter_fan_out(clients, call, args=(), kwargs=None, max_workers=DEFAULT_FAN_OUT_WORKERS,
+                 timeout=None, key=node_key, skip_open=False):
+    """
+    Run ``call`` on every client concurrently and yield ``(key, result, error)``
+    as each node completes. ``call`` is a method name of the client or a
+    callable taking the client as first argument.
+
+    :param timeout: per node timeout in seconds, counted from the moment the
+        call starts running. Nodes exceeding it are reported with a
+        :class:`dce.errors.FanOutTimeout` error and no longer waited for.
+    :param skip_open: report nodes whose circuit breaker is open right away
+        with a :class:`dce.errors.CircuitOpenError` instead of calling them
+    """
+    clients = list(clients)
+    if skip_open:
+        for client in [c for c in clients if getattr(c, 'circuit_open', False)]:
+            clients.remove(client)
+            yield key(client), None, CircuitOpenError('Circuit breaker open for {0}'.format(key(client)))
+    if not clients:
+        return
+    fn = _resolve_call(call, args, kwargs or {})
+    started = {}
+    lock = threading.Lock()
+
+    def run(i, client):
+        with lock:
+            started[i] = time.time()
+        return fn(client)
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(clients)))
+    pending = {}
+    try:
+        pending = dict((executor.submit(run, i, c), (i, c)) for i, c in enumerate(clients))
+        while pending:
+            wait_for = None
+            if timeout:
+                with lock:
+                    deadlines = [started[i] + timeout for i, _ in pending.values() if i in started]
+                wait_for = max(min(deadlines) - time.time(), 0) if deadlines else timeout
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                _, client = pending.pop(future)
+                error = future.exception()
+                yield key(client), None if error else future.result(), error
+            if timeout:
+                now = time.time()
+                with lock:
+                    expired = [f for f, (i, _) in pending.items() if i in started and now - started[i] >= timeout]
+                for future in expired:
+                    _, client = pending.pop(future)
+                    yield key(client), None, FanOutTimeout(
+                        '{0} did not complete within {1}s'.format(key(client), timeout)
+                    )
+    finally:
+        for future in list(pending):
+            future.cancel()
+        # don't block on stragglers that already timed out
+        executor.shutdown(wait=False)
+
+
+def fan_out(clients, call, args=(), kwargs=None, max_workers=DEFAULT_FAN_OUT_WORKERS,
+            timeout=None, key=node_key, skip_open=False):
+    """
+    Like :func:`iter_fan_out` but collect everything into a :class:`FanOutResult`.
+    """
+    result = FanOutResult()
+    for k, value, error in iter_fan_out(clients, call, args, kwargs, max_workers, timeout, key, skip_open):
+        if error is not None:
+            result.errors[k] = error
+        else:
+            result.results[k] = value
+    return result
+
+
+def map_concurrently(fn, items, max_workers=DEFAULT_FAN_OUT_WORKERS):
+    """
+    Ordered, concurrent ``map``; the first error is raised.
+    """
+    items = list(items)
+    if not items:
+        return []
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        return list(executor.map(fn, items))
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,159 @@
+# coding=utf-8
+import threading
+import time
+from collections import defaultdict
+
+from docker.errors import NotFound
+
+from ..models.service import DEFAULT_FIELDS
+from ..models.service import ServiceView
+from ..utils import str2bool
+
+INDEXED_FIELDS = ('tenant', 'owner', 'app_name', 'is_system', 'published_ports')
+
+
+def _system_flag(view):
+    return str2bool(view.is_system, bool(view.is_system))
+
+
+class ServiceInventory(object):
+    """
+    In-memory service inventory with secondary indexes on tenant, owner, stack
+    (``app_name``), the system flag and published ports.
+
+    :meth:`refresh` diffs the listing by ``Version.Index``: unchanged services
+    keep their :class:`dce.models.ServiceView` and index entries, only added,
+    updated and removed services are (re)indexed.
+    """
+
+    def __init__(self, client, filters=None, fields=DEFAULT_FIELDS):
+        self.client = getattr(client, 'api', client)
+        self.filters = filters
+        self.fields = tuple(fields) + tuple(f for f in ('version',) + INDEXED_FIELDS if f not in fields)
+        self.last_refresh = None
+        self._services = {}
+        self._indexes = dict((name, defaultdict(set)) for name in INDEXED_FIELDS)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._services)
+
+    def __contains__(self, service_id):
+        return service_id in self._services
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._services.values()))
+
+    def refresh(self):
+        """
+        :return: {'added': n, 'updated': n, 'removed': n, 'unchanged': n}
+        """
+        seen = set()
+        changed = []
+        current = self._services
+        for attrs in self.client.iter_services(filters=self.filters):
+            service_id = attrs['ID']
+            seen.add(service_id)
+            old = current.get(service_id)
+            if old is not None and old.version == attrs.get('Version', {}).get('Index'):
+                continue
+            changed.append(ServiceView(attrs, fields=self.fields, client=self.client))
+
+        with self._lock:
+            stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+            for view in changed:
+                stats['updated' if view.id in self._services else 'added'] += 1
+                self._put(view)
+            for service_id in [s for s in self._services if s not in seen]:
+                self._remove(service_id)
+                stats['removed'] += 1
+            stats['unchanged'] = len(self._services) - stats['added'] - stats['updated']
+            self.last_refresh = time.time()
+        return stats
+
+    def update(self, service_id):
+        """
+        Re-inspect a single service, e.g. after a service event.
+        """
+        try:
+            attrs = self.client.inspect_service(service_id)
+        except NotFound:
+            self.remove(service_id)
+            return None
+        view = ServiceView(attrs, fields=self.fields, client=self.client)
+        with self._lock:
+            self._put(view)
+        return view
+
+    def remove(self, service_id):
+        with self._lock:
+            self._remove(service_id)
+
+    def get(self, service_id):
+        return self._services.get(service_id)
+
+    def by_tenant(self, tenant):
+        return self.query(tenant=tenant)
+
+    def by_owner(self, owner):
+        return self.query(owner=owner)
+
+    def by_app(self, app_name):
+        return self.query(app_name=app_name)
+
+    def by_port(self, port, is_system=None):
+        return self.query(port=port, is_system=is_system)
+
+    def query(self, tenant=None, owner=None, app_name=None, is_system=None, port=None):
+        """
+        Services matching every given criterion, e.g. non-system services
+        publishing port 80: ``query(is_system=False, port=80)``.
+        """
+        criteria = [(name, value) for name, value in (('tenant', tenant), ('owner', owner), ('app_name', app_name),
+                                                      ('is_system', is_system), ('published_ports', port))
+                    if value is not None]
+        with self._lock:
+            if not criteria:
+                return list(self._services.values())
+            sets = sorted((self._indexes[name].get(value, ()) for name, value in criteria), key=len)
+            ids = set(sets[0])
+            for s in sets[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(s)
+            return [self._services[i] for i in ids]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'services': len(self._services),
+                'last_refresh': self.last_refresh,
+                'indexes': dict((name, len(index)) for name, index in self._indexes.items()),
+            }
+
+    def _keys(self, view):
+        yield 'tenant', view.tenant
+        yield 'owner', view.owner
+        yield 'app_name', view.app_name
+        yield 'is_system', _system_flag(view)
+        for port in view.published_ports:
+            yield 'published_ports', port
+
+    def _put(self, view):
+        self._remove(view.id)
+        self._services[view.id] = view
+        for name, value in self._keys(view):
+            if value is not None:
+                self._indexes[name][value].add(view.id)
+
+    def _remove(self, service_id):
+        view = self._services.pop(service_id, None)
+        if view is None:
+            return
+        for name, value in self._keys(view):
+            ids = self._indexes[name].get(value)
+            if ids is not None:
+                ids.discard(service_id)
+                if not ids:
+                    del self._indexes[name][value]
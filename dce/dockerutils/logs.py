@@ -0,0 +1,313 @@
+# coding=utf-8
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from docker.errors import NotFound
+from six.moves import queue
+
+from .fanout import node_key
+from .timestamps import parse_docker_timestamp
+from ..consts import DEFAULT_LOG_BUFFER_LINES
+from ..consts import DEFAULT_LOG_REORDER_WINDOW
+from ..consts import DEFAULT_LOG_STREAMS
+from ..consts import DEFAULT_STOP_TIMEOUT
+from ..utils.sockets import shutdown_response
+
+log = logging.getLogger(__name__)
+
+LogLine = namedtuple('LogLine', ['time_nano', 'node', 'container', 'stream', 'message'])
+
+
+def service_log_targets(topology, service):
+    """
+    ``(node client, container id)`` of every running task of ``service``,
+    for a :class:`LogAggregator`.
+
+    :param topology: a :class:`dce.dockerutils.topology.ClusterTopology`
+    :param service: service name or id
+    """
+    tasks = topology.client.tasks(filters={'service': service, 'desired-state': 'running'})
+    targets = []
+    for task in tasks:
+        container = ((task.get('Status') or {}).get('ContainerStatus') or {}).get('ContainerID')
+        client = topology.node_client_by_id(task.get('NodeID')) if container else None
+        if client is None:
+            log.debug('Skipping task %s of %s, no container or unknown node', task.get('ID'), service)
+            continue
+        targets.append((client, container))
+    return targets
+
+
+class _StreamState(object):
+    __slots__ = ('last_time_nano', 'emitted_at_last', 'seen_at_last', 'partial')
+
+    def __init__(self):
+        self.last_time_nano = None
+        # lines at last_time_nano delivered, and seen since the stream was
+        # (re)opened: lines are told apart by their position, not their text
+        self.emitted_at_last = 0
+        self.seen_at_last = 0
+        self.partial = b''
+
+
+class _ContainerLogReader(object):
+    """
+    Follows the logs of one container for a :class:`LogAggregator`,
+    reconnecting from the last seen timestamp.
+    """
+
+    def __init__(self, aggregator, client, container, tty=None):
+        self.aggregator = aggregator
+        self.client = getattr(client, 'api', client)
+        self.node = node_key(self.client)
+        self.container = container
+        self.tty = tty
+        self.received = 0
+        self.duplicates = 0
+        self.reconnects = 0
+        self.error = None
+        self._streams = {}
+        self._response = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='dce-logs-%s' % self.container[:12])
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        response = self._response
+        if response is not None:
+            # unblocks the reading thread
+            shutdown_response(response)
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _since(self):
+        times = [s.last_time_nano for s in self._streams.values() if s.last_time_nano is not None]
+        if not times:
+            return self.aggregator.since
+        # docker's since is inclusive, lines at that very timestamp are deduplicated
+        return '%d.%09d' % divmod(min(times), 1000000000)
+
+    def _run(self):
+        aggregator = self.aggregator
+        stopped = aggregator._stopped
+        delay = aggregator.reconnect_delay
+        try:
+            while not stopped.is_set():
+                with aggregator._slots:
+                    if stopped.is_set():
+                        return
+                    reconnect = bool(self._streams)
+                    try:
+                        if self.tty is None:
+                            self.tty = self.client.inspect_container(self.container)['Config']['Tty']
+                        self._response = self.client._open_logs(
+                            self.container, aggregator.stdout, aggregator.stderr, timestamps=True,
+                            tail='all' if reconnect else aggregator.tail, since=self._since(),
+                            follow=aggregator.follow)
+                        delay = aggregator.reconnect_delay
+                        for stream, payload in self.client._iter_frames(self._response, self.tty):
+                            self._feed(stream, payload)
+                        for stream in list(self._streams):
+                            self._flush(stream)
+                        return
+                    except NotFound as e:
+                        # the container is gone
+                        self.error = e
+                        return
+                    except Exception as e:
+                        if stopped.is_set():
+                            return
+                        self.error = e
+                        log.warning('Log stream of %s on %s failed: %s', self.container, self.node, e)
+                    finally:
+                        self.close()
+                        self._response = None
+                # the stream slot is released while waiting to reconnect
+                if stopped.wait(delay):
+                    return
+                delay = min(delay * 2, aggregator.max_reconnect_delay)
+                self.reconnects += 1
+                for state in self._streams.values():
+                    # resent in full after reconnecting
+                    state.partial = b''
+                    state.seen_at_last = 0
+        finally:
+            aggregator._put((self, None))
+
+    def _feed(self, stream, payload):
+        state = self._streams.get(stream)
+        if state is None:
+            state = self._streams[stream] = _StreamState()
+        data = state.partial + bytes(payload) if state.partial else bytes(payload)
+        lines = data.split(b'\n')
+        state.partial = lines.pop()
+        for line in lines:
+            self._emit(stream, state, line)
+
+    def _flush(self, stream):
+        state = self._streams[stream]
+        if state.partial:
+            line, state.partial = state.partial, b''
+            self._emit(stream, state, line)
+
+    def _emit(self, stream, state, line):
+        stamp, _, message = line.partition(b' ')
+        try:
+            time_nano = parse_docker_timestamp(stamp.decode('ascii'), nanoseconds=True)
+        except (ValueError, UnicodeDecodeError):
+            time_nano, message = state.last_time_nano or 0, line
+        # lines of one stream come in time order, stdout and stderr may be
+        # slightly interleaved, so each is deduplicated on its own
+        if state.last_time_nano is not None and time_nano <= state.last_time_nano:
+            state.seen_at_last += 1
+            if time_nano < state.last_time_nano or state.seen_at_last <= state.emitted_at_last:
+                self.duplicates += 1
+                return
+            state.emitted_at_last = state.seen_at_last
+        else:
+            state.emitted_at_last = state.seen_at_last = 1
+        state.last_time_nano = time_nano
+        self.received += 1
+        self.aggregator._put((self, LogLine(time_nano, self.node, self.container, stream,
+                                            message.decode('utf-8', 'replace'))))
+
+
+class LogAggregator(object):
+    """
+    Streams the logs of many containers, across nodes, as one iterator of
+    :class:`LogLine` in timestamp order.
+
+    At most ``max_streams`` log streams are open at a time. Without
+    ``follow`` further containers wait for a slot; followed streams never
+    end, so with ``follow`` more targets than ``max_streams`` are refused.
+    Lines are merged through
+    a heap: a line is yielded once every open stream has a later one
+    buffered, or after ``reorder_window`` seconds for streams that stay
+    silent, so lines arriving later than that may come out of order.
+
+    Readers block once ``buffer_lines`` lines are queued: a slow consumer
+    stops reading the sockets instead of buffering without bound. Dropped
+    streams are reopened from the last line seen, skipping the lines already
+    delivered: after a reconnect, as many lines of a stream at its last
+    timestamp as were already delivered are skipped.
+
+    :param targets: ``(client, container id)`` pairs, e.g. from
+        :func:`service_log_targets`, or ``(client, container id, tty)``
+    :param since: unix timestamp of the first lines
+    """
+
+    def __init__(self, targets, since=None, tail='all', follow=True, stdout=True, stderr=True,
+                 reorder_window=DEFAULT_LOG_REORDER_WINDOW, max_streams=DEFAULT_LOG_STREAMS,
+                 buffer_lines=DEFAULT_LOG_BUFFER_LINES, reconnect_delay=1, max_reconnect_delay=30):
+        self.since = since
+        self.tail = tail
+        self.follow = follow
+        self.stdout = stdout
+        self.stderr = stderr
+        self.reorder_window = reorder_window
+        self.buffer_lines = buffer_lines
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.readers = [_ContainerLogReader(self, *target) for target in targets]
+        if follow and len(self.readers) > max_streams:
+            raise ValueError('Cannot follow {0} log streams, max_streams is {1}'.format(
+                len(self.readers), max_streams))
+        self.emitted = 0
+        self._queue = queue.Queue(buffer_lines)
+        self._slots = threading.BoundedSemaphore(max_streams)
+        self._stopped = threading.Event()
+        self._started = False
+
+    def __iter__(self):
+        return self.lines()
+
+    def start(self):
+        if not self._started:
+            self._started = True
+            for reader in self.readers:
+                reader.start()
+        return self
+
+    def stop(self, timeout=DEFAULT_STOP_TIMEOUT):
+        self._stopped.set()
+        for reader in self.readers:
+            reader.close()
+        deadline = time.time() + timeout
+        for reader in self.readers:
+            reader.join(max(0, deadline - time.time()))
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def lines(self):
+        """
+        Yield the merged :class:`LogLine` s until every stream ended, or
+        :meth:`stop`. Closing the generator stops the aggregator.
+        """
+        self.start()
+        heap = []
+        sequence = itertools.count()
+        live = set(self.readers)
+        buffered = dict.fromkeys(self.readers, 0)
+        # live readers without a line in the heap: while there is one, the
+        # heap top may not be the oldest line
+        starved = len(live)
+        try:
+            while (live or heap) and not self._stopped.is_set():
+                timeout = 0.5
+                if heap:
+                    top = heap[0]
+                    wait = top[2] + self.reorder_window - time.time()
+                    if not starved or wait <= 0 or len(heap) > self.buffer_lines:
+                        time_nano, _, _, reader, line = heapq.heappop(heap)
+                        buffered[reader] -= 1
+                        if not buffered[reader] and reader in live:
+                            starved += 1
+                        self.emitted += 1
+                        yield line
+                        continue
+                    timeout = min(wait, timeout)
+                try:
+                    reader, line = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if line is None:
+                    live.discard(reader)
+                    if not buffered[reader]:
+                        starved -= 1
+                    continue
+                if not buffered[reader]:
+                    starved -= 1
+                buffered[reader] += 1
+                heapq.heappush(heap, (line.time_nano, next(sequence), time.time(), reader, line))
+        finally:
+            self.stop()
+
+    def stats(self):
+        return {
+            'streams': len(self.readers),
+            'running': sum(1 for r in self.readers if r.running),
+            'emitted': self.emitted,
+            'queued': self._queue.qsize(),
+            'received': sum(r.received for r in self.readers),
+            'duplicates': sum(r.duplicates for r in self.readers),
+            'reconnects': sum(r.reconnects for r in self.readers),
+        }
@@ -0,0 +1,112 @@
+# coding=utf-8
+import threading
+import time
+from collections import OrderedDict
+
+
+class ClientRegistry(object):
+    """
+    A bounded, thread-safe LRU registry of API clients.
+
+    Clients are built at most once per key: concurrent lookups of a missing key
+    wait for the first builder instead of constructing duplicates. Clients
+    dropped because of the size limit or because they were unused for longer
+    than ``idle_timeout`` seconds get their connection pools closed.
+    """
+
+    def __init__(self, maxsize=128, idle_timeout=None):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._clients = OrderedDict()  # key -> [client, last_used]
+        self._building = {}  # key -> threading.Event
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._clients
+
+    def get_or_create(self, key, factory):
+        while True:
+            with self._lock:
+                self._expire_idle()
+                entry = self._clients.get(key)
+                if entry is not None:
+                    entry[1] = time.time()
+                    self._clients[key] = self._clients.pop(key)
+                    self.hits += 1
+                    return entry[0]
+                building = self._building.get(key)
+                if building is None:
+                    building = self._building[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # another thread is building the same client
+            building.wait()
+
+        try:
+            client = factory()
+        except Exception:
+            with self._lock:
+                self._building.pop(key).set()
+            raise
+
+        with self._lock:
+            self._clients[key] = [client, time.time()]
+            self._building.pop(key).set()
+            evicted = self._shrink()
+        self._close(evicted)
+        return client
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._clients.pop(key, None)
+        if entry is not None:
+            self._close([entry[0]])
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            clients = [entry[0] for entry in self._clients.values()]
+            self._clients.clear()
+        self._close(clients)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._clients),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _expire_idle(self):
+        if not self.idle_timeout:
+            return
+        deadline = time.time() - self.idle_timeout
+        expired = [k for k, (_, last_used) in self._clients.items() if last_used < deadline]
+        clients = [self._clients.pop(k)[0] for k in expired]
+        self.evictions += len(clients)
+        self._close(clients)
+
+    def _shrink(self):
+        evicted = []
+        while self.maxsize and len(self._clients) > self.maxsize:
+            _, (client, _) = self._clients.popitem(last=False)
+            evicted.append(client)
+        self.evictions += len(evicted)
+        return evicted
+
+    @staticmethod
+    def _close(clients):
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
@@ -0,0 +1,418 @@
+# coding=utf-8
+"""
+Numeric container stats of a whole cluster, sampled into fixed-size typed
+ring buffers.
+"""
+import logging
+import math
+import threading
+import time
+from array import array
+
+from .fanout import map_concurrently
+from .fanout import node_key
+from .timestamps import parse_docker_timestamp
+from ..consts import DEFAULT_FAN_OUT_WORKERS
+from ..consts import DEFAULT_STATS_CAPACITY
+from ..consts import DEFAULT_STATS_INTERVAL
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+log = logging.getLogger(__name__)
+
+FIELDS = ('time', 'cpu_total', 'cpu_system', 'online_cpus', 'memory_usage', 'memory_limit', 'memory_cache',
+          'rx_bytes', 'tx_bytes', 'blkio_read', 'blkio_write', 'pids')
+_INDEX = dict((f, i) for i, f in enumerate(FIELDS))
+
+# metric -> (StatsRing method, field), for StatsRing.series
+METRICS = {
+    'cpu_percent': ('cpu_percent', None),
+    'memory_usage': ('memory_usage', None),
+    'memory_percent': ('memory_percent', None),
+    'rx_rate': ('rate', 'rx_bytes'),
+    'tx_rate': ('rate', 'tx_bytes'),
+    'read_rate': ('rate', 'blkio_read'),
+    'write_rate': ('rate', 'blkio_write'),
+}
+
+
+def extract_counters(stats):
+    """
+    The :data:`FIELDS` of a ``/containers/{id}/stats`` sample, as floats.
+
+    :return: a tuple, or None for a container not running
+    """
+    read = stats.get('read') or ''
+    if not read or read.startswith('0001-'):
+        return None
+    cpu = stats.get('cpu_stats') or {}
+    usage = cpu.get('cpu_usage') or {}
+    memory = stats.get('memory_stats') or {}
+    memory_detail = memory.get('stats') or {}
+    rx = tx = 0
+    for interface in (stats.get('networks') or {}).values():
+        rx += interface.get('rx_bytes', 0)
+        tx += interface.get('tx_bytes', 0)
+    blkio_read = blkio_write = 0
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or ():
+        op = entry.get('op', '').lower()
+        if op == 'read':
+            blkio_read += entry.get('value', 0)
+        elif op == 'write':
+            blkio_write += entry.get('value', 0)
+    return (
+        parse_docker_timestamp(read),
+        float(usage.get('total_usage', 0)),
+        float(cpu.get('system_cpu_usage', 0)),
+        float(cpu.get('online_cpus') or len(usage.get('percpu_usage') or ()) or 1),
+        float(memory.get('usage', 0)),
+        float(memory.get('limit', 0)),
+        # cgroup v1 reports the page cache as cache, v2 as inactive_file
+        float(memory_detail.get('cache', memory_detail.get('inactive_file', 0))),
+        float(rx),
+        float(tx),
+        float(blkio_read),
+        float(blkio_write),
+        float((stats.get('pids_stats') or {}).get('current', 0)),
+    )
+
+
+def percentiles(values, q):
+    """
+    Linearly interpolated percentiles, like ``numpy.percentile``.
+
+    :param q: a percentile or a sequence of them, 0 to 100
+    """
+    single = not isinstance(q, (list, tuple))
+    qs = [q] if single else q
+    if np is not None:
+        values = np.asarray(values, dtype='d')
+        result = [float(v) for v in np.percentile(values, qs)] if len(values) else [float('nan')] * len(qs)
+    else:
+        values = sorted(values)
+        result = []
+        for p in qs:
+            if not values:
+                result.append(float('nan'))
+                continue
+            rank = (len(values) - 1) * p / 100.0
+            low = int(math.floor(rank))
+            high = min(low + 1, len(values) - 1)
+            result.append(values[low] + (values[high] - values[low]) * (rank - low))
+    return result[0] if single else result
+
+
+class StatsRing(object):
+    """
+    The last ``capacity`` samples of one container, stored column by column in
+    a single preallocated ``array('d')``: memory is fixed at
+    ``capacity * len(FIELDS) * 8`` bytes.
+
+    Series are returned oldest first, as numpy arrays if numpy is installed,
+    as ``array('d')`` otherwise.
+    """
+
+    __slots__ = ('capacity', 'count', '_next', '_data')
+
+    def __init__(self, capacity=DEFAULT_STATS_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self._next = 0
+        self._data = array('d', [0.0]) * (capacity * len(FIELDS))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self._data) * self._data.itemsize
+
+    def append(self, values):
+        data = self._data
+        capacity = self.capacity
+        position = self._next
+        for i, value in enumerate(values):
+            data[i * capacity + position] = value
+        self._next = (position + 1) % capacity
+        if self.count < capacity:
+            self.count += 1
+
+    def copy(self, window=None):
+        """
+        A snapshot of the last ``window`` samples.
+        """
+        count = self.count if window is None else min(window, self.count)
+        if count == self.count:
+            ring = StatsRing.__new__(StatsRing)
+            ring.capacity, ring.count, ring._next, ring._data = self.capacity, self.count, self._next, self._data[:]
+            return ring
+        ring = StatsRing(count)
+        data, capacity, start = self._data, self.capacity, self._next - count
+        for i in range(len(FIELDS)):
+            for j in range(count):
+                ring._data[i * count + j] = data[i * capacity + (start + j) % capacity]
+        ring.count = count
+        return ring
+
+    def last(self, field):
+        if not self.count:
+            return None
+        return self._data[_INDEX[field] * self.capacity + (self._next - 1) % self.capacity]
+
+    def column(self, field, window=None):
+        """
+        :param window: only the last ``window`` samples
+        """
+        start = _INDEX[field] * self.capacity
+        count = self.count if window is None else min(window, self.count)
+        if np is not None:
+            column = np.frombuffer(self._data, dtype='d')[start:start + self.capacity]
+            if self.count < self.capacity:
+                return column[self.count - count:self.count].copy()
+            return np.roll(column, -self._next)[self.capacity - count:]
+        column = self._data[start:start + self.capacity]
+        if self.count == self.capacity:
+            column = column[self._next:] + column[:self._next]
+        else:
+            column = column[:self.count]
+        return column[len(column) - count:]
+
+    def rate(self, field, window=None):
+        """
+        Per second rates of the counter ``field`` between consecutive samples;
+        intervals where it went backwards (a restarted container) are dropped.
+        """
+        values = self.column(field, window)
+        times = self.column('time', window)
+        if np is not None:
+            delta, elapsed = np.diff(values), np.diff(times)
+            valid = (delta >= 0) & (elapsed > 0)
+            return delta[valid] / elapsed[valid]
+        return array('d', [(values[i] - values[i - 1]) / (times[i] - times[i - 1])
+                           for i in range(1, len(values))
+                           if values[i] >= values[i - 1] and times[i] > times[i - 1]])
+
+    def cpu_percent(self, window=None):
+        """
+        CPU usage between consecutive samples, 100 per fully used core.
+        """
+        total = self.column('cpu_total', window)
+        system = self.column('cpu_system', window)
+        cpus = self.column('online_cpus', window)
+        if np is not None:
+            delta, system_delta = np.diff(total), np.diff(system)
+            valid = (delta >= 0) & (system_delta > 0)
+            return delta[valid] / system_delta[valid] * cpus[1:][valid] * 100.0
+        return array('d', [(total[i] - total[i - 1]) / (system[i] - system[i - 1]) * cpus[i] * 100.0
+                           for i in range(1, len(total))
+                           if total[i] >= total[i - 1] and system[i] > system[i - 1]])
+
+    def memory_usage(self, window=None):
+        """
+        Memory used without the page cache, as ``docker stats`` shows it.
+        """
+        usage = self.column('memory_usage', window)
+        cache = self.column('memory_cache', window)
+        if np is not None:
+            return usage - cache
+        return array('d', [u - c for u, c in zip(usage, cache)])
+
+    def memory_percent(self, window=None):
+        usage = self.memory_usage(window)
+        limit = self.column('memory_limit', window)
+        if np is not None:
+            return np.where(limit > 0, usage / np.where(limit > 0, limit, 1) * 100.0, 0.0)
+        return array('d', [u / l * 100.0 if l > 0 else 0.0 for u, l in zip(usage, limit)])
+
+    def series(self, metric, window=None):
+        """
+        :param metric: a key of :data:`METRICS` or a raw field of :data:`FIELDS`
+        """
+        method, field = METRICS.get(metric, ('column', metric))
+        if field is None:
+            return getattr(self, method)(window)
+        return getattr(self, method)(field, window)
+
+
+class StatsSampler(object):
+    """
+    Samples the stats of every running container on every node, e.g. of
+    ``get_node_docker_api_clients()``, each ``interval`` seconds, keeping the
+    last ``capacity`` samples per container in a :class:`StatsRing`.
+
+    Each sweep lists the containers of all nodes and takes a one-shot sample
+    of each, ``max_workers`` at a time, keeping only the numeric counters of
+    :data:`FIELDS`. Containers gone from a sweep are dropped, so memory is
+    bounded by the running containers.
+
+    Series are keyed by ``(node, container id)``.
+    """
+
+    def __init__(self, clients, interval=DEFAULT_STATS_INTERVAL, capacity=DEFAULT_STATS_CAPACITY,
+                 max_workers=DEFAULT_FAN_OUT_WORKERS, filters=None):
+        self.clients = [getattr(c, 'api', c) for c in clients]
+        self.interval = interval
+        self.capacity = capacity
+        self.max_workers = max_workers
+        self.filters = filters
+        self.sweeps = 0
+        self.errors = 0
+        self.last_sweep = None
+        self._rings = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __len__(self):
+        return len(self._rings)
+
+    def __contains__(self, key):
+        return key in self._rings
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def keys(self):
+        with self._lock:
+            return sorted(self._rings)
+
+    def ring(self, key):
+        """
+        The ring of ``key``, appended to by the sweeps: see :meth:`series`
+        for a consistent view.
+        """
+        with self._lock:
+            return self._rings[key]
+
+    def _snapshot(self, window=None):
+        # sweeps append to the rings in place, a series is computed on a copy
+        with self._lock:
+            return [(key, ring.copy(window)) for key, ring in self._rings.items()]
+
+    def _list(self, client):
+        try:
+            return [(client, c['Id']) for c in client.containers(quiet=True, filters=self.filters)]
+        except Exception as e:
+            # the containers of an unreachable node are kept until it answers again
+            log.warning('Could not list the containers of %s: %s', node_key(client), e)
+            return None
+
+    def _sample(self, target):
+        client, container = target
+        try:
+            response = client._get(client._url('/containers/{0}/stats', container),
+                                   params={'stream': 0, 'one-shot': 1})
+            client._raise_for_status(response)
+            return extract_counters(response.json())
+        except Exception as e:
+            log.debug('Could not sample %s on %s: %s', container, node_key(client), e)
+            return e
+
+    def sample(self):
+        """
+        Run one sweep now.
+
+        :return: the number of containers sampled
+        """
+        listed = map_concurrently(self._list, self.clients, self.max_workers)
+        targets = []
+        reachable = set()
+        for client, containers in zip(self.clients, listed):
+            if containers is not None:
+                reachable.add(node_key(client))
+                targets.extend(containers)
+        samples = map_concurrently(self._sample, targets, self.max_workers)
+
+        sampled = 0
+        with self._lock:
+            live = set()
+            for (client, container), values in zip(targets, samples):
+                key = (node_key(client), container)
+                live.add(key)
+                if isinstance(values, Exception):
+                    self.errors += 1
+                    continue
+                if values is None:
+                    continue
+                ring = self._rings.get(key)
+                if ring is None:
+                    ring = self._rings[key] = StatsRing(self.capacity)
+                if ring.count and ring.last('time') >= values[0]:
+                    # the daemon answered with a cached sample
+                    continue
+                ring.append(values)
+                sampled += 1
+            for key in [k for k in self._rings if k[0] in reachable and k not in live]:
+                del self._rings[key]
+            self.sweeps += 1
+            self.last_sweep = time.time()
+        return sampled
+
+    def series(self, key, metric, window=None):
+        with self._lock:
+            ring = self._rings[key].copy(window)
+        return ring.series(metric, window)
+
+    def percentiles(self, metric, q=(50, 90, 99), window=None):
+        """
+        :return: ``{key: [percentile, ...]}`` of ``metric`` (see
+            :meth:`StatsRing.series`) over the last ``window`` samples
+        """
+        return dict((key, percentiles(ring.series(metric, window), list(q))) for key, ring in self._snapshot(window))
+
+    def latest(self, metric):
+        """
+        :return: ``{key: value}``, the last value of ``metric`` per container,
+            for those with enough samples
+        """
+        result = {}
+        for key, ring in self._snapshot(2):
+            values = ring.series(metric, window=2)
+            if len(values):
+                result[key] = float(values[-1])
+        return result
+
+    def top(self, metric, n=10):
+        """
+        :return: the ``n`` ``(key, value)`` with the highest last ``metric``
+        """
+        return sorted(self.latest(metric).items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def start(self):
+        if self.running:
+            return self
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='dce-stats')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            start = time.time()
+            try:
+                self.sample()
+            except Exception:
+                log.exception('Container stats sweep failed')
+            if self._stopped.wait(max(0, self.interval - (time.time() - start))):
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                'containers': len(self._rings),
+                'bytes': sum(r.nbytes for r in self._rings.values()),
+                'sweeps': self.sweeps,
+                'errors': self.errors,
+                'last_sweep': self.last_sweep,
+                'running': self.running,
+            }
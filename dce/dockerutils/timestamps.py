@@ -0,0 +1,88 @@
+# coding=utf-8
+"""
+Bulk parsing of Docker RFC3339Nano timestamps (``CreatedAt``, ``UpdatedAt``,
+task ``Status.Timestamp``, ``logs(timestamps=True)`` prefixes, ...) into epoch
+values.
+"""
+import calendar
+import re
+from array import array
+
+_RFC3339 = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)[Tt ](\d\d):(\d\d):(\d\d)(?:\.(\d+))?'
+    r'(?:[Zz]|([+-])(\d\d):?(\d\d))?$'
+)
+_NANOS_PAD = '000000000'
+
+try:
+    array('q')
+    _INT64 = 'q'
+except ValueError:
+    # python 2
+    _INT64 = 'l'
+
+
+class _DayCache(dict):
+    """
+    ``(year, month, day) -> epoch seconds at 00:00 UTC``, most timestamps of a
+    sweep share a handful of days.
+    """
+
+    def __missing__(self, key):
+        value = self[key] = calendar.timegm((int(key[0]), int(key[1]), int(key[2]), 0, 0, 0, 0, 0, 0))
+        return value
+
+
+_DAYS = _DayCache()
+
+
+def _parse(value, match=_RFC3339.match, days=_DAYS):
+    m = match(value)
+    if m is None:
+        raise ValueError('Invalid docker timestamp: {0!r}'.format(value))
+    year, month, day, hour, minute, second, fraction, sign, tz_hour, tz_minute = m.groups()
+    if len(days) > 4096:
+        days.clear()
+    seconds = days[year, month, day] + int(hour) * 3600 + int(minute) * 60 + int(second)
+    if sign:
+        offset = int(tz_hour) * 3600 + int(tz_minute) * 60
+        seconds = seconds - offset if sign == '+' else seconds + offset
+    nanos = int(fraction[:9] + _NANOS_PAD[len(fraction):]) if fraction else 0
+    return seconds, nanos
+
+
+def parse_docker_timestamp(value, nanoseconds=False):
+    """
+    :param value: e.g. ``2017-11-08T09:30:52.123456789Z`` or ``...+08:00``
+    :param nanoseconds: return an int of nanoseconds instead of float seconds,
+        floats can not keep nanosecond precision
+    :return: epoch value (UTC)
+    """
+    seconds, nanos = _parse(value)
+    if nanoseconds:
+        return seconds * 1000000000 + nanos
+    return seconds + nanos / 1e9
+
+
+def parse_docker_timestamps(values, nanoseconds=False, as_array=False, missing=0):
+    """
+    Parse a batch of docker timestamps.
+
+    :param values: iterable of timestamp strings, None or empty strings are
+        replaced by ``missing``
+    :param nanoseconds: see :func:`parse_docker_timestamp`
+    :param as_array: return a compact :class:`array.array` (``'d'`` for
+        seconds, ``'q'`` for nanoseconds) instead of a list
+    """
+    parse = _parse
+    result = []
+    append = result.append
+    for value in values:
+        if not value:
+            append(missing)
+            continue
+        seconds, nanos = parse(value)
+        append(seconds * 1000000000 + nanos if nanoseconds else seconds + nanos / 1e9)
+    if as_array:
+        return array(_INT64 if nanoseconds else 'd', result)
+    return result
@@ -1,10 +1,22 @@
 import re
 from functools import partial
 
-from .client import DCEDockerClient
 from .client import dce_docker_api_client
+from .diskusage import DiskUsageScanner
+from .fanout import fan_out
+from .fanout import iter_fan_out
+from .logs import LogAggregator
+from .logs import service_log_targets
+from .registry import ClientRegistry
+from .topology import ClusterTopology
+from .topology import parse_dce_ports
+from ..consts import DEFAULT_FAN_OUT_WORKERS
+from ..consts import DEFAULT_TOPOLOGIES_MAXSIZE
 from ..utils import memoize_with_expire
 
+# evicted topologies are closed, which stops their refresh and health check threads
+TOPOLOGIES = ClientRegistry(maxsize=DEFAULT_TOPOLOGIES_MAXSIZE)
+
 
 def convert_docker_datetime(datetime_str):
     is_num = lambda c: re.match(r'\d', c) is not None
@@ -29,53 +41,85 @@ def detect_dce_ports(client=None):
     :return: (swarm_port, controller_port, controller_ssl_port)
     """
     client = client or dce_docker_api_client()
-    dce_base = client.inspect_service('dce_base')
-    environments = dce_base.get('Spec', {}).get('TaskTemplate', {}).get('ContainerSpec', {}).get('Env', [])
-    environments = dict(
-        [e.split('=', 1) for e in environments if '=' in e]
-    )
-    (swarm_port, controller_port, controller_ssl_port) = (
-        environments.get('SWARM_PORT'),
-        environments.get('CONTROLLER_PORT'),
-        environments.get('CONTROLLER_SSL_PORT')
-    )
-    ports = int(swarm_port), int(controller_port), int(controller_ssl_port)
-    return ports
+    return parse_dce_ports(client.inspect_service('dce_base'))
+
+
+def get_cluster_topology(token=None, username=None, password=None, client=None):
+    """
+    :return: the shared, background refreshed :class:`dce.dockerutils.topology.ClusterTopology`
+        for the docker url of ``client`` and these credentials
+    """
+    key = (getattr(getattr(client, 'api', client), 'base_url', None), token, username, password)
+    return TOPOLOGIES.get_or_create(
+        key, lambda: ClusterTopology(client, token=token, username=username, password=password).start())
 
 
 @memoize_with_expire(60)
 def _get_dce_client(token=None, username=None, password=None, docker_client=None, api_client=False):
-    from .. import DCEClient
+    from .. import DCEAPIClient, DCEClient
 
-    c = docker_client or dce_docker_api_client()
-    addr = c.info()['Swarm']['NodeAddr']
-    _, port, ssl_port = detect_dce_ports(c)
+    url = get_cluster_topology(token=token, username=username, password=password,
+                               client=docker_client).controller_url()
     if api_client:
-        return DCEAPIClient('http://%s:%s' % (addr, port), token=token, username=username, password=password)
-    return DCEClient('http://%s:%s' % (addr, port), token=token, username=username, password=password)
+        return DCEAPIClient(url, token=token, username=username, password=password)
+    return DCEClient(url, token=token, username=username, password=password)
 
 
 get_local_dce_api_client = partial(_get_dce_client, api_client=True)
 get_local_dce_client = partial(_get_dce_client, api_client=False)
 
 
-@memoize_with_expire(60)
 def _get_node_docker_clients(token=None, username=None, password=None, client=None, api=False):
-    from .. import DCEAPIClient
-
-    c = client or dce_docker_api_client()
-    controllers = [n['ManagerStatus']['Addr'] for n in c.nodes() if n['Spec']['Role'] == 'manager']
-    addr = controllers[0].split(':')[0]
-    _, port, ssl_port = detect_dce_ports(c)
-    proto = 'http'
-    dce = DCEAPIClient('%s://%s:%s' % (proto, addr, port), token=token, username=username, password=password)
-    # TODO: compatibility
-    ip_map = dce.ip_map()
-    advertised_addresses = [n.get('advertised_address', n.get('AdvertisedAddress')) for n in ip_map.values()]
-    if api:
-        return [dce_docker_api_client(dce._url('/{@}/nodes/%s/docker' % i)) for i in advertised_addresses]
-    return [DCEDockerClient(dce._url('/{@}/nodes/%s/docker' % i)) for i in advertised_addresses]
+    topology = get_cluster_topology(token=token, username=username, password=password, client=client)
+    return topology.node_clients() if api else topology.node_docker_clients()
 
 
 get_node_docker_api_clients = partial(_get_node_docker_clients, api=True)
 get_node_docker_clients = partial(_get_node_docker_clients, api=False)
+
+
+def iter_cluster_fan_out(call, args=(), kwargs=None, token=None, username=None, password=None, client=None,
+                         max_workers=DEFAULT_FAN_OUT_WORKERS, timeout=None, skip_open=True):
+    """
+    Run a docker call, e.g. ``'containers'``, on every node of the cluster and
+    yield ``(node_addr, result, error)`` as nodes complete.
+    """
+    clients = get_node_docker_api_clients(token=token, username=username, password=password, client=client)
+    return iter_fan_out(clients, call, args, kwargs, max_workers=max_workers, timeout=timeout, skip_open=skip_open)
+
+
+def cluster_fan_out(call, args=(), kwargs=None, token=None, username=None, password=None, client=None,
+                    max_workers=DEFAULT_FAN_OUT_WORKERS, timeout=None, skip_open=True):
+    """
+    :return: :class:`dce.dockerutils.fanout.FanOutResult` with per node results and errors
+    """
+    clients = get_node_docker_api_clients(token=token, username=username, password=password, client=client)
+    return fan_out(clients, call, args, kwargs, max_workers=max_workers, timeout=timeout, skip_open=skip_open)
+
+
+def tail_service_logs(service, since=None, tail='all', follow=True, token=None, username=None, password=None,
+                      client=None, **kwargs):
+    """
+    The logs of every running task of ``service`` across the cluster, in
+    timestamp order::
+
+        for line in tail_service_logs('web', tail=100):
+            print(line.node, line.message)
+
+    Following a service of more tasks than ``max_streams`` needs a larger
+    ``max_streams``.
+
+    :return: a :class:`dce.dockerutils.logs.LogAggregator`, ``kwargs`` are passed to it
+    """
+    topology = get_cluster_topology(token=token, username=username, password=password, client=client)
+    return LogAggregator(service_log_targets(topology, service), since=since, tail=tail, follow=follow, **kwargs)
+
+
+def scan_cluster_disk_usage(token=None, username=None, password=None, client=None,
+                            max_workers=DEFAULT_FAN_OUT_WORKERS, timeout=None):
+    """
+    :return: :class:`dce.dockerutils.diskusage.DiskUsageReport` of every node,
+        pass it to ``DiskUsageScanner(clients).cleanup(report)`` to reclaim the space
+    """
+    clients = get_node_docker_api_clients(token=token, username=username, password=password, client=client)
+    return DiskUsageScanner(clients, max_workers=max_workers, timeout=timeout).scan()
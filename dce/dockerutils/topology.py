@@ -0,0 +1,253 @@
+# coding=utf-8
+import logging
+import threading
+import time
+
+from .client import DCEDockerAPIClient
+from .client import DCEDockerClient
+from .client import dce_docker_api_client
+from .fanout import map_concurrently
+from ..consts import DEFAULT_TOPOLOGY_REFRESH_INTERVAL
+from ..errors import NoControllerError
+from ..transport import ControllerPool
+
+log = logging.getLogger(__name__)
+
+
+def advertised_address(node):
+    """
+    Address the DCE node proxy knows a node by, from a ``/nodes`` entry.
+    """
+    addr = node.get('Status', {}).get('Addr')
+    if not addr or addr == '0.0.0.0':
+        # managers of older engines report 0.0.0.0 here
+        addr = ((node.get('ManagerStatus') or {}).get('Addr') or '').split(':')[0]
+    return addr or None
+
+
+def parse_dce_ports(dce_base):
+    """
+    :return: (swarm_port, controller_port, controller_ssl_port) from the
+        environment of the ``dce_base`` service spec
+    """
+    environments = dce_base.get('Spec', {}).get('TaskTemplate', {}).get('ContainerSpec', {}).get('Env', [])
+    environments = dict(
+        [e.split('=', 1) for e in environments if '=' in e]
+    )
+    return (int(environments.get('SWARM_PORT')),
+            int(environments.get('CONTROLLER_PORT')),
+            int(environments.get('CONTROLLER_SSL_PORT')))
+
+
+class ClusterTopology(object):
+    """
+    Controller addresses, DCE ports and node advertised addresses of the
+    cluster behind ``client``, plus one docker client per node. Every client
+    spreads its calls over all controllers through :attr:`controller_pool`.
+
+    :meth:`refresh` applies membership diffs: clients are only built for
+    nodes that joined and closed for nodes that left, the others are kept.
+    :meth:`start` refreshes every ``refresh_interval`` seconds in a
+    background thread.
+    """
+
+    def __init__(self, client=None, token=None, username=None, password=None,
+                 refresh_interval=DEFAULT_TOPOLOGY_REFRESH_INTERVAL, client_factory=DCEDockerAPIClient):
+        self.client = getattr(client, 'api', client) or dce_docker_api_client()
+        self.token = token
+        self.username = username
+        self.password = password
+        self.refresh_interval = refresh_interval
+        self.client_factory = client_factory
+        self.local_addr = None
+        self.controllers = []
+        self.ports = None
+        self.last_refresh = None
+        self.refreshes = 0
+        self._nodes = {}  # advertised address -> node id
+        self._clients = {}  # advertised address -> docker client through the node proxy
+        self._dce_client = None
+        # calls through the node proxy are spread over every controller
+        self.controller_pool = ControllerPool([])
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __repr__(self):
+        return '<ClusterTopology controllers=%s nodes=%d>' % (self.controllers, len(self._nodes))
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def node_addrs(self):
+        with self._lock:
+            return sorted(self._nodes)
+
+    def _ensure(self):
+        if self.last_refresh is None:
+            self.refresh()
+
+    def refresh(self):
+        """
+        :return: {'joined': [addr, ...], 'left': [addr, ...]}
+        """
+        with self._refresh_lock:
+            nodes = self.client.nodes()
+            if self.local_addr is None:
+                self.local_addr = self.client.info()['Swarm']['NodeAddr']
+            controllers = sorted(a for a in (advertised_address(n) for n in nodes
+                                             if n['Spec']['Role'] == 'manager') if a is not None)
+            addrs = dict((advertised_address(n), n['ID']) for n in nodes
+                         if n.get('Status', {}).get('State', 'ready') != 'down')
+            addrs.pop(None, None)
+            if self.ports is None or controllers != self.controllers:
+                # dce_base is only re-inspected when the controllers change
+                self.ports = parse_dce_ports(self.client.inspect_service('dce_base'))
+
+            with self._lock:
+                if controllers != self.controllers:
+                    # clients built against a former controller keep being routed by the pool
+                    self.controllers = controllers
+                    self.controller_pool.update([self._controller_url(addr=a) for a in controllers])
+                joined = [a for a in addrs if a not in self._clients]
+                left = [a for a in self._clients if a not in addrs]
+
+            # every construction negotiates the docker api version, do it concurrently
+            built = [(a, c) for a, c in zip(joined, map_concurrently(self._try_node_client, joined))
+                     if c is not None]
+            # nodes whose client could not be built are retried on the next refresh
+            joined = [a for a, _ in built]
+
+            with self._lock:
+                departed = [self._clients.pop(a) for a in left]
+                self._clients.update(built)
+                self._nodes = addrs
+                self.last_refresh = time.time()
+                self.refreshes += 1
+            for c in departed:
+                c.close()
+            if joined or left:
+                log.info('Cluster topology changed, joined: %s, left: %s', joined, left)
+            return {'joined': sorted(joined), 'left': sorted(left)}
+
+    def _try_node_client(self, addr):
+        try:
+            return self.client_factory(base_url=self.node_url(addr), token=self.token,
+                                       username=self.username, password=self.password,
+                                       controllers=self.controller_pool)
+        except Exception as e:
+            log.warning('Could not connect to node %s: %s', addr, e)
+            return None
+
+    def controller_url(self, ssl=False, addr=None):
+        """
+        :param addr: a controller address, by default the local node's if it
+            is a controller, otherwise the first controller's
+        """
+        self._ensure()
+        return self._controller_url(ssl, addr)
+
+    def _controller_url(self, ssl=False, addr=None):
+        if addr is None:
+            if not self.controllers:
+                raise NoControllerError('No controller address known for the cluster')
+            addr = self.local_addr if self.local_addr in self.controllers else self.controllers[0]
+        _, port, ssl_port = self.ports
+        return '%s://%s:%s' % ('https' if ssl else 'http', addr, ssl_port if ssl else port)
+
+    def dce_client(self):
+        """
+        :return: a :class:`dce.DCEAPIClient` balanced over every controller
+        """
+        self._ensure()
+        return self._controller_client()
+
+    def _controller_client(self):
+        from .. import DCEAPIClient
+
+        with self._lock:
+            if self._dce_client is None:
+                self._dce_client = DCEAPIClient(self._controller_url(), token=self.token,
+                                                username=self.username, password=self.password,
+                                                controllers=self.controller_pool)
+            return self._dce_client
+
+    def node_url(self, addr):
+        return self._controller_client()._url('/{@}/nodes/%s/docker' % addr)
+
+    def node_client(self, addr):
+        self._ensure()
+        with self._lock:
+            return self._clients[addr]
+
+    def node_client_by_id(self, node_id):
+        """
+        :return: the docker client of the node with swarm id ``node_id``, None if unknown
+        """
+        self._ensure()
+        with self._lock:
+            for addr, nid in self._nodes.items():
+                if nid == node_id:
+                    return self._clients.get(addr)
+        return None
+
+    def node_clients(self):
+        """
+        :return: the per node docker API clients, in address order
+        """
+        self._ensure()
+        with self._lock:
+            return [self._clients[a] for a in sorted(self._clients)]
+
+    def node_docker_clients(self):
+        """
+        :return: :class:`DCEDockerClient` wrappers of :meth:`node_clients`
+        """
+        return [DCEDockerClient.from_api_client(c) for c in self.node_clients()]
+
+    def start(self):
+        if self.running:
+            return self
+        self._ensure()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='dce-topology')
+        self._thread.daemon = True
+        self._thread.start()
+        self.controller_pool.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.controller_pool.stop(timeout)
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for c in clients:
+            c.close()
+
+    def _run(self):
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # keep serving the last known topology
+                log.warning('Cluster topology refresh failed: %s', e)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'controllers': list(self.controllers),
+                'ports': self.ports,
+                'nodes': len(self._nodes),
+                'clients': len(self._clients),
+                'refreshes': self.refreshes,
+                'last_refresh': self.last_refresh,
+                'running': self.running,
+            }
@@ -87,8 +87,24 @@ class ImageNotFound(NotFound):
     pass
 
 
+class CircuitOpenError(requests.exceptions.ConnectionError, DCEException):
+    """
+    A request was rejected without being sent because the target host or node
+    failed repeatedly, see :class:`dce.transport.resilience.CircuitBreaker`.
+    """
+
+
+class FanOutTimeout(DCEException):
+    pass
+
+
+class NoControllerError(DCEException):
+    pass
+
+
 class StreamParseError(RuntimeError):
     def __init__(self, reason):
+        super(StreamParseError, self).__init__(reason)
         self.msg = reason
 
 
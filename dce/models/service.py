@@ -0,0 +1,119 @@
+# coding=utf-8
+from six.moves import intern
+
+TENANT_LABEL = 'io.daocloud.dce.authz.tenant'
+OWNER_LABEL = 'io.daocloud.dce.authz.owner'
+SYSTEM_LABEL = 'io.daocloud.dce.system'
+STACK_LABEL = 'com.docker.stack.namespace'
+
+
+def _spec(attrs):
+    return attrs.get('Spec', {})
+
+
+def _labels(attrs):
+    return _spec(attrs).get('Labels') or {}
+
+
+def _label(name):
+    def extract(attrs):
+        value = _labels(attrs).get(name)
+        # a handful of tenants/owners/stacks repeat over thousands of services
+        return intern(value) if isinstance(value, str) else value
+
+    return extract
+
+
+def _endpoint_ports(attrs):
+    return tuple(attrs.get('Endpoint', {}).get('Ports') or ())
+
+
+def _published_ports(attrs):
+    return tuple(p['PublishedPort'] for p in _endpoint_ports(attrs) if 'PublishedPort' in p)
+
+
+def _image(attrs):
+    return _spec(attrs).get('TaskTemplate', {}).get('ContainerSpec', {}).get('Image')
+
+
+def _replicas(attrs):
+    return _spec(attrs).get('Mode', {}).get('Replicated', {}).get('Replicas')
+
+
+EXTRACTORS = {
+    'id': lambda attrs: attrs.get('ID'),
+    'version': lambda attrs: attrs.get('Version', {}).get('Index'),
+    'name': lambda attrs: _spec(attrs).get('Name'),
+    'created_at': lambda attrs: attrs.get('CreatedAt'),
+    'updated_at': lambda attrs: attrs.get('UpdatedAt'),
+    'tenant': _label(TENANT_LABEL),
+    'owner': _label(OWNER_LABEL),
+    'app_name': _label(STACK_LABEL),
+    'is_system': _label(SYSTEM_LABEL),
+    'image': _image,
+    'replicas': _replicas,
+    'endpoint_ports': _endpoint_ports,
+    'published_ports': _published_ports,
+    'service_labels': lambda attrs: _labels(attrs),
+    'container_labels': lambda attrs: _spec(attrs).get('TaskTemplate', {}).get('ContainerSpec', {}).get('Labels', {}),
+}
+
+DEFAULT_FIELDS = ('id', 'version', 'name', 'tenant', 'owner', 'app_name', 'is_system', 'endpoint_ports',
+                  'published_ports')
+ALL_FIELDS = tuple(sorted(EXTRACTORS))
+
+
+class ServiceView(object):
+    """
+    Compact, read-only projection of a service listing entry.
+
+    Only ``fields`` are extracted, once, at construction; the full ``attrs`` are
+    dropped unless ``keep_attrs`` is set and are otherwise re-fetched through
+    ``client.inspect_service`` on first access of :attr:`attrs`.
+    """
+    __slots__ = ALL_FIELDS + ('_attrs', '_client')
+
+    def __init__(self, attrs, fields=DEFAULT_FIELDS, client=None, keep_attrs=False):
+        setter = object.__setattr__
+        for name in fields:
+            setter(self, name, EXTRACTORS[name](attrs))
+        if 'id' not in fields:
+            setter(self, 'id', attrs.get('ID'))
+        setter(self, '_attrs', attrs if keep_attrs else None)
+        setter(self, '_client', client)
+
+    def __getattr__(self, name):
+        if name in EXTRACTORS:
+            raise AttributeError("'{0}' was not projected into this ServiceView".format(name))
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ServiceView is read-only')
+
+    def __eq__(self, other):
+        return isinstance(other, ServiceView) and self.id == other.id and \
+            getattr(self, 'version', None) == getattr(other, 'version', None)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return '<ServiceView: %s>' % (getattr(self, 'name', None) or self.id)
+
+    @property
+    def attrs(self):
+        """
+        The full service object, loaded on demand.
+        """
+        if self._attrs is None:
+            if self._client is None:
+                raise ValueError('ServiceView has no client to load the full spec from')
+            object.__setattr__(self, '_attrs', self._client.inspect_service(self.id))
+        return self._attrs
+
+    def reload(self):
+        object.__setattr__(self, '_attrs', None)
+        return self.attrs
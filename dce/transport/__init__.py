@@ -0,0 +1,6 @@
+# flake8: noqa
+from .balancer import ControllerPool
+from .cache import ResponseCache
+from .metrics import INSTRUMENTATION, Instrumentation, endpoint_template
+from .pooladapter import PooledHTTPAdapter, pool_stats
+from .resilience import BREAKERS, DEFAULT_RETRY, BreakerRegistry, CircuitBreaker, RetryPolicy
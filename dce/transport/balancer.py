@@ -0,0 +1,238 @@
+# coding=utf-8
+import logging
+import threading
+import time
+
+from requests.exceptions import ConnectionError
+from requests.exceptions import ConnectTimeout
+from six.moves.urllib_parse import urlsplit
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.exceptions import NewConnectionError
+
+from ..consts import DEFAULT_HEALTH_CHECK_INTERVAL
+from ..errors import CircuitOpenError
+from .resilience import IDEMPOTENT_METHODS
+from .resilience import node_proxy_addr
+
+log = logging.getLogger(__name__)
+
+
+def connect_failed(error):
+    """
+    True if ``error`` was raised before a connection to the server existed,
+    the request was never sent.
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, 'reason', reason)  # urllib3's MaxRetryError
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def controller_failed(url, error):
+    """
+    True if ``error`` means the controller itself could not be reached.
+    Breaker rejections are not, nor are connections dropped while the
+    controller proxied a call to a node: the node is at fault.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    return connect_failed(error) or node_proxy_addr(url) is None
+
+
+class Endpoint(object):
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.url = url.rstrip('/')
+        self.origin = '%s://%s' % (parts.scheme, parts.netloc)
+        self.outstanding = 0
+        self.latency = None  # EWMA, seconds
+        self.healthy = True
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+
+    def __repr__(self):
+        return '<Endpoint %s>' % self.url
+
+    def score(self):
+        # least outstanding requests, weighted by how fast the controller answers
+        return (self.outstanding + 1) * (self.latency or 0.001)
+
+    def stats(self):
+        return {
+            'outstanding': self.outstanding,
+            'latency': self.latency,
+            'healthy': self.healthy,
+            'requests': self.requests,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+
+class ControllerPool(object):
+    """
+    Spreads requests over every DCE controller: each request goes to the
+    healthy controller with the lowest ``(outstanding + 1) * latency``, where
+    latency is an exponentially weighted moving average.
+
+    A controller that can not be reached is marked down and the request fails
+    over to the next one, if it is idempotent or was never sent. Other errors,
+    e.g. of a node behind the controller's proxy, go back to the caller.
+    :meth:`start` pings every controller each ``health_check_interval``
+    seconds to bring them back.
+
+    :param urls: controller base urls, e.g. ``['http://10.0.0.1:80', ...]``
+    :param ping: ``ping(url)``, raises if the controller at ``url`` is down
+    """
+
+    def __init__(self, urls, ping=None, health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL, decay=0.3):
+        self.ping = ping
+        self.health_check_interval = health_check_interval
+        self.decay = decay
+        self._endpoints = [Endpoint(u) for u in urls]
+        # origins of every controller ever in the pool: clients built against
+        # a controller that left keep being routed
+        self._origins = set(e.origin for e in self._endpoints)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __len__(self):
+        return len(self._endpoints)
+
+    def __repr__(self):
+        return '<ControllerPool %s>' % [e.url for e in self._endpoints]
+
+    @property
+    def urls(self):
+        return [e.url for e in self._endpoints]
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def update(self, urls):
+        """
+        Set the controllers, keeping the state of those already known.
+        """
+        with self._lock:
+            known = dict((e.url, e) for e in self._endpoints)
+            self._endpoints = [known.get(u.rstrip('/')) or Endpoint(u) for u in urls]
+            self._origins.update(e.origin for e in self._endpoints)
+
+    def owns(self, url):
+        parts = urlsplit(url)
+        return '%s://%s' % (parts.scheme, parts.netloc) in self._origins
+
+    def choose(self, exclude=()):
+        with self._lock:
+            candidates = [e for e in self._endpoints if e not in exclude]
+            # all marked down: try them anyway rather than failing without a request
+            healthy = [e for e in candidates if e.healthy] or candidates
+            if not healthy:
+                return None
+            endpoint = min(healthy, key=Endpoint.score)
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _done(self, endpoint, elapsed=None, error=None):
+        with self._lock:
+            endpoint.outstanding -= 1
+            endpoint.requests += 1
+            if error is not None:
+                endpoint.failures += 1
+                endpoint.healthy = False
+                endpoint.last_error = str(error)
+            else:
+                endpoint.healthy = True
+                self._observe(endpoint, elapsed)
+
+    def _observe(self, endpoint, elapsed):
+        if endpoint.latency is None:
+            endpoint.latency = elapsed
+        else:
+            endpoint.latency += self.decay * (elapsed - endpoint.latency)
+
+    @staticmethod
+    def route(url, endpoint):
+        parts = urlsplit(url)
+        return endpoint.origin + url[len(parts.scheme) + 3 + len(parts.netloc):]
+
+    def send(self, request, method, url, *args, **kwargs):
+        """
+        ``request(method, url, ...)`` on the best controller, failing over to
+        the others on connection errors.
+        """
+        if not self._endpoints or not self.owns(url):
+            return request(method, url, *args, **kwargs)
+        tried = []
+        while True:
+            endpoint = self.choose(exclude=tried)
+            if endpoint is None:
+                # the pool shrank below what was already tried
+                raise ConnectionError('No DCE controller left to fail over to for {0}'.format(url))
+            start = time.time()
+            routed = self.route(url, endpoint)
+            try:
+                response = request(method, routed, *args, **kwargs)
+            except ConnectionError as e:
+                if not controller_failed(routed, e):
+                    self._done(endpoint, time.time() - start)
+                    raise
+                self._done(endpoint, error=e)
+                tried.append(endpoint)
+                retry = method.upper() in IDEMPOTENT_METHODS or connect_failed(e)
+                if not retry or len(tried) >= len(self._endpoints):
+                    raise
+                log.warning('Controller %s failed, failing over: %s', endpoint.url, e)
+                continue
+            except Exception:
+                self._done(endpoint, time.time() - start)
+                raise
+            self._done(endpoint, time.time() - start)
+            return response
+
+    def check(self):
+        """
+        Ping every controller once, marking it up or down.
+        """
+        if self.ping is None:
+            return
+        for endpoint in list(self._endpoints):
+            start = time.time()
+            try:
+                self.ping(endpoint.url)
+            except Exception as e:
+                with self._lock:
+                    endpoint.healthy = False
+                    endpoint.last_error = str(e)
+            else:
+                with self._lock:
+                    endpoint.healthy = True
+                    self._observe(endpoint, time.time() - start)
+
+    def start(self):
+        if self.running:
+            return self
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='dce-controller-health')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.wait(self.health_check_interval):
+            try:
+                self.check()
+            except Exception:
+                log.exception('Controller health check failed')
+
+    def stats(self):
+        with self._lock:
+            return dict((e.url, e.stats()) for e in self._endpoints)
@@ -0,0 +1,216 @@
+# coding=utf-8
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from six.moves.urllib_parse import urlsplit
+
+from ..consts import DEFAULT_RESPONSE_CACHE_BYTES
+from .metrics import endpoint_template
+from .resilience import breaker_key
+
+# seconds a response is served without asking the server again; 0 always
+# revalidates, endpoints not listed are not cached
+DEFAULT_CACHE_POLICIES = {
+    '/{@}/version': 600,
+    '/{@}/info': 60,
+    '/version': 600,
+    '/info': 30,
+    '/nodes': 10,
+    '/services': 5,
+}
+
+VARY_HEADERS = ('Authorization', 'X-DCE-Access-Token')
+
+_DOCKER_PREFIX = re.compile(r'^(?:/\{@\}/nodes/\{node\}/docker)?(?:/v[0-9.]+)?(?=/)')
+
+HIT = 'hit'
+REVALIDATED = 'revalidated'
+UNCHANGED = 'unchanged'
+MISS = 'miss'
+
+
+def cache_endpoint(url):
+    """
+    The endpoint a policy applies to: ``/{@}/...`` for the controller API,
+    the bare docker path (``/services``) for docker calls, direct or proxied.
+    """
+    return _DOCKER_PREFIX.sub('', endpoint_template(urlsplit(url).path), 1)
+
+
+class _Entry(object):
+    __slots__ = ('status_code', 'headers', 'content', 'digest', 'stored_at', 'models', 'reason')
+
+    def __init__(self, response, content, digest):
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = CaseInsensitiveDict(response.headers)
+        self.content = content
+        self.digest = digest
+        self.stored_at = time.time()
+        self.models = {}
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def refresh(self, headers=None):
+        self.stored_at = time.time()
+        if headers:
+            for name in ('ETag', 'Last-Modified', 'Date'):
+                if name in headers:
+                    self.headers[name] = headers[name]
+
+
+class CachedResponse(Response):
+    """
+    A response served from a :class:`ResponseCache`, whose body did not
+    change since it was stored. :meth:`json` decodes it on every call, which
+    is cheaper than copying a shared decoded object; :meth:`models` reuses
+    read-only models built from it.
+    """
+
+    def __init__(self, entry, request, status):
+        super(CachedResponse, self).__init__()
+        self.status_code = entry.status_code
+        self.reason = entry.reason
+        self.headers = CaseInsensitiveDict(entry.headers)
+        self._content = entry.content
+        self._content_consumed = True
+        self.encoding = get_encoding_from_headers(self.headers)
+        self.url = request.url
+        self.request = request
+        self.elapsed = timedelta(0)
+        self.cache_status = status
+        self._entry = entry
+
+    def models(self, key, build):
+        """
+        ``build(self.json())``, once per cache entry and ``key``. What it
+        returns is shared by every later response of the entry, it must not
+        be modified, and is not counted against ``max_bytes``.
+        """
+        models = self._entry.models
+        if key not in models:
+            models[key] = build(self.json())
+        return models[key]
+
+
+class ResponseCache(object):
+    """
+    Byte-bounded LRU cache of ``GET`` responses for the endpoints of
+    ``policies``, ``{endpoint: seconds fresh}`` (see :func:`cache_endpoint`).
+
+    Stale entries are revalidated with ``If-None-Match``/``If-Modified-Since``
+    if the server sent an ``ETag``/``Last-Modified``. Otherwise a re-downloaded
+    body hashing like the cached one is served from the entry, keeping the
+    models built from it. Any other request to the same host (or proxied node)
+    drops its entries.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RESPONSE_CACHE_BYTES, policies=None):
+        self.max_bytes = max_bytes
+        self.policies = dict(DEFAULT_CACHE_POLICIES if policies is None else policies)
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys((HIT, REVALIDATED, UNCHANGED, MISS, 'evictions', 'invalidations'), 0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def max_age(self, url):
+        return self.policies.get(cache_endpoint(url))
+
+    @staticmethod
+    def _key(request):
+        return (request.url,) + tuple(request.headers.get(h) for h in VARY_HEADERS)
+
+    def send(self, send, request, **kwargs):
+        """
+        Serve ``request`` from the cache or through ``send(request, **kwargs)``.
+        """
+        max_age = self.max_age(request.url)
+        if max_age is None:
+            return send(request, **kwargs)
+        key = self._key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = self._entries.pop(key)
+                if time.time() - entry.stored_at < max_age:
+                    self._counts[HIT] += 1
+                    return CachedResponse(entry, request, HIT)
+
+        if entry is not None:
+            if 'ETag' in entry.headers:
+                request.headers['If-None-Match'] = entry.headers['ETag']
+            if 'Last-Modified' in entry.headers:
+                request.headers['If-Modified-Since'] = entry.headers['Last-Modified']
+        response = send(request, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            with self._lock:
+                entry.refresh(response.headers)
+                self._counts[REVALIDATED] += 1
+            return CachedResponse(entry, request, REVALIDATED)
+        if response.status_code != 200:
+            return response
+
+        content = response.content
+        digest = hashlib.sha1(content).digest()
+        if entry is not None and entry.digest == digest:
+            with self._lock:
+                entry.refresh(response.headers)
+                self._counts[UNCHANGED] += 1
+            return CachedResponse(entry, request, UNCHANGED)
+
+        response.cache_status = MISS
+        with self._lock:
+            self._counts[MISS] += 1
+            if 'no-store' not in response.headers.get('Cache-Control', ''):
+                self._store(key, _Entry(response, content, digest))
+        return response
+
+    def _store(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self._counts['evictions'] += 1
+
+    def invalidate(self, url=None):
+        """
+        Drop the entries of the host (or proxied node) of ``url``, or all.
+        """
+        target = breaker_key(url) if url is not None else None
+        with self._lock:
+            for key in list(self._entries):
+                if target is None or breaker_key(key[0]) == target:
+                    self.bytes -= self._entries.pop(key).size
+                    self._counts['invalidations'] += 1
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats.update(entries=len(self._entries), bytes=self.bytes, max_bytes=self.max_bytes)
+        lookups = stats[HIT] + stats[REVALIDATED] + stats[UNCHANGED] + stats[MISS]
+        # unchanged bodies were downloaded again, only hits and 304s spared the transfer
+        stats['hit_rate'] = float(stats[HIT] + stats[REVALIDATED]) / lookups if lookups else 0.0
+        return stats
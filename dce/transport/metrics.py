@@ -0,0 +1,187 @@
+# coding=utf-8
+import logging
+import re
+import threading
+
+from six.moves.urllib_parse import urlsplit
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, float('inf'))
+
+_PREFIX = re.compile(r'^/(?:dce|api)(?=/|$)')
+_NODE_PROXY = re.compile(r'^/\{@\}/nodes/[^/]+/docker')
+_COLLECTIONS = frozenset(['containers', 'services', 'tasks', 'nodes', 'images', 'volumes', 'networks',
+                          'secrets', 'configs', 'plugins', 'exec', 'swarm', 'distribution'])
+_NOT_IDS = frozenset(['json', 'create', 'prune', 'search', 'load', 'get', 'join', 'leave', 'init', 'update',
+                      'unlock', 'unlockkey', 'pull', 'privileges'])
+_TEMPLATE_CACHE_SIZE = 4096
+
+
+def endpoint_template(path):
+    """
+    Reduce a request path to its endpoint template, e.g.
+    ``/dce/nodes/10.0.0.1/docker/services/abc/update`` to
+    ``/{@}/nodes/{node}/docker/services/{id}/update``.
+    """
+    path = _PREFIX.sub('/{@}', path)
+    head = ''
+    m = _NODE_PROXY.match(path)
+    if m:
+        head, path = '/{@}/nodes/{node}/docker', path[m.end():]
+    segments = path.split('/')
+    for i in range(1, len(segments)):
+        if segments[i - 1] in _COLLECTIONS and segments[i] not in _NOT_IDS and segments[i]:
+            segments[i] = '{id}'
+    return head + '/'.join(segments)
+
+
+class Histogram(object):
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'buckets': [[bound, count] for bound, count in zip(self.bounds, self.counts)],
+        }
+
+
+class EndpointStats(object):
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.errors = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.sizes = Histogram(SIZE_BUCKETS)
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'statuses': dict(self.statuses),
+            'errors': dict(self.errors),
+            'latency': self.latency.snapshot(),
+            'bytes': self.sizes.snapshot(),
+            'connections': {'new': self.new_connections, 'reused': self.reused_connections},
+        }
+
+
+class Instrumentation(object):
+    """
+    Per endpoint template request counts, latency and response size
+    histograms, status codes, API error classes and connection reuse.
+
+    Disabled by default; while disabled, the transport only checks
+    :attr:`enabled`. Every sample is also pushed to the registered sinks,
+    callables taking a dict.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._endpoints = {}
+        self._templates = {}
+        self._sinks = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add_sink(self, sink):
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        self._sinks.remove(sink)
+
+    def _key(self, method, url):
+        path = urlsplit(url).path
+        template = self._templates.get(path)
+        if template is None:
+            template = endpoint_template(path)
+            if len(self._templates) >= _TEMPLATE_CACHE_SIZE:
+                self._templates.clear()
+            self._templates[path] = template
+        return '%s %s' % (method, template)
+
+    def _stats(self, key):
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints.setdefault(key, EndpointStats())
+        return stats
+
+    def record_request(self, method, url, status, elapsed, size=None, new_connection=None, error=None):
+        key = self._key(method, url)
+        with self._lock:
+            stats = self._stats(key)
+            stats.requests += 1
+            stats.latency.observe(elapsed)
+            if status is not None:
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if size is not None:
+                stats.sizes.observe(size)
+            if new_connection is not None:
+                if new_connection:
+                    stats.new_connections += 1
+                else:
+                    stats.reused_connections += 1
+            if error is not None:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+        self._emit({'endpoint': key, 'status': status, 'elapsed': elapsed, 'bytes': size,
+                    'new_connection': new_connection, 'error': error})
+
+    def record_error(self, response, error):
+        """
+        Count the class of an error mapped by ``create_api_error_from_http_exception``.
+        """
+        key = self._key(response.request.method, response.url)
+        name = type(error).__name__
+        with self._lock:
+            errors = self._stats(key).errors
+            errors[name] = errors.get(name, 0) + 1
+        self._emit({'endpoint': key, 'status': response.status_code, 'error': name})
+
+    def _emit(self, sample):
+        for sink in list(self._sinks):
+            try:
+                sink(sample)
+            except Exception:
+                log.exception('Metrics sink %r failed', sink)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'endpoints': dict((key, stats.snapshot()) for key, stats in self._endpoints.items()),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+INSTRUMENTATION = Instrumentation()
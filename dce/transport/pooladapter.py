@@ -0,0 +1,186 @@
+# coding=utf-8
+import numbers
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+from requests.exceptions import ReadTimeout
+from requests.exceptions import Timeout
+
+from ..consts import DEFAULT_NUM_POOLS
+from ..consts import DEFAULT_POOL_MAXSIZE
+from ..errors import CircuitOpenError
+from .metrics import INSTRUMENTATION
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    A keep-alive HTTP(S) adapter that keeps one connection pool per host and
+    reports how often pooled connections are reused.
+
+    :param retry: :class:`dce.transport.resilience.RetryPolicy` for idempotent requests
+    :param breakers: :class:`dce.transport.resilience.BreakerRegistry`, calls to
+        a host (or proxied node) whose breaker is open fail fast with
+        :class:`dce.errors.CircuitOpenError`
+    :param connect_timeout: turns a plain ``timeout`` into ``(connect_timeout, timeout)``
+    :param instrumentation: :class:`dce.transport.metrics.Instrumentation`
+        recording every attempt while enabled
+    :param cache: opt-in :class:`dce.transport.cache.ResponseCache` for ``GET`` requests
+    :param ssl_version: ``ssl_version``, ``assert_hostname`` and
+        ``assert_fingerprint`` of HTTPS pools, as in ``docker.tls.TLSConfig``
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['ssl_version', 'assert_hostname', 'assert_fingerprint']
+
+    def __init__(self, pool_connections=DEFAULT_NUM_POOLS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False,
+                 retry=None, breakers=None, connect_timeout=None,
+                 instrumentation=INSTRUMENTATION, cache=None,
+                 ssl_version=None, assert_hostname=None, assert_fingerprint=None, **kwargs):
+        self.retry = retry
+        self.breakers = breakers
+        self.connect_timeout = connect_timeout
+        self.instrumentation = instrumentation
+        self.cache = cache
+        self.ssl_version = ssl_version
+        self.assert_hostname = assert_hostname
+        self.assert_fingerprint = assert_fingerprint
+        super(PooledHTTPAdapter, self).__init__(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            **kwargs
+        )
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        for name in ('ssl_version', 'assert_hostname', 'assert_fingerprint'):
+            value = getattr(self, name, None)
+            if value is not None:
+                pool_kwargs[name] = value
+        super(PooledHTTPAdapter, self).init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        cache = self.cache
+        if cache is not None:
+            if request.method != 'GET':
+                cache.invalidate(request.url)
+            elif not stream:
+                return cache.send(self._send, request, stream=stream, timeout=timeout, **kwargs)
+        return self._send(request, stream=stream, timeout=timeout, **kwargs)
+
+    def _send(self, request, stream=False, timeout=None, **kwargs):
+        if self.connect_timeout and isinstance(timeout, numbers.Number):
+            timeout = (self.connect_timeout, timeout)
+        breaker = self.breakers.for_url(request.url) if self.breakers is not None else None
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError('Circuit breaker open for {0}'.format(request.url), request=request)
+
+        attempt = 0
+        while True:
+            try:
+                if self.instrumentation is not None and self.instrumentation.enabled:
+                    response = self._instrumented_send(request, stream=stream, timeout=timeout, **kwargs)
+                else:
+                    response = super(PooledHTTPAdapter, self).send(request, stream=stream, timeout=timeout, **kwargs)
+            except (ConnectionError, Timeout) as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                if not self._should_retry(request, attempt, breaker, e):
+                    raise
+            except Exception:
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            else:
+                retry_status = self.retry is not None and response.status_code in self.retry.statuses
+                if breaker is not None:
+                    if retry_status:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if not retry_status or not self._should_retry(request, attempt, breaker):
+                    return response
+                response.close()
+            time.sleep(self.retry.backoff(attempt))
+            attempt += 1
+
+    def _instrumented_send(self, request, stream=False, **kwargs):
+        # new vs. reused connection is told by the pool's connection count, so
+        # it may be misattributed between concurrent requests to the same host
+        connections = self._connection_counts()
+        start = time.time()
+        try:
+            response = super(PooledHTTPAdapter, self).send(request, stream=stream, **kwargs)
+            size = response.headers.get('Content-Length')
+            if size is not None:
+                size = int(size)
+            elif not stream:
+                # requests would read the body right after anyway
+                size = len(response.content)
+        except Exception as e:
+            self.instrumentation.record_request(request.method, request.url, None, time.time() - start,
+                                                error=type(e).__name__)
+            raise
+        pool = getattr(response.raw, '_pool', None)
+        new_connection = pool.num_connections > connections.get(id(pool), 0) if pool is not None else None
+        self.instrumentation.record_request(request.method, request.url, response.status_code,
+                                            time.time() - start, size, new_connection)
+        return response
+
+    def _connection_counts(self):
+        pools = self.poolmanager.pools
+        counts = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                counts[id(pool)] = pool.num_connections
+        return counts
+
+    def _should_retry(self, request, attempt, breaker, error=None):
+        if self.retry is None or not self.retry.can_retry(request.method, attempt):
+            return False
+        if isinstance(error, ReadTimeout) and not self.retry.read_timeouts:
+            return False
+        return breaker is None or breaker.allow()
+
+    def pool_stats(self):
+        return _poolmanager_stats(self.poolmanager)
+
+
+def _poolmanager_stats(poolmanager):
+    """
+    :return: {'<scheme>://<host>:<port>': {connections, requests, reused, idle}}
+    """
+    stats = {}
+    pools = poolmanager.pools
+    for key in list(pools.keys()):
+        try:
+            pool = pools[key]
+        except KeyError:
+            # evicted between keys() and lookup
+            continue
+        idle = len([c for c in list(pool.pool.queue) if c is not None]) if pool.pool else 0
+        stats['%s://%s:%s' % (pool.scheme, pool.host, pool.port)] = {
+            'connections': pool.num_connections,
+            'requests': pool.num_requests,
+            'reused': max(pool.num_requests - pool.num_connections, 0),
+            'idle': idle,
+        }
+    return stats
+
+
+def pool_stats(session):
+    """
+    Aggregate pool statistics of every adapter mounted on ``session``.
+    """
+    stats = {}
+    adapters = dict((id(a), a) for a in session.adapters.values())
+    for adapter in adapters.values():
+        poolmanager = getattr(adapter, 'poolmanager', None)
+        if poolmanager is None:
+            continue
+        for host, s in _poolmanager_stats(poolmanager).items():
+            total = stats.setdefault(host, dict.fromkeys(s, 0))
+            for k, v in s.items():
+                total[k] += v
+    return stats
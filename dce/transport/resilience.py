@@ -0,0 +1,152 @@
+# coding=utf-8
+import random
+import re
+import threading
+import time
+
+from six.moves.urllib_parse import urlsplit
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+RETRY_STATUSES = frozenset([502, 503, 504])
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+_NODE_PROXY = re.compile(r'/(?:dce|api)/nodes/([^/]+)/docker')
+
+
+class RetryPolicy(object):
+    """
+    Retries of idempotent requests on connection errors and
+    ``RETRY_STATUSES``, sleeping a random "full jitter" backoff of up to
+    ``backoff_factor * 2 ** attempt`` seconds between attempts.
+
+    Read timeouts are only retried with ``read_timeouts``: a node that hangs
+    behind a live controller would block the caller once per attempt.
+    """
+
+    def __init__(self, total=2, backoff_factor=0.1, max_backoff=5, methods=IDEMPOTENT_METHODS,
+                 statuses=RETRY_STATUSES, read_timeouts=False):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.methods = methods
+        self.statuses = statuses
+        self.read_timeouts = read_timeouts
+
+    def can_retry(self, method, attempt):
+        return attempt < self.total and method.upper() in self.methods
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+
+class CircuitBreaker(object):
+    """
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``recovery_timeout`` seconds, then lets a single trial call through
+    (half-open) that closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return CLOSED
+        if time.time() - self.opened_at >= self.recovery_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self._trial = False
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state(), 'failures': self.failures, 'opened_at': self.opened_at}
+
+
+def node_proxy_addr(url):
+    """
+    The node addressed by a DCE node proxy url, None for other urls.
+    """
+    m = _NODE_PROXY.search(urlsplit(url).path)
+    return m.group(1) if m else None
+
+
+def breaker_key(url):
+    """
+    Calls through the DCE node proxy are keyed by node, whichever controller
+    carries them: ``nodes/<addr>``; everything else by ``host:port``.
+    """
+    addr = node_proxy_addr(url)
+    if addr is not None:
+        return 'nodes/%s' % addr
+    return urlsplit(url).netloc
+
+
+class BreakerRegistry(object):
+    """
+    Circuit breakers by :func:`breaker_key`, shared by every client using the registry.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    key, CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                )
+        return breaker
+
+    def for_url(self, url):
+        return self.get(breaker_key(url))
+
+    def states(self):
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return dict((key, b.state) for key, b in breakers)
+
+    def open_keys(self):
+        return [key for key, state in self.states().items() if state == OPEN]
+
+
+DEFAULT_RETRY = RetryPolicy()
+BREAKERS = BreakerRegistry()
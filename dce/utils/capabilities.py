@@ -0,0 +1,59 @@
+# coding=utf-8
+import threading
+
+import six
+from semantic_version import Version as _V
+
+# feature -> (minimum version or None, maximum version or None), a feature
+# being the name given to the decorators or else the guarded function itself
+FEATURES = {}
+_TABLES = {}
+_lock = threading.Lock()
+
+
+def feature_name(feature):
+    """
+    Readable name of a feature: the name it was registered with, or
+    ``module.Class.method`` of a guarded function (``module.method`` on
+    Python 2, where functions do not know their class).
+    """
+    if isinstance(feature, six.string_types):
+        return feature
+    return '{0}.{1}'.format(feature.__module__, getattr(feature, '__qualname__', feature.__name__))
+
+
+def register_feature(feature, min_version=None, max_version=None):
+    with _lock:
+        current_min, current_max = FEATURES.get(feature, (None, None))
+        FEATURES[feature] = (min_version or current_min, max_version or current_max)
+        _TABLES.clear()
+
+
+def _supported(version, bounds):
+    min_version, max_version = bounds
+    if min_version and version < _V(min_version):
+        return False
+    if max_version and version > _V(max_version):
+        return False
+    return True
+
+
+def capability_table(dce_version):
+    """
+    :return: {feature: supported} for ``dce_version``, built once per version
+    """
+    table = _TABLES.get(dce_version)
+    if table is None:
+        version = _V(dce_version)
+        with _lock:
+            table = _TABLES[dce_version] = dict(
+                (feature, _supported(version, bounds)) for feature, bounds in FEATURES.items()
+            )
+    return table
+
+
+def unsupported_reason(feature, dce_version):
+    min_version, max_version = FEATURES[feature]
+    if min_version and _V(dce_version) < _V(min_version):
+        return '{0} is not available for DCE version < {1}'.format(feature_name(feature), min_version)
+    return '{0} is not available for DCE version > {1}'.format(feature_name(feature), max_version)
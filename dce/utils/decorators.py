@@ -1,39 +1,42 @@
 import functools
 
-from semantic_version import Version as _V
-
 from .. import errors
+from .capabilities import capability_table
+from .capabilities import register_feature
+from .capabilities import unsupported_reason
 
 
-def minimum_version(version):
+def _guard(feature):
     def decorator(f):
         @functools.wraps(f)
         def wrapper(self, *args, **kwargs):
-            if _V(self.dce_version) < _V(version):
-                raise errors.InvalidVersion(
-                    '{0} is not available for DCE version < {1}'.format(
-                        f.__name__, version
-                    )
-                )
+            dce_version = self.dce_version
+            if not capability_table(dce_version)[feature]:
+                raise errors.InvalidVersion(unsupported_reason(feature, dce_version))
             return f(self, *args, **kwargs)
 
+        # every feature guarding the call, for BaseDCEAPIClient.supports
+        wrapper.features = getattr(f, 'features', ()) + (feature,)
         return wrapper
 
     return decorator
 
 
-def maximum_version(version):
+def minimum_version(version, feature=None):
+    """
+    :param feature: a name shared by the methods guarded together, by default
+        each decorated function is a feature of its own
+    """
     def decorator(f):
-        @functools.wraps(f)
-        def wrapper(self, *args, **kwargs):
-            if _V(self.dce_version) > _V(version):
-                raise errors.InvalidVersion(
-                    '{0} is not available for DCE version > {1}'.format(
-                        f.__name__, version
-                    )
-                )
-            return f(self, *args, **kwargs)
+        register_feature(feature or f, min_version=version)
+        return _guard(feature or f)(f)
 
-        return wrapper
+    return decorator
+
+
+def maximum_version(version, feature=None):
+    def decorator(f):
+        register_feature(feature or f, max_version=version)
+        return _guard(feature or f)(f)
 
     return decorator
@@ -0,0 +1,136 @@
+# coding=utf-8
+import struct
+
+from ..consts import DEFAULT_STREAM_CHUNK_SIZE
+from ..consts import STREAM_HEADER_SIZE_BYTES
+from ..errors import StreamParseError
+
+STDIN = 0
+STDOUT = 1
+STDERR = 2
+# errors of the daemon itself, e.g. an attach failing mid-stream
+SYSTEMERR = 3
+
+_HEADER = struct.Struct('>B3sL')
+_PADDING = b'\x00\x00\x00'
+
+
+class FrameDemuxer(object):
+    """
+    Splits the multiplexed stdout/stderr stream of ``logs`` and ``attach``
+    (an 8 byte ``[stream, 0, 0, 0, size]`` header before every frame) into
+    ``(stream, payload)`` pairs, without copying the payloads that lie whole
+    in a chunk. ``stream`` is :data:`STDOUT`, :data:`STDERR`, or
+    :data:`SYSTEMERR` for the errors the daemon writes into the stream.
+
+    Payloads are ``memoryview`` s into the chunk fed, or into a reusable
+    buffer of ``capacity`` bytes for frames split across chunks. They are
+    only valid until the next pair is requested: call ``bytes()`` on those to
+    be kept. A frame larger than ``capacity`` is yielded in several parts.
+    """
+
+    def __init__(self, capacity=DEFAULT_STREAM_CHUNK_SIZE):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._header = bytearray(STREAM_HEADER_SIZE_BYTES)
+        self._header_size = 0
+        self._stream = None
+        self._remaining = 0  # payload bytes of the current frame not read yet
+        self._buffered = 0  # of them, how many wait in the buffer
+        self.frames = 0
+
+    @property
+    def pending(self):
+        """
+        True while a frame is only partially read.
+        """
+        return bool(self._header_size or self._remaining)
+
+    def _parse_header(self, data, pos=0):
+        stream, padding, size = _HEADER.unpack_from(data, pos)
+        if stream > SYSTEMERR or padding != _PADDING:
+            raise StreamParseError('Corrupt stream header {0!r}'.format(
+                bytes(data[pos:pos + STREAM_HEADER_SIZE_BYTES])))
+        self.frames += 1
+        return stream, size
+
+    def feed(self, chunk):
+        """
+        Yield the ``(stream, payload)`` pairs completed by ``chunk``, a
+        bytes-like object that must not change until they are consumed.
+        """
+        view = memoryview(chunk)
+        end = len(view)
+        pos = 0
+        header_size = STREAM_HEADER_SIZE_BYTES
+        while pos < end:
+            if not self._remaining:
+                if not self._header_size and end - pos >= header_size:
+                    self._stream, self._remaining = self._parse_header(view, pos)
+                    pos += header_size
+                    continue
+                take = min(header_size - self._header_size, end - pos)
+                self._header[self._header_size:self._header_size + take] = view[pos:pos + take]
+                self._header_size += take
+                pos += take
+                if self._header_size < header_size:
+                    break
+                self._header_size = 0
+                self._stream, self._remaining = self._parse_header(self._header)
+                continue
+
+            take = min(self._remaining, end - pos)
+            if not self._buffered and take == self._remaining:
+                # the whole payload is in this chunk
+                self._remaining = 0
+                pos += take
+                yield self._stream, view[pos - take:pos]
+                continue
+
+            take = min(take, self.capacity - self._buffered)
+            self._view[self._buffered:self._buffered + take] = view[pos:pos + take]
+            self._buffered += take
+            self._remaining -= take
+            pos += take
+            if not self._remaining or self._buffered == self.capacity:
+                size, self._buffered = self._buffered, 0
+                yield self._stream, self._view[:size]
+
+    def close(self):
+        """
+        :raise StreamParseError: if the stream ended inside a frame
+        """
+        if self.pending:
+            raise StreamParseError('Stream ended inside a frame, {0} bytes missing'.format(
+                self._remaining or STREAM_HEADER_SIZE_BYTES - self._header_size))
+
+
+def demux_chunks(chunks, capacity=DEFAULT_STREAM_CHUNK_SIZE):
+    """
+    Yield the ``(stream, payload)`` pairs of an iterable of bytes chunks, see
+    :class:`FrameDemuxer`.
+    """
+    demuxer = FrameDemuxer(capacity)
+    for chunk in chunks:
+        for frame in demuxer.feed(chunk):
+            yield frame
+    demuxer.close()
+
+
+def demux_raw(raw, capacity=DEFAULT_STREAM_CHUNK_SIZE):
+    """
+    Like :func:`demux_chunks`, reading ``raw`` (a ``response.raw`` or any
+    object with ``readinto``) into a reusable buffer: nothing is allocated
+    per chunk or per frame.
+    """
+    buf = bytearray(capacity)
+    view = memoryview(buf)
+    demuxer = FrameDemuxer(capacity)
+    while True:
+        size = raw.readinto(buf)
+        if not size:
+            break
+        for frame in demuxer.feed(view[:size]):
+            yield frame
+    demuxer.close()
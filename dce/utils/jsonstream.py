@@ -0,0 +1,70 @@
+# coding=utf-8
+import codecs
+import itertools
+import json
+import re
+
+import six
+
+_SEPARATORS = re.compile(r'[\s,]*')
+_SCALAR_END = re.compile(r'[\s,\]]')
+_DECODER = json.JSONDecoder()
+_END = object()
+
+
+def iter_json_array(chunks, decoder=_DECODER):
+    """
+    Incrementally yield the elements of a top level JSON array read from an
+    iterable of ``bytes`` (utf-8) or text chunks, e.g.
+    ``response.iter_content(chunk_size)``.
+
+    Only the element being parsed is held in memory, elements are decoded with
+    ``decoder.raw_decode`` as soon as they are complete.
+    """
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    buf = ''
+    pos = 0
+    opened = False
+    # an incomplete element is only decoded again once its pending text
+    # doubled, so elements larger than a chunk aren't parsed over and over
+    retry_at = 0
+
+    for chunk in itertools.chain(chunks, (_END,)):
+        final = chunk is _END
+        if not final:
+            if isinstance(chunk, six.binary_type):
+                chunk = decode(chunk)
+            if not chunk:
+                continue
+            buf = buf[pos:] + chunk
+            pos = 0
+            if len(buf) < retry_at:
+                continue
+        retry_at = 0
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            c = buf[pos]
+            if not opened:
+                if c != '[':
+                    raise ValueError('Expected a JSON array, got {0!r}'.format(buf[pos:pos + 16]))
+                opened = True
+                pos += 1
+                continue
+            if c == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if not final:
+                    retry_at = 2 * (len(buf) - pos)
+                break
+            if c not in '[{"' and not _SCALAR_END.match(buf, end):
+                # "-1." decodes as -1: a number is only complete when followed
+                # by a separator, it may continue in the next chunk
+                break
+            yield item
+            pos = end
+
+    raise ValueError('Truncated JSON array')
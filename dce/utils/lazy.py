@@ -0,0 +1,42 @@
+# coding=utf-8
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a package whose ``exports``, ``{name: relative module}``,
+    are only imported from their submodule on first attribute access.
+    """
+
+    def __init__(self, module, exports):
+        super(LazyModule, self).__init__(module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        self.__dict__['_lazy_exports'] = exports
+        # python 2 clears the globals of a module once it is garbage collected
+        self.__dict__['_lazy_original'] = module
+
+    def __getattr__(self, name):
+        try:
+            target = self.__dict__['_lazy_exports'][name]
+        except KeyError:
+            raise AttributeError("module '{0}' has no attribute '{1}'".format(self.__name__, name))
+        value = getattr(importlib.import_module(target, self.__name__), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_exports))
+
+
+def lazy_exports(name, exports):
+    """
+    Replace the module ``name`` in ``sys.modules`` with a :class:`LazyModule`,
+    to be called at the very end of a package ``__init__``::
+
+        lazy_exports(__name__, {'DCEDockerClient': '.dockerutils'})
+    """
+    module = LazyModule(sys.modules[name], exports)
+    sys.modules[name] = module
+    return module
@@ -0,0 +1,208 @@
+# coding=utf-8
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from inspect import Parameter, signature
+except ImportError:  # python 2
+    from inspect import getargspec
+
+    signature = None
+
+DEFAULT_MEMO_MAXSIZE = 128
+
+
+class _Identity(object):
+    """
+    Key of an unhashable argument (dict, list), by identity. It references the
+    argument, so that its id is not reused while the cache entry lives.
+    """
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return id(self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.value is self.value
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return _Identity(value)
+    return value
+
+
+def make_key_func(fn, skip=('self',)):
+    """
+    Precompute how calls of ``fn`` are bound to a cache key, so that ``f(1)``,
+    ``f(a=1)`` and ``f(1, b=<default>)`` share one entry. Hashable arguments,
+    e.g. client objects, are used as is, not stringified.
+    """
+    if signature is not None:
+        params = [p for p in signature(fn).parameters.values()
+                  if p.kind in (Parameter.POSITIONAL_OR_KEYWORD, Parameter.KEYWORD_ONLY)]
+        names = [p.name for p in params]
+        defaults = dict((p.name, p.default) for p in params if p.default is not Parameter.empty)
+    else:
+        spec = getargspec(fn)
+        names = spec.args
+        defaults = dict(zip(reversed(spec.args), reversed(spec.defaults or ())))
+    key_names = tuple(n for n in names if n not in skip)
+    positional = tuple(names)
+
+    def key_func(args, kwargs):
+        bound = dict(defaults)
+        bound.update(zip(positional, args))
+        bound.update(kwargs)
+        return tuple(_hashable(bound.get(n)) for n in key_names)
+
+    return key_func
+
+
+class MemoCache(object):
+    """
+    Thread-safe LRU cache with an optional per-entry expiry.
+
+    Concurrent misses of the same key wait for one computation instead of
+    repeating it. Exceptions are not cached.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MEMO_MAXSIZE, expire=None):
+        self.maxsize = maxsize
+        self.expire = expire
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._inflight = {}  # key -> threading.Event
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None:
+                    if not self._expired(entry):
+                        self._data[key] = self._data.pop(key)
+                        self.hits += 1
+                        return entry[0]
+                    del self._data[key]
+                    self.expirations += 1
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    inflight = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            inflight.wait()
+
+        try:
+            value = compute()
+        except Exception:
+            with self._lock:
+                self._inflight.pop(key).set()
+            raise
+
+        with self._lock:
+            expires_at = time.time() + self.expire if self.expire else None
+            self._data[key] = (value, expires_at)
+            while self.maxsize and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            self._inflight.pop(key).set()
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    @staticmethod
+    def _expired(entry):
+        return entry[1] is not None and time.time() >= entry[1]
+
+
+class _Call(object):
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Collapses concurrent calls with the same key into one: callers arriving
+    while it runs wait for it and share its result or exception. Unlike
+    :class:`MemoCache` nothing is kept once the call completes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+    def stats(self):
+        with self._lock:
+            return {'inflight': len(self._calls), 'calls': self.calls, 'shared': self.shared}
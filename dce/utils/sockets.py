@@ -0,0 +1,30 @@
+# coding=utf-8
+import socket
+
+
+def response_socket(response):
+    """
+    The socket a streamed ``requests`` response reads from, or None.
+    """
+    fp = getattr(getattr(response, 'raw', None), '_fp', None)  # http.client.HTTPResponse
+    fp = getattr(fp, 'fp', None)
+    # python 3: BufferedReader(SocketIO), python 2: socket._fileobject
+    fp = getattr(fp, 'raw', fp)
+    return getattr(fp, '_sock', None)
+
+
+def shutdown_response(response):
+    """
+    Interrupt a thread blocked reading the streamed ``response``, then close it.
+
+    Closing the response alone does not wake the reader up on an idle stream,
+    shutting the socket down makes its pending read return end of file.
+    """
+    sock = response_socket(response)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except (socket.error, OSError):
+            # already closed
+            pass
+    response.close()
@@ -7,10 +7,12 @@ import functools
 # import json
 # import os
 # import string
-import time
 # from collections import namedtuple
 # from datetime import datetime
-from inspect import getargspec
+
+from .memo import DEFAULT_MEMO_MAXSIZE
+from .memo import MemoCache
+from .memo import make_key_func
 
 
 def str2bool(v, default):
@@ -56,34 +58,26 @@ def str2bool(v, default):
 #             print('%s%s = %s' % (prefix, k, v))
 
 
-def memoize(fn):
-    cache = fn.cache = {}
-
-    @functools.wraps(fn)
-    def _memoize(*args, **kwargs):
-        kwargs.update(dict(zip(getargspec(fn).args, args)))
-        key = tuple(kwargs.get(k, None) for k in getargspec(fn).args if k != 'self')
-        if key not in cache:
-            cache[key] = fn(**kwargs)
-        return cache[key]
-
-    return _memoize
+def memoize(fn=None, maxsize=DEFAULT_MEMO_MAXSIZE):
+    """
+    Usable as ``@memoize`` or ``@memoize(maxsize=...)``; ``fn.cache`` is the
+    underlying :class:`dce.utils.memo.MemoCache`.
+    """
+    if fn is None:
+        return functools.partial(memoize, maxsize=maxsize)
+    return memoize_with_expire(None, maxsize=maxsize)(fn)
 
 
-def memoize_with_expire(expire):
+def memoize_with_expire(expire, maxsize=DEFAULT_MEMO_MAXSIZE):
     def _memoize(fn):
-        cache = fn.cache = {}
-        cache['__last_cached_time'] = time.time()
+        cache = fn.cache = MemoCache(maxsize=maxsize, expire=expire)
+        key_func = make_key_func(fn)
 
         @functools.wraps(fn)
         def __memoize(*args, **kwargs):
-            kwargs.update(dict(zip(getargspec(fn).args, args)))
-            key = tuple(kwargs.get(k, None) for k in getargspec(fn).args if k != 'self')
-            if key not in cache or time.time() > cache['__last_cached_time'] + expire:
-                cache[key] = fn(**kwargs)
-                cache['__last_cached_time'] = time.time()
-            return cache[key]
+            return cache.get_or_compute(key_func(args, kwargs), lambda: fn(*args, **kwargs))
 
+        __memoize.cache = cache
         return __memoize
 
     return _memoize
@@ -104,13 +98,15 @@ def memoize_with_expire(expire):
 
 
 def memoize_in_object(fn):
+    key_func = make_key_func(fn)
+    attr = '__cache__%s__' % fn.__name__
+
     @functools.wraps(fn)
     def _memoize(self, *args, **kwargs):
-        kwargs.update(dict(zip(getargspec(fn).args, args)))
-        key = '__cache__%s__' % fn.__name__ + ','.join(str(kwargs.get(k, None)) for k in getargspec(fn).args)
-        if not hasattr(self, key):
-            setattr(self, key, fn(self, **kwargs))
-        return getattr(self, key)
+        cache = self.__dict__.get(attr)
+        if cache is None:
+            cache = self.__dict__.setdefault(attr, MemoCache(maxsize=None))
+        return cache.get_or_compute(key_func((self,) + args, kwargs), lambda: fn(self, *args, **kwargs))
 
     return _memoize
 
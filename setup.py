@@ -11,10 +11,14 @@ SOURCE_DIR = os.path.join(ROOT_DIR)
 
 requirements = [
     'docker >= 2.5.1',
-    'semantic-version >= 2.6.0'
+    'semantic-version >= 2.6.0',
+    'futures >= 3.1.1; python_version < "3"'
 ]
 
-extras_require = {}
+extras_require = {
+    'async': ['aiohttp >= 3.0; python_version >= "3.5"'],
+    'stats': ['numpy'],
+}
 
 version = None
 exec (open('dce/version.py').read())
@@ -37,7 +41,7 @@ setup(
     description="Python library for DaoCloud Enterprise API.",
     long_description=long_description,
     url='https://github.com/dceplugins/dce-client',
-    packages=find_packages(exclude=["tests.*", "tests"]),
+    packages=find_packages(exclude=["tests.*", "tests", "benchmarks.*", "benchmarks"]),
     install_requires=requirements,
     tests_require=test_requirements,
     extras_require=extras_require,
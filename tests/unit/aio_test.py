@@ -0,0 +1,117 @@
+# coding=utf-8
+import asyncio
+import unittest
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    web = None
+
+from dce.errors import APIError
+from dce.errors import InvalidVersion
+
+
+def application(dce_version='3.0.0', prefix='api'):
+    hits = {'version': 0}
+
+    async def version(request):
+        hits['version'] += 1
+        # concurrent negotiations overlap here
+        await asyncio.sleep(0.05)
+        return web.json_response({'DCEVersion': dce_version})
+
+    async def info(request):
+        return web.json_response({'Token': request.headers.get('X-DCE-Access-Token')})
+
+    async def failing(request):
+        return web.json_response({'message': 'controller is busy'}, status=503)
+
+    async def containers(request):
+        if request.match_info['node'] != 'n1':
+            return web.json_response({'message': 'no such node'}, status=404)
+        return web.json_response([{'Id': 'c1'}])
+
+    app = web.Application()
+    app.router.add_get('/%s/version' % prefix, version)
+    app.router.add_get('/%s/info' % prefix, info)
+    app.router.add_get('/%s/now' % prefix, failing)
+    app.router.add_get('/%s/nodes/{node}/docker/containers/json' % prefix, containers)
+    return app, hits
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class AsyncDCEAPIClientTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.wait(self.server.close())
+        self.loop.close()
+
+    def wait(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def client(self, app, **kwargs):
+        from dce.api.aio import AsyncDCEAPIClient
+
+        self.server = TestServer(app, loop=self.loop)
+        self.wait(self.server.start_server(loop=self.loop))
+        kwargs.setdefault('discovery_cache', None)
+        return AsyncDCEAPIClient(str(self.server.make_url('')), **kwargs)
+
+    def test_negotiate_falls_back_to_api(self):
+        app, hits = application(prefix='api')
+        # built outside of the loop, the negotiation lock is created on first use
+        client = self.client(app, token='t')
+
+        async def calls():
+            await asyncio.gather(*[client.negotiate() for _ in range(5)])
+            return await client.info()
+
+        self.assertEqual(self.wait(calls()), {'Token': 't'})
+        self.assertEqual(client.prefix, 'api')
+        self.assertEqual(client.dce_version, '3.0.0')
+        self.assertEqual(hits['version'], 1)
+        self.wait(client.close())
+
+    def test_unsupported_version(self):
+        app, _ = application(dce_version='2.5.0', prefix='dce')
+        client = self.client(app)
+        self.assertRaises(InvalidVersion, self.wait, client.negotiate())
+        self.assertIsNone(client.prefix)
+        self.wait(client.close())
+
+    def test_errors(self):
+        app, _ = application(prefix='dce')
+        client = self.client(app)
+        with self.assertRaises(APIError) as cm:
+            self.wait(client.now())
+        self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(cm.exception.explanation, 'controller is busy')
+
+        from docker.errors import NotFound
+
+        self.assertEqual(self.wait(client.docker('n1').containers()), [{'Id': 'c1'}])
+        with self.assertRaises(NotFound) as cm:
+            self.wait(client.docker('n2').containers())
+        self.assertEqual(cm.exception.explanation, 'no such node')
+        self.wait(client.close())
+
+    def test_close(self):
+        app, _ = application()
+        client = self.client(app)
+
+        async def calls():
+            async with client:
+                docker = client.docker('n1')
+                await docker.containers()
+                # node clients share the session of their controller client
+                await docker.close()
+                self.assertFalse(client.session.closed)
+                return client.session
+
+        session = self.wait(calls())
+        self.assertTrue(session.closed)
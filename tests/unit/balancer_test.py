@@ -0,0 +1,132 @@
+import json
+import socket
+import threading
+import unittest
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+import requests
+
+from dce.api.client import BaseDCEAPIClient
+from dce.dockerutils.client import DCEDockerAPIClient
+from dce.errors import CircuitOpenError
+from dce.transport import BreakerRegistry, ControllerPool
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.hits += 1
+        if '/nodes/dead/' in self.path and self.path.endswith('/info'):
+            # the proxied node went away mid-request
+            self.close_connection = True
+            return
+        if self.path.endswith('/version'):
+            body = {'DCEVersion': '2.10.0', 'ApiVersion': '1.30'}
+        else:
+            body = {'Name': self.server.name}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+def start(name):
+    server = Server(('127.0.0.1', 0), Handler)
+    server.name = name
+    server.hits = 0
+    threading.Thread(target=server.serve_forever).start()
+    return server, 'http://127.0.0.1:%d' % server.server_address[1]
+
+
+def unused_url():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return 'http://127.0.0.1:%d' % port
+
+
+class ControllerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.a, self.url_a = start('a')
+        self.b, self.url_b = start('b')
+
+    def tearDown(self):
+        for server in (self.a, self.b):
+            server.shutdown()
+            server.server_close()
+
+    def client(self, urls):
+        return BaseDCEAPIClient(controllers=urls, discovery_cache=None, breakers=BreakerRegistry(),
+                                timeout=2, connect_timeout=1)
+
+    def test_spreads_concurrent_requests(self):
+        client = self.client([self.url_a, self.url_b])
+        threads = [threading.Thread(target=lambda: [client._fetch_info() for _ in range(10)]) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertGreater(self.a.hits, 5)
+        self.assertGreater(self.b.hits, 5)
+        self.assertEqual(sum(s['outstanding'] for s in client.controllers.stats().values()), 0)
+
+    def test_failover_and_health_check(self):
+        down = unused_url()
+        client = self.client([down, self.url_a])
+        for _ in range(3):
+            self.assertEqual(client._fetch_info()['Name'], 'a')
+        stats = client.controllers.stats()
+        self.assertFalse(stats[down]['healthy'])
+        self.assertEqual(stats[down]['failures'], 1)
+
+        client.controllers.update([down, self.url_a, self.url_b])
+        client.controllers.check()
+        stats = client.controllers.stats()
+        self.assertFalse(stats[down]['healthy'])
+        self.assertTrue(stats[self.url_b]['healthy'])
+
+    def test_foreign_urls_pass_through(self):
+        pool = ControllerPool([self.url_a])
+        self.assertTrue(pool.owns(self.url_a + '/dce/nodes/n1/docker/info'))
+        self.assertFalse(pool.owns(self.url_b + '/dce/info'))
+        self.assertEqual(ControllerPool.route(self.url_b + '/dce/info?x=1', pool.choose()),
+                         self.url_a + '/dce/info?x=1')
+
+    def test_docker_client_from_controller_urls(self):
+        client = DCEDockerAPIClient(self.url_a + '/dce/nodes/10.0.0.1/docker', controllers=[self.url_a, self.url_b],
+                                    breakers=BreakerRegistry())
+        self.assertIsInstance(client.controllers, ControllerPool)
+        # node proxy calls get a short read timeout by default
+        self.assertEqual(client.timeout, 30)
+        self.assertEqual(DCEDockerAPIClient(self.url_a + '/dce/nodes/10.0.0.1/docker', node_timeout=None).timeout, 60)
+        for _ in range(10):
+            client.info()
+        self.assertGreater(self.b.hits, 0)
+
+    def test_node_errors_do_not_mark_controllers_down(self):
+        breakers = BreakerRegistry(failure_threshold=1, recovery_timeout=60)
+        client = DCEDockerAPIClient(self.url_a + '/dce/nodes/dead/docker',
+                                    controllers=[self.url_a, self.url_b], breakers=breakers, retry=None)
+        hits = self.a.hits + self.b.hits
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.info()
+        # not failed over to the other controller
+        self.assertEqual(self.a.hits + self.b.hits, hits + 1)
+        # the node's breaker is open now, whichever controller is picked
+        with self.assertRaises(CircuitOpenError):
+            client.info()
+        self.assertTrue(client.circuit_open)
+        self.assertEqual([s['healthy'] for s in client.controllers.stats().values()], [True, True])
@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from docker.errors import NotFound
+
+from dce.dockerutils.batch import batch_inspect
+from dce.utils.memo import SingleFlight
+
+
+class FakeClient(object):
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def inspect_service(self, service_id):
+        with self.lock:
+            self.calls.append(service_id)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if service_id == 'missing':
+                raise NotFound('no such service')
+            if service_id == 'broken':
+                raise ValueError('bad response')
+            return {'ID': service_id}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class BatchInspectTest(unittest.TestCase):
+    def test_results_and_errors(self):
+        client = FakeClient()
+        result = batch_inspect(client, 'service', ['a', 'b', 'a', 'missing', 'broken'])
+        self.assertEqual(result.results, {'a': {'ID': 'a'}, 'b': {'ID': 'b'}})
+        self.assertEqual(result.not_found, {'missing'})
+        self.assertIsInstance(result.errors['broken'], ValueError)
+        self.assertFalse(result.ok)
+        self.assertEqual(sorted(client.calls), ['a', 'b', 'broken', 'missing'])
+
+    def test_concurrency_limit(self):
+        client = FakeClient(delay=0.02)
+        result = batch_inspect(client, 'service', ['s%d' % i for i in range(12)], max_workers=3)
+        self.assertEqual(len(result.results), 12)
+        self.assertLessEqual(client.max_active, 3)
+
+    def test_concurrent_batches_share_inflight(self):
+        client = FakeClient(delay=0.1)
+        flight = SingleFlight()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            batch_inspect(client, 'service', ['a', 'b'], single_flight=flight))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(client.calls), ['a', 'b'])
+        self.assertTrue(all(r.results == {'a': {'ID': 'a'}, 'b': {'ID': 'b'}} for r in results))
+        self.assertEqual(flight.stats(), {'inflight': 0, 'calls': 2, 'shared': 6})
@@ -0,0 +1,154 @@
+import json
+import threading
+import unittest
+
+import requests
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from dce.dockerutils.client import DCEDockerAPIClient, DCEDockerClient
+from dce.transport import PooledHTTPAdapter, ResponseCache
+from dce.transport.cache import cache_endpoint
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.hits.append(self.path)
+        headers = {}
+        if self.path == '/dce/version':
+            headers['ETag'] = '"v1"'
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self._reply(304, b'', headers)
+            body = {'DCEVersion': '2.10.0'}
+        elif self.path.endswith('/docker/version'):
+            body = {'ApiVersion': '1.30'}
+        elif self.path.endswith('/services'):
+            body = [{'ID': 's%d' % i} for i in range(server.services)]
+        else:
+            body = {'Name': 'controller'}
+        self._reply(200, json.dumps(body).encode('utf-8'), headers)
+
+    do_POST = do_GET
+
+    def _reply(self, status, data, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.hits = []
+        self.server.services = 2
+        threading.Thread(target=self.server.serve_forever).start()
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def session(self, cache):
+        session = requests.Session()
+        session.mount('http://', PooledHTTPAdapter(cache=cache))
+        return session
+
+    def test_cache_endpoint(self):
+        self.assertEqual(cache_endpoint('http://c/dce/info'), '/{@}/info')
+        self.assertEqual(cache_endpoint('http://c/api/nodes/n1/docker/v1.30/services?filters=x'), '/services')
+        self.assertEqual(cache_endpoint('http://c/v1.30/services/abc'), '/services/{id}')
+
+    def test_fresh_hit(self):
+        cache = ResponseCache(policies={'/{@}/info': 60})
+        session = self.session(cache)
+        first = session.get(self.base + '/dce/info').json()
+        second = session.get(self.base + '/dce/info')
+        self.assertEqual(second.cache_status, 'hit')
+        self.assertEqual(second.json(), first)
+        self.assertEqual(len(self.server.hits), 1)
+
+    def test_decoded_json_is_not_shared(self):
+        cache = ResponseCache(policies={'/{@}/info': 60})
+        session = self.session(cache)
+        session.get(self.base + '/dce/info')
+        response = session.get(self.base + '/dce/info')
+        first = response.json()
+        expected = dict(first)
+        first['mutated'] = True
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(session.get(self.base + '/dce/info').json(), expected)
+
+    def test_etag_revalidation(self):
+        cache = ResponseCache(policies={'/{@}/version': 0})
+        session = self.session(cache)
+        session.get(self.base + '/dce/version')
+        response = session.get(self.base + '/dce/version')
+        self.assertEqual(response.cache_status, 'revalidated')
+        self.assertEqual(response.json(), {'DCEVersion': '2.10.0'})
+        self.assertEqual(len(self.server.hits), 2)
+
+    def test_unchanged_content_reuses_models(self):
+        cache = ResponseCache(policies={'/services': 0})
+        session = self.session(cache)
+        url = self.base + '/dce/nodes/n1/docker/v1.30/services'
+        session.get(url)
+        unchanged = session.get(url)
+        self.assertEqual(unchanged.cache_status, 'unchanged')
+        built = []
+
+        def build(services):
+            built.append(services)
+            return tuple(s['ID'] for s in services)
+
+        models = unchanged.models('ids', build)
+        again = session.get(url)
+        self.assertEqual(again.json(), unchanged.json())
+        self.assertIsNot(again.json(), unchanged.json())
+        self.assertIs(again.models('ids', build), models)
+        self.assertEqual(len(built), 1)
+        self.server.services = 3
+        changed = session.get(url)
+        self.assertEqual(changed.cache_status, 'miss')
+        self.assertEqual(len(changed.json()), 3)
+        stats = cache.stats()
+        self.assertEqual((stats['miss'], stats['unchanged']), (2, 2))
+        # unchanged bodies were transferred again, they are no hits
+        self.assertEqual(stats['hit_rate'], 0.0)
+
+    def test_service_views_reused(self):
+        cache = ResponseCache(policies={'/services': 0})
+        api = DCEDockerAPIClient(self.base + '/dce/nodes/n1/docker', response_cache=cache)
+        client = DCEDockerClient.from_api_client(api)
+        first, second, third = client.service_views(), client.service_views(), client.service_views()
+        self.assertEqual([v.id for v in first], ['s0', 's1'])
+        self.assertEqual(second, first)
+        self.assertIs(third[0], second[0])
+        self.server.services = 3
+        self.assertEqual(len(client.service_views()), 3)
+
+    def test_writes_invalidate_and_bytes_bound(self):
+        cache = ResponseCache(policies={'/{@}/info': 60, '/services': 60}, max_bytes=150)
+        session = self.session(cache)
+        session.get(self.base + '/dce/info')
+        session.post(self.base + '/dce/info')
+        self.assertEqual(len(cache), 0)
+
+        self.server.services = 20
+        session.get(self.base + '/dce/nodes/n1/docker/v1.30/services')
+        self.assertEqual(len(cache), 0)
+        session.get(self.base + '/dce/info')
+        self.assertLessEqual(cache.stats()['bytes'], 150)
@@ -0,0 +1,83 @@
+# coding=utf-8
+import unittest
+
+from dce.api.client import DCEAPIClient
+from dce.errors import InvalidVersion
+from dce.utils.capabilities import capability_table
+from dce.utils.capabilities import register_feature
+from dce.utils.decorators import maximum_version
+from dce.utils.decorators import minimum_version
+
+
+class Old(object):
+    def __init__(self, dce_version):
+        self.dce_version = dce_version
+
+    @minimum_version('2.7.0')
+    def scale(self):
+        return 'old'
+
+
+class New(Old):
+    @minimum_version('3.0.0')
+    @maximum_version('3.2.0')
+    def scale(self):
+        return 'new'
+
+
+class Client(DCEAPIClient):
+    dce_version = '2.7.13'
+
+
+class CapabilitiesTest(unittest.TestCase):
+    def test_bounds(self):
+        register_feature('test.bounded', min_version='2.7.0', max_version='3.0.0')
+        register_feature('test.open')
+        for version, supported in [('2.6.9', False), ('2.7.0', True), ('3.0.0', True), ('3.0.1', False)]:
+            table = capability_table(version)
+            self.assertEqual(table['test.bounded'], supported, version)
+            self.assertTrue(table['test.open'])
+
+    def test_unsupported_version(self):
+        self.assertEqual(Old('2.7.0').scale(), 'old')
+        with self.assertRaises(InvalidVersion) as cm:
+            Old('2.6.0').scale()
+        self.assertIn('< 2.7.0', str(cm.exception))
+        with self.assertRaises(InvalidVersion) as cm:
+            New('3.3.0').scale()
+        self.assertIn('> 3.2.0', str(cm.exception))
+
+    def test_same_name_on_different_classes(self):
+        # keyed by the guarded functions, not by their names, which are the
+        # same for both on Python 2
+        self.assertEqual(len(set(Old.scale.features + New.scale.features)), 3)
+        self.assertEqual(Old('2.8.0').scale(), 'old')
+        self.assertRaises(InvalidVersion, New('2.8.0').scale)
+        self.assertEqual(New('3.1.0').scale(), 'new')
+
+    def test_supports_method_names(self):
+        client = Client.__new__(Client)
+        self.assertTrue(client.supports('mode'))
+        self.assertTrue(client.supports('network_driver'))
+        self.assertTrue(client.capabilities['dce.api.client.BaseDCEAPIClient.mode'])
+        self.assertFalse(client.supports('unknown'))
+        Client.dce_version = '2.6.0'
+        try:
+            self.assertFalse(client.supports('mode'))
+        finally:
+            Client.dce_version = '2.7.13'
+
+    def test_named_feature(self):
+        class Shared(Old):
+            @minimum_version('2.8.0', feature='test.shared')
+            def first(self):
+                return 1
+
+            @maximum_version('3.0.0', feature='test.shared')
+            def second(self):
+                return 2
+
+        self.assertEqual(Shared.first.features, ('test.shared',))
+        self.assertRaises(InvalidVersion, Shared('2.7.0').second)
+        self.assertEqual(Shared('2.9.0').second(), 2)
+        self.assertRaises(InvalidVersion, Shared('3.1.0').first)
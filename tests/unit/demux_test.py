@@ -0,0 +1,62 @@
+# coding=utf-8
+import io
+import struct
+import unittest
+
+from dce.errors import StreamParseError
+from dce.utils.demux import STDERR, STDOUT, SYSTEMERR, FrameDemuxer, demux_chunks, demux_raw
+
+
+def frame(stream, payload):
+    return struct.pack('>BxxxL', stream, len(payload)) + payload
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def joined(frames):
+    # merge the parts of frames larger than the buffer, copying every payload
+    result = []
+    for stream, payload in frames:
+        payload = bytes(payload)
+        if result and result[-1][0] == stream and not result[-1][1].endswith(b'\n'):
+            result[-1] = (stream, result[-1][1] + payload)
+        else:
+            result.append((stream, payload))
+    return result
+
+
+class DemuxTest(unittest.TestCase):
+    frames = [(STDOUT, b'hello\n'), (STDERR, b'oops\n'), (STDOUT, b'x' * 100 + b'\n'), (STDERR, b'\n'),
+              (SYSTEMERR, b'attach failed\n')]
+    data = b''.join(frame(s, p) for s, p in frames) + frame(STDOUT, b'')
+
+    def test_every_chunk_size(self):
+        for size in (1, 3, 8, 9, 50, len(self.data)):
+            self.assertEqual(joined(demux_chunks(chunked(self.data, size))), self.frames, size)
+
+    def test_small_buffer_splits_large_frames(self):
+        frames = list((s, bytes(p)) for s, p in demux_chunks(chunked(self.data, 7), capacity=16))
+        self.assertTrue(all(len(p) <= 16 for _, p in frames))
+        self.assertEqual(joined(frames), self.frames)
+
+    def test_whole_frames_are_not_copied(self):
+        chunk = bytearray(self.data)
+        stream, payload = next(FrameDemuxer().feed(chunk))
+        chunk[8:13] = b'HELLO'
+        self.assertEqual((stream, bytes(payload)), (STDOUT, b'HELLO\n'))
+
+    def test_readinto(self):
+        self.assertEqual(joined(demux_raw(io.BytesIO(self.data), capacity=32)), self.frames)
+
+    def test_corrupt_header(self):
+        with self.assertRaises(StreamParseError):
+            list(demux_chunks([frame(STDOUT, b'ok'), b'\x05\x00\x00\x00\x00\x00\x00\x01x']))
+        with self.assertRaises(StreamParseError):
+            list(demux_chunks([b'{"message": "not multiplexed"}']))
+
+    def test_truncated(self):
+        with self.assertRaises(StreamParseError) as ctx:
+            list(demux_chunks([self.data[:-3]]))
+        self.assertIn('missing', str(ctx.exception))
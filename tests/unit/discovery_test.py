@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from dce import DCEAPIClient
+from dce.api.discovery import DiscoveryCache
+
+VERSIONS = {'DCEVersion': '2.10.0'}
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path == '/dce/version':
+            body = VERSIONS
+        else:
+            body = {'Name': 'controller'}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class DiscoveryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'discovery.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_ttl(self):
+        cache = DiscoveryCache(ttl=0.05)
+        cache.set('http://c', 'dce', VERSIONS)
+        self.assertEqual(cache.get('http://c'), ('dce', VERSIONS))
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('http://c'))
+
+    def test_disk_round_trip(self):
+        DiscoveryCache(path=self.path).set('http://c', 'api', VERSIONS)
+        self.assertEqual(DiscoveryCache(path=self.path).get('http://c'), ('api', VERSIONS))
+        self.assertIsNone(DiscoveryCache(path=self.path).get('http://other'))
+
+    def test_processes_merge_entries(self):
+        # two processes, each with the file loaded before the other wrote
+        a, b = DiscoveryCache(path=self.path), DiscoveryCache(path=self.path)
+        a.get('http://a')
+        b.get('http://b')
+        a.set('http://a', 'dce', VERSIONS)
+        b.set('http://b', 'api', VERSIONS)
+        fresh = DiscoveryCache(path=self.path)
+        self.assertEqual(fresh.get('http://a'), ('dce', VERSIONS))
+        self.assertEqual(fresh.get('http://b'), ('api', VERSIONS))
+        # a sees the entry b wrote since
+        self.assertEqual(a.get('http://b'), ('api', VERSIONS))
+
+    def test_invalidate(self):
+        cache = DiscoveryCache(path=self.path)
+        cache.set('http://a', 'dce', VERSIONS)
+        cache.set('http://b', 'dce', VERSIONS)
+        cache.invalidate('http://a')
+        self.assertIsNone(cache.get('http://a'))
+        self.assertIsNone(DiscoveryCache(path=self.path).get('http://a'))
+        self.assertIsNotNone(DiscoveryCache(path=self.path).get('http://b'))
+        cache.invalidate()
+        self.assertIsNone(DiscoveryCache(path=self.path).get('http://b'))
+
+
+class DiscoveryClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.hits = []
+        threading.Thread(target=self.server.serve_forever).start()
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_lazy_discovery(self):
+        client = DCEAPIClient(self.base, lazy=True, discovery_cache=None)
+        self.assertEqual(self.server.hits, [])
+        self.assertEqual(client.prefix, 'dce')
+        self.assertEqual(self.server.hits, ['/dce/version'])
+
+    def test_discovered_clients_skip_negotiation(self):
+        cache = DiscoveryCache()
+        DCEAPIClient(self.base, discovery_cache=cache)
+        client = DCEAPIClient(self.base, discovery_cache=cache)
+        self.assertEqual(client.prefix, 'dce')
+        self.assertEqual(client.dce_version, '2.10.0')
+        self.assertEqual(self.server.hits, ['/dce/version'])
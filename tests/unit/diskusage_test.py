@@ -0,0 +1,113 @@
+# coding=utf-8
+import threading
+import time
+import unittest
+
+from docker.errors import APIError
+
+from dce.dockerutils.diskusage import DiskUsageScanner
+
+
+def df(images=(), volumes=(), containers=(), build_cache=()):
+    return {'LayersSize': sum(i['Size'] for i in images), 'Images': list(images), 'Volumes': list(volumes),
+            'Containers': list(containers), 'BuildCache': list(build_cache)}
+
+
+def image(image_id, size, shared=0, containers=0, tags=(), created=0):
+    return {'Id': image_id, 'Size': size, 'SharedSize': shared, 'Containers': containers,
+            'RepoTags': list(tags) or ['<none>:<none>'], 'RepoDigests': [], 'Created': created}
+
+
+def volume(name, size, refs=0):
+    return {'Name': name, 'UsageData': {'Size': size, 'RefCount': refs}}
+
+
+class FakeClient(object):
+    def __init__(self, node, usage, delay=0):
+        self.node_addr = node
+        self.usage = usage
+        self.delay = delay
+        self.removed = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def df(self):
+        if self.usage is None:
+            raise APIError('node down')
+        return self.usage
+
+    def _remove(self, kind, target):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+            self.removed.append((kind, target))
+        if target == 'busy':
+            raise APIError('conflict: image is being used')
+
+    def remove_image(self, reference):
+        self._remove('image', reference)
+
+    def remove_volume(self, name):
+        self._remove('volume', name)
+
+    def remove_container(self, container):
+        self._remove('container', container)
+
+
+class DiskUsageScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.a = FakeClient('10.0.0.1', df(
+            images=[image('sha256:base', 100, shared=100, containers=1, tags=['base:1']),
+                    image('sha256:app', 150, shared=100, tags=['app:1', 'app:latest'], created=2),
+                    image('sha256:old', 130, shared=100, created=1)],
+            volumes=[volume('data', 40, refs=1), volume('orphan', 25)],
+            containers=[{'Id': 'c1', 'SizeRw': 5, 'State': 'exited'}, {'Id': 'c2', 'SizeRw': 9, 'State': 'running'}],
+            build_cache=[{'ID': 'b1', 'Size': 7, 'InUse': False, 'Shared': False}]))
+        self.b = FakeClient('10.0.0.2', df(
+            images=[image('sha256:app', 150, shared=0, tags=['app:1'])],
+            volumes=[volume('orphan', 60)]))
+        self.down = FakeClient('10.0.0.3', None)
+        self.scanner = DiskUsageScanner([self.a, self.b, self.down])
+
+    def test_scan(self):
+        report = self.scanner.scan()
+        self.assertEqual(list(report.errors), ['10.0.0.3'])
+        self.assertEqual(report.nodes['10.0.0.1'].as_dict()['images'], {'size': 380, 'reclaimable': 80, 'unused': 2})
+        self.assertEqual(report.nodes['10.0.0.1'].reclaimable, 80 + 5 + 25 + 7)
+        self.assertEqual(report.nodes['10.0.0.2'].reclaimable, 150 + 60)
+
+        # images are deduplicated by id across nodes
+        self.assertEqual(len(report.images), 3)
+        app = report.top_images(1)[0]
+        self.assertEqual(app.as_dict()['tags'], ['app:1', 'app:latest'])
+        self.assertEqual((sorted(app.unused_nodes), app.reclaimable), (['10.0.0.1', '10.0.0.2'], 50 + 150))
+        self.assertEqual(report.unique_images_size, 380)
+        self.assertEqual(report.unused_volumes(), [('10.0.0.2', 'orphan', 60), ('10.0.0.1', 'orphan', 25)])
+        self.assertEqual(report.summary()['reclaimable'], 327)
+
+    def test_cleanup(self):
+        report = self.scanner.scan()
+        dry = self.scanner.cleanup(report, dry_run=True)
+        self.assertEqual([(a.node, a.kind) for a in dry.done], [
+            ('10.0.0.1', 'image'), ('10.0.0.1', 'image'), ('10.0.0.1', 'volume'),
+            ('10.0.0.2', 'image'), ('10.0.0.2', 'volume')])
+        self.assertEqual(self.a.removed, [])
+
+        result = self.scanner.cleanup(report, containers=True, keep_image=lambda i: 'app:1' in i.tags)
+        self.assertTrue(result.ok)
+        self.assertEqual(sorted(self.a.removed), [('container', 'c1'), ('image', 'sha256:old'), ('volume', 'orphan')])
+        self.assertEqual(self.b.removed, [('volume', 'orphan')])
+        self.assertEqual(result.freed, {'10.0.0.1': 5 + 30 + 25, '10.0.0.2': 60})
+
+    def test_per_node_limit_and_errors(self):
+        usage = df(volumes=[volume('v%d' % i, 1) for i in range(8)] + [volume('busy', 1)])
+        clients = [FakeClient('10.0.0.%d' % i, usage, delay=0.02) for i in range(3)]
+        scanner = DiskUsageScanner(clients, per_node=2)
+        result = scanner.cleanup(scanner.scan())
+        self.assertEqual([c.max_active for c in clients], [2, 2, 2])
+        self.assertEqual(len(result.done), 24)
+        self.assertEqual(sorted(a.node for a, _ in result.errors), ['10.0.0.0', '10.0.0.1', '10.0.0.2'])
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+import unittest
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from dce.dockerutils.client import DCEDockerAPIClient
+from dce.dockerutils.events import EventWatcher
+
+
+def event(action, service_id, time_nano):
+    return json.dumps({'Type': 'service', 'Action': action, 'Actor': {'ID': service_id, 'Attributes': {}},
+                       'scope': 'swarm', 'time': time_nano // 1000000000, 'timeNano': time_nano}).encode()
+
+
+class FakeResponse(object):
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def close(self):
+        pass
+
+
+class FakeClient(object):
+    base_url = 'http://controller/dce/nodes/10.0.0.1/docker'
+    node_addr = '10.0.0.1'
+
+    def __init__(self, streams):
+        self.streams = streams
+        self.params = []
+        self.done = threading.Event()
+
+    def _url(self, path):
+        return self.base_url + path
+
+    def _get(self, url, params=None, **kwargs):
+        self.params.append(params)
+        if not self.streams:
+            self.done.set()
+            raise IOError('connection refused')
+        return FakeResponse(self.streams.pop(0))
+
+    def _raise_for_status(self, response):
+        pass
+
+
+class IdleHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.endswith('/version'):
+            data = json.dumps({'ApiVersion': '1.30'}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        # a stream without any event
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.flush()
+        self.server.streaming.set()
+        self.server.done.wait(30)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class EventWatcherTest(unittest.TestCase):
+    def test_reconnect_without_loss_or_duplicates(self):
+        client = FakeClient([
+            [event('create', 's1', 1000000000001), event('update', 's1', 2000000000002)],
+            # replayed from since=2000.000000002
+            [event('update', 's1', 2000000000002), event('update', 's2', 2000000000002),
+             event('remove', 's1', 3000000000000)],
+        ])
+        watcher = EventWatcher(client, reconnect_delay=0.01)
+        received = []
+        watcher.subscribe(lambda e: received.append((e.action, e.id)), type='service')
+        watcher.start()
+        client.done.wait(5)
+        watcher.stop()
+        self.assertEqual(received, [('create', 's1'), ('update', 's1'), ('update', 's2'), ('remove', 's1')])
+        self.assertEqual(client.params[1]['since'], '2000.000000002')
+        self.assertEqual(watcher.received, 4)
+
+    def test_filtering(self):
+        watcher = EventWatcher(FakeClient([]))
+        received = []
+        watcher.subscribe(received.append, type='service', action='remove')
+        watcher._handle(json.loads(event('update', 's1', 1)))
+        watcher._handle(json.loads(event('remove', 's1', 2)))
+        self.assertEqual([e.action for e in received], ['remove'])
+        self.assertEqual(received[0].node, '10.0.0.1')
+
+    def test_stop_on_idle_stream(self):
+        server = Server(('127.0.0.1', 0), IdleHandler)
+        server.streaming = threading.Event()
+        server.done = threading.Event()
+        threading.Thread(target=server.serve_forever).start()
+        try:
+            client = DCEDockerAPIClient('http://127.0.0.1:%d' % server.server_address[1])
+            watcher = EventWatcher(client).start()
+            self.assertTrue(server.streaming.wait(5))
+            time.sleep(0.1)
+            start = time.time()
+            watcher.stop()
+            self.assertFalse(watcher.running)
+            self.assertLess(time.time() - start, 2)
+        finally:
+            server.done.set()
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,40 @@
+import time
+import unittest
+
+from dce.dockerutils.fanout import fan_out, iter_fan_out
+from dce.errors import FanOutTimeout
+
+
+class Node(object):
+    def __init__(self, addr, delay=0, error=None):
+        self.node_addr = addr
+        self.delay = delay
+        self.error = error
+
+    def containers(self, all=False):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [self.node_addr, all]
+
+
+class FanOutTest(unittest.TestCase):
+    def test_partial_results(self):
+        nodes = [Node('a'), Node('b', error=ValueError('down')), Node('c')]
+        result = fan_out(nodes, 'containers', kwargs={'all': True})
+        self.assertEqual(result.results, {'a': ['a', True], 'c': ['c', True]})
+        self.assertIsInstance(result.errors['b'], ValueError)
+        self.assertFalse(result.ok)
+
+    def test_timeout(self):
+        nodes = [Node('fast'), Node('slow', delay=1)]
+        start = time.time()
+        result = fan_out(nodes, lambda c: c.containers(), timeout=0.1)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertIn('fast', result.results)
+        self.assertIsInstance(result.errors['slow'], FanOutTimeout)
+
+    def test_yield_as_completed(self):
+        nodes = [Node('slow', delay=0.2), Node('fast')]
+        keys = [k for k, _, _ in iter_fan_out(nodes, 'containers')]
+        self.assertEqual(keys, ['fast', 'slow'])
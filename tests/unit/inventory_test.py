@@ -0,0 +1,67 @@
+import unittest
+
+from docker.errors import NotFound
+
+from dce.dockerutils.inventory import ServiceInventory
+
+
+def service(i, tenant, version=1, system=None, port=None):
+    labels = {'io.daocloud.dce.authz.tenant': tenant, 'com.docker.stack.namespace': 'stack%d' % (i % 2)}
+    if system:
+        labels['io.daocloud.dce.system'] = system
+    return {
+        'ID': 's%d' % i,
+        'Version': {'Index': version},
+        'Spec': {'Name': 'svc%d' % i, 'Labels': labels},
+        'Endpoint': {'Ports': [{'TargetPort': 80, 'PublishedPort': port}] if port else []},
+    }
+
+
+class FakeClient(object):
+    def __init__(self, services):
+        self.services = services
+        self.listed = 0
+
+    def iter_services(self, filters=None):
+        self.listed += 1
+        return iter(self.services)
+
+    def inspect_service(self, service_id):
+        for s in self.services:
+            if s['ID'] == service_id:
+                return s
+        raise NotFound('no such service')
+
+
+class ServiceInventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient([
+            service(0, 'a', port=80),
+            service(1, 'a', system='true', port=80),
+            service(2, 'b', port=8080),
+        ])
+        self.inventory = ServiceInventory(self.client)
+        self.assertEqual(self.inventory.refresh()['added'], 3)
+
+    def ids(self, views):
+        return sorted(v.id for v in views)
+
+    def test_queries(self):
+        self.assertEqual(self.ids(self.inventory.by_tenant('a')), ['s0', 's1'])
+        self.assertEqual(self.ids(self.inventory.by_app('stack0')), ['s0', 's2'])
+        self.assertEqual(self.ids(self.inventory.query(is_system=False, port=80)), ['s0'])
+        self.assertEqual(self.inventory.query(tenant='missing'), [])
+
+    def test_incremental_refresh(self):
+        first = self.inventory.get('s0')
+        self.client.services = [service(0, 'a', port=80), service(1, 'b', version=2), service(3, 'c')]
+        stats = self.inventory.refresh()
+        self.assertEqual(stats, {'added': 1, 'updated': 1, 'removed': 1, 'unchanged': 1})
+        self.assertIs(self.inventory.get('s0'), first)
+        self.assertEqual(self.ids(self.inventory.by_tenant('b')), ['s1'])
+        self.assertEqual(self.ids(self.inventory.by_port(8080)), [])
+
+    def test_update_removed(self):
+        self.client.services = self.client.services[:2]
+        self.assertIsNone(self.inventory.update('s2'))
+        self.assertNotIn('s2', self.inventory)
@@ -0,0 +1,36 @@
+# coding=utf-8
+import json
+import unittest
+
+from dce.utils.jsonstream import iter_json_array
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    items = [
+        {'ID': 'a', 'Spec': {'Name': 'web', 'Labels': {'k': 'v]}"'}}},
+        {'ID': 'b', 'Escaped': 'quote \\" and \\\\ backslash', 'List': [1, [2, {}], 'x']},
+        {'ID': 'c', 'Unicode': u'中文'},
+        [], 42, -1.5e3, True, None, 'text',
+    ]
+
+    def test_every_chunk_size(self):
+        data = json.dumps(self.items, ensure_ascii=False).encode('utf-8')
+        for size in (1, 2, 3, 7, 64, len(data)):
+            self.assertEqual(list(iter_json_array(chunked(data, size))), self.items, size)
+
+    def test_empty(self):
+        self.assertEqual(list(iter_json_array([b' [ ] '])), [])
+
+    def test_incremental(self):
+        it = iter_json_array(iter([b'[{"a": 1},', b' {"b"']))
+        self.assertEqual(next(it), {'a': 1})
+        with self.assertRaises(ValueError):
+            next(it)
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"message": "error"}']))
@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+import unittest
+
+SCRIPT = '''
+import json, sys
+import dce
+dce.DCEAPIClient
+lazy = 'docker' not in sys.modules and 'dce.dockerutils' not in sys.modules
+from dce import DCEDockerClient
+import docker.models.services
+print(json.dumps({
+    'lazy': lazy,
+    'docker_client': DCEDockerClient.__name__,
+    'patched': docker.models.services.ServiceCollection.model.__name__,
+}))
+'''
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_dce_does_not_load_docker(self):
+        out = json.loads(subprocess.check_output([sys.executable, '-c', SCRIPT]).decode('utf-8'))
+        self.assertTrue(out['lazy'])
+        self.assertEqual(out['docker_client'], 'DCEDockerClient')
+        # DCEService is only used by DCEDockerClient unless patched in explicitly
+        self.assertEqual(out['patched'], 'Service')
+
+    def test_service_collection(self):
+        from dce.dockerutils.client import DCEService, DCEServiceCollection
+
+        self.assertIs(DCEServiceCollection.model, DCEService)
+
+    def test_unknown_attribute(self):
+        import dce
+
+        with self.assertRaises(AttributeError):
+            dce.no_such_name
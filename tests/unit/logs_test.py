@@ -0,0 +1,189 @@
+# coding=utf-8
+import json
+import struct
+import threading
+import time
+import unittest
+
+from docker.errors import NotFound
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from dce.dockerutils.client import DCEDockerAPIClient
+from dce.dockerutils.logs import LogAggregator
+from dce.utils.demux import STDERR, STDOUT
+
+
+def frame(stream, seconds, message):
+    line = '1970-01-01T00:%02d:%02d.000000001Z %s\n' % (seconds // 60, seconds % 60, message)
+    payload = line.encode('utf-8')
+    return struct.pack('>BxxxL', stream, len(payload)) + payload
+
+
+class FakeRaw(object):
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def stream(self, chunk_size, decode_content=False):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+
+class FakeResponse(object):
+    def __init__(self, raw):
+        self.raw = raw
+
+    def close(self):
+        pass
+
+
+class FakeClient(object):
+    _iter_frames = staticmethod(DCEDockerAPIClient._iter_frames)
+
+    def __init__(self, node, responses):
+        self.node_addr = node
+        self.responses = responses
+        self.calls = []
+
+    def inspect_container(self, container):
+        return {'Config': {'Tty': False}}
+
+    def _open_logs(self, container, stdout, stderr, timestamps, tail, since, follow):
+        self.calls.append({'tail': tail, 'since': since})
+        if not self.responses:
+            raise NotFound('gone')
+        return FakeResponse(self.responses.pop(0))
+
+
+class SilentHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.endswith('/version'):
+            data = json.dumps({'ApiVersion': '1.30'}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self.send_response(200)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        if self.path.split('?')[0].endswith('/loud/logs'):
+            data = frame(STDOUT, 1, 'hello')
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+        # the container stays silent
+        self.server.done.wait(30)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class LogAggregatorTest(unittest.TestCase):
+    def test_merge_in_time_order(self):
+        a = FakeClient('10.0.0.1', [FakeRaw([frame(STDOUT, 1, 'a1') + frame(STDOUT, 4, 'a4'), frame(STDERR, 5, 'a5')])])
+        b = FakeClient('10.0.0.2', [FakeRaw([frame(STDOUT, 2, 'b2'), frame(STDOUT, 3, 'b3') + frame(STDOUT, 6, 'b6')])])
+        lines = list(LogAggregator([(a, 'ca'), (b, 'cb')], follow=False))
+        self.assertEqual([line.message for line in lines], ['a1', 'b2', 'b3', 'a4', 'a5', 'b6'])
+        self.assertEqual((lines[0].node, lines[0].container, lines[4].stream), ('10.0.0.1', 'ca', STDERR))
+        self.assertEqual(lines[1].time_nano, 2000000001)
+
+    def test_reconnect_without_duplicates(self):
+        data = frame(STDOUT, 1, 'one') + frame(STDOUT, 2, 'two') + frame(STDOUT, 2, 'two bis')
+        client = FakeClient('10.0.0.1', [
+            # dropped inside the third frame
+            FakeRaw([data[:-4]], error=IOError('connection reset')),
+            # docker's since is inclusive: both lines at 00:02 are sent again
+            FakeRaw([frame(STDOUT, 2, 'two') + frame(STDOUT, 2, 'two bis') + frame(STDOUT, 3, 'three')]),
+        ])
+        aggregator = LogAggregator([(client, 'c1')], tail=10, follow=False, reconnect_delay=0.01)
+        self.assertEqual([line.message for line in aggregator], ['one', 'two', 'two bis', 'three'])
+        self.assertEqual(client.calls, [{'tail': 10, 'since': None}, {'tail': 'all', 'since': '2.000000001'}])
+        stats = aggregator.stats()
+        self.assertEqual((stats['duplicates'], stats['reconnects'], stats['emitted']), (1, 1, 4))
+
+    def test_identical_lines_are_kept(self):
+        data = frame(STDOUT, 1, 'tick') + frame(STDOUT, 1, 'tick')
+        client = FakeClient('10.0.0.1', [
+            FakeRaw([data + frame(STDOUT, 2, 'tock')[:-4]], error=IOError('connection reset')),
+            FakeRaw([data + frame(STDOUT, 1, 'tick') + frame(STDOUT, 2, 'tock')]),
+        ])
+        aggregator = LogAggregator([(client, 'c1')], follow=False, reconnect_delay=0.01)
+        self.assertEqual([line.message for line in aggregator], ['tick', 'tick', 'tick', 'tock'])
+        self.assertEqual(aggregator.stats()['duplicates'], 2)
+
+    def test_silent_stream_does_not_hold_lines_back(self):
+        silent = threading.Event()
+
+        class SilentRaw(object):
+            def stream(self, chunk_size, decode_content=False):
+                silent.wait(5)
+                return iter(())
+
+        a = FakeClient('10.0.0.1', [FakeRaw([frame(STDOUT, 1, 'a1')])])
+        b = FakeClient('10.0.0.2', [SilentRaw()])
+        lines = LogAggregator([(a, 'ca'), (b, 'cb')], reorder_window=0.05).lines()
+        start = time.time()
+        self.assertEqual(next(lines).message, 'a1')
+        self.assertLess(time.time() - start, 2)
+        silent.set()
+        lines.close()
+
+    def test_backpressure(self):
+        chunks = [frame(STDOUT, i, 'line %d' % i) for i in range(1000)]
+        aggregator = LogAggregator([(FakeClient('10.0.0.1', [FakeRaw(chunks)]), 'c1')], buffer_lines=10)
+        lines = aggregator.lines()
+        next(lines)
+        time.sleep(0.2)
+        # the reader blocks on the full queue instead of reading everything
+        self.assertLess(aggregator.stats()['received'], 30)
+        lines.close()
+        self.assertEqual(aggregator.stats()['running'], 0)
+
+    def test_break_out_of_silent_streams(self):
+        server = Server(('127.0.0.1', 0), SilentHandler)
+        server.done = threading.Event()
+        threading.Thread(target=server.serve_forever).start()
+        try:
+            client = DCEDockerAPIClient('http://127.0.0.1:%d' % server.server_address[1])
+            aggregator = LogAggregator([(client, 'loud', False), (client, 'quiet', False)], reorder_window=0.05)
+            for line in aggregator:
+                self.assertEqual(line.message, 'hello')
+                start = time.time()
+                # closing the generator stops the aggregator
+                break
+            self.assertEqual(aggregator.stats()['running'], 0)
+            self.assertLess(time.time() - start, 2)
+        finally:
+            server.done.set()
+            server.shutdown()
+            server.server_close()
+
+    def test_follow_opens_every_stream(self):
+        done = threading.Event()
+
+        class FollowedRaw(FakeRaw):
+            def stream(self, chunk_size, decode_content=False):
+                for chunk in self.chunks:
+                    yield chunk
+                # followed streams stay open
+                done.wait(5)
+
+        clients = [FakeClient('10.0.0.%d' % i, [FollowedRaw([frame(STDOUT, i, 'line %d' % i)])]) for i in range(5)]
+        self.assertRaises(ValueError, LogAggregator, [(c, 'c') for c in clients], max_streams=2)
+        lines = LogAggregator([(c, 'c') for c in clients], max_streams=5).lines()
+        start = time.time()
+        try:
+            self.assertEqual([next(lines).message for _ in range(5)], ['line %d' % i for i in range(5)])
+            self.assertLess(time.time() - start, 2)
+        finally:
+            done.set()
+            lines.close()
@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+
+from dce.utils import memoize, memoize_with_expire
+from dce.utils.memo import MemoCache
+
+
+class MemoTest(unittest.TestCase):
+    def test_key_binding(self):
+        calls = []
+
+        @memoize
+        def f(a, b=2):
+            calls.append((a, b))
+            return a + b
+
+        self.assertEqual(f(1), 3)
+        self.assertEqual(f(a=1), 3)
+        self.assertEqual(f(1, b=2), 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(f.cache.stats()['hits'], 2)
+
+    def test_per_entry_expire(self):
+        calls = []
+
+        @memoize_with_expire(0.1)
+        def f(a):
+            calls.append(a)
+            return a
+
+        f(1)
+        time.sleep(0.06)
+        f(2)
+        time.sleep(0.06)
+        f(1)
+        f(2)
+        # only the entry of 1 expired
+        self.assertEqual(calls, [1, 2, 1])
+
+    def test_identity_keys(self):
+        class Client(object):
+            def __str__(self):
+                return 'same'
+
+        @memoize
+        def f(client):
+            return object()
+
+        a, b = Client(), Client()
+        self.assertIsNot(f(a), f(b))
+        self.assertIs(f(a), f(a))
+
+    def test_unhashable_keys(self):
+        @memoize
+        def f(filters):
+            return dict(filters)
+
+        filters = {'name': 'a'}
+        self.assertIs(f(filters), f(filters))
+        self.assertIsNot(f(filters), f({'name': 'a'}))
+        # the entry keeps its argument alive, a new dict can not take its id
+        for _ in range(100):
+            self.assertEqual(f({'name': 'b'}), {'name': 'b'})
+
+    def test_lru_bound(self):
+        cache = MemoCache(maxsize=2)
+        for k in 'abc':
+            cache.get_or_compute(k, lambda: k)
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_single_flight(self):
+        calls = []
+
+        @memoize
+        def f(a):
+            time.sleep(0.05)
+            calls.append(a)
+            return a
+
+        threads = [threading.Thread(target=f, args=(1,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(calls, [1])
@@ -0,0 +1,40 @@
+import threading
+import time
+import unittest
+
+from dce.api.metadata import MetadataCache
+
+
+class MetadataCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def load():
+            time.sleep(0.05)
+            self.calls.append(1)
+            return len(self.calls)
+
+        self.cache = MetadataCache({'info': load}, ttls={'info': 0.1})
+
+    def test_single_flight(self):
+        threads = [threading.Thread(target=self.cache.get, args=('info',)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.cache.stats()['info']['misses'], 8)
+
+    def test_stale_while_revalidate(self):
+        self.assertEqual(self.cache.get('info'), 1)
+        time.sleep(0.15)
+        self.assertEqual(self.cache.get('info'), 1)
+        time.sleep(0.1)
+        self.assertEqual(self.cache.get('info'), 2)
+        self.assertEqual(self.cache.stats()['info']['stale_hits'], 1)
+
+    def test_invalidate(self):
+        self.cache.put('info', 'seeded')
+        self.assertEqual(self.cache.get('info'), 'seeded')
+        self.cache.invalidate('info')
+        self.assertEqual(self.cache.get('info'), 1)
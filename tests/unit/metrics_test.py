@@ -0,0 +1,88 @@
+import threading
+import unittest
+
+import requests
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from dce.transport import Instrumentation, PooledHTTPAdapter, endpoint_template
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{}' if self.path.endswith('/info') else b'{"message": "no such service"}'
+        self.send_response(200 if self.path.endswith('/info') else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class EndpointTemplateTest(unittest.TestCase):
+    def test_templates(self):
+        self.assertEqual(endpoint_template('/dce/info'), '/{@}/info')
+        self.assertEqual(endpoint_template('/api/version'), '/{@}/version')
+        self.assertEqual(endpoint_template('/dce/nodes/10.0.0.1/docker/services/abc/update'),
+                         '/{@}/nodes/{node}/docker/services/{id}/update')
+        self.assertEqual(endpoint_template('/v1.30/containers/json'), '/v1.30/containers/json')
+        self.assertEqual(endpoint_template('/v1.30/containers/abc/json'), '/v1.30/containers/{id}/json')
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_disabled_records_nothing(self):
+        metrics = Instrumentation()
+        session = requests.Session()
+        session.mount('http://', PooledHTTPAdapter(instrumentation=metrics))
+        session.get(self.base + '/dce/info')
+        self.assertEqual(metrics.snapshot()['endpoints'], {})
+
+    def test_records_per_endpoint(self):
+        from dce.dockerutils.client import create_api_error_from_http_exception
+        from docker.errors import NotFound
+
+        metrics = Instrumentation(enabled=True)
+        samples = []
+        metrics.add_sink(samples.append)
+        session = requests.Session()
+        session.mount('http://', PooledHTTPAdapter(instrumentation=metrics))
+        for _ in range(3):
+            session.get(self.base + '/dce/info')
+        response = session.get(self.base + '/dce/nodes/n1/docker/services/abc')
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            with self.assertRaises(NotFound) as ctx:
+                create_api_error_from_http_exception(e)
+            metrics.record_error(response, ctx.exception)
+
+        endpoints = metrics.snapshot()['endpoints']
+        info = endpoints['GET /{@}/info']
+        self.assertEqual(info['requests'], 3)
+        self.assertEqual(info['statuses'], {200: 3})
+        self.assertEqual(info['connections'], {'new': 1, 'reused': 2})
+        self.assertEqual(info['latency']['count'], 3)
+        self.assertEqual(info['bytes']['sum'], 6)
+        service = endpoints['GET /{@}/nodes/{node}/docker/services/{id}']
+        self.assertEqual(service['statuses'], {404: 1})
+        self.assertEqual(service['errors'], {'NotFound': 1})
+        self.assertEqual(len(samples), 5)
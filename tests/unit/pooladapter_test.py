@@ -0,0 +1,63 @@
+import json
+import threading
+import unittest
+
+from docker.tls import TLSConfig
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from dce.dockerutils.client import DCEDockerAPIClient
+from dce.transport import BreakerRegistry, PooledHTTPAdapter
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = {'ApiVersion': '1.30'} if self.path.endswith('/version') else {'Name': 'node'}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class PooledHTTPAdapterTest(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever).start()
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self):
+        client = DCEDockerAPIClient(self.base, breakers=BreakerRegistry())
+        for _ in range(5):
+            client.info()
+        stats = client.pool_stats()['http://127.0.0.1:%d' % self.server.server_address[1]]
+        # /version at construction and 5 calls over one connection
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(stats['requests'], 6)
+        self.assertEqual(stats['reused'], 5)
+        self.assertEqual(stats['idle'], 1)
+
+    def test_tls_options_on_the_pooled_adapter(self):
+        tls = TLSConfig(assert_hostname=False, assert_fingerprint='00:11')
+        client = DCEDockerAPIClient(self.base, tls=tls, breakers=BreakerRegistry())
+        adapter = client.get_adapter('https://10.0.0.1:2376')
+        self.assertIsInstance(adapter, PooledHTTPAdapter)
+        self.assertIs(adapter, client.get_adapter(self.base))
+        pool = adapter.poolmanager.connection_from_url('https://10.0.0.1:2376')
+        self.assertIs(pool.assert_hostname, False)
+        self.assertEqual(pool.assert_fingerprint, '00:11')
+        self.assertFalse(client.verify)
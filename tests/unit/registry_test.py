@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+
+from dce.dockerutils.registry import ClientRegistry
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ClientRegistryTest(unittest.TestCase):
+    def test_hit_and_miss(self):
+        registry = ClientRegistry(maxsize=4)
+        c1 = registry.get_or_create('a', FakeClient)
+        c2 = registry.get_or_create('a', FakeClient)
+        self.assertIs(c1, c2)
+        stats = registry.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_lru_eviction_closes_client(self):
+        registry = ClientRegistry(maxsize=2)
+        a = registry.get_or_create('a', FakeClient)
+        b = registry.get_or_create('b', FakeClient)
+        registry.get_or_create('a', FakeClient)
+        registry.get_or_create('c', FakeClient)
+        self.assertIn('a', registry)
+        self.assertNotIn('b', registry)
+        self.assertFalse(a.closed)
+        self.assertTrue(b.closed)
+        self.assertEqual(registry.stats()['evictions'], 1)
+
+    def test_idle_timeout(self):
+        registry = ClientRegistry(maxsize=2, idle_timeout=0.01)
+        a = registry.get_or_create('a', FakeClient)
+        time.sleep(0.02)
+        registry.get_or_create('b', FakeClient)
+        self.assertNotIn('a', registry)
+        self.assertTrue(a.closed)
+
+    def test_concurrent_build_once(self):
+        registry = ClientRegistry()
+        built = []
+
+        def factory():
+            time.sleep(0.05)
+            built.append(1)
+            return FakeClient()
+
+        threads = [threading.Thread(target=registry.get_or_create, args=('k', factory)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(built), 1)
@@ -0,0 +1,101 @@
+import socket
+import threading
+import time
+import unittest
+
+import requests
+
+from dce.errors import CircuitOpenError
+from dce.transport import BreakerRegistry, CircuitBreaker, PooledHTTPAdapter, RetryPolicy
+from dce.transport.resilience import CLOSED, HALF_OPEN, OPEN, breaker_key
+
+
+def unused_port():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_open_half_open_close(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        # only one trial call
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_breaker_key(self):
+        self.assertEqual(breaker_key('http://c:80/dce/nodes/10.0.0.1/docker/containers/json'), 'nodes/10.0.0.1')
+        self.assertEqual(breaker_key('http://c2:80/api/nodes/10.0.0.1/docker/info'), 'nodes/10.0.0.1')
+        self.assertEqual(breaker_key('http://c:80/dce/info'), 'c:80')
+
+
+class AdapterTest(unittest.TestCase):
+    def test_retry_then_fail_fast(self):
+        breakers = BreakerRegistry(failure_threshold=3, recovery_timeout=60)
+        session = requests.Session()
+        session.mount('http://', PooledHTTPAdapter(retry=RetryPolicy(total=2, backoff_factor=0.001),
+                                                   breakers=breakers, connect_timeout=1))
+        url = 'http://127.0.0.1:%d/dce/nodes/n1/docker/info' % unused_port()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            session.get(url, timeout=1)
+        # 1 try + 2 retries opened the breaker
+        self.assertEqual(list(breakers.states().values()), [OPEN])
+        with self.assertRaises(CircuitOpenError):
+            session.get(url, timeout=1)
+
+    def test_read_timeout_not_retried(self):
+        # a node hanging behind a live controller: connections are accepted, never answered
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(8)
+        accepted = []
+
+        def accept():
+            while True:
+                try:
+                    accepted.append(listener.accept()[0])
+                except socket.error:
+                    return
+
+        thread = threading.Thread(target=accept)
+        thread.daemon = True
+        thread.start()
+        session = requests.Session()
+        session.mount('http://', PooledHTTPAdapter(retry=RetryPolicy(total=2, backoff_factor=0.001),
+                                                   breakers=BreakerRegistry(), connect_timeout=1))
+        url = 'http://127.0.0.1:%d/dce/nodes/n1/docker/info' % listener.getsockname()[1]
+        try:
+            start = time.time()
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                session.get(url, timeout=0.2)
+            self.assertLess(time.time() - start, 0.5)
+            self.assertEqual(len(accepted), 1)
+
+            session.mount('http://', PooledHTTPAdapter(retry=RetryPolicy(total=2, backoff_factor=0.001,
+                                                                         read_timeouts=True)))
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                session.get(url, timeout=0.2)
+            self.assertEqual(len(accepted), 4)
+        finally:
+            listener.close()
+            for s in accepted:
+                s.close()
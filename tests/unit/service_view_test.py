@@ -0,0 +1,41 @@
+import unittest
+
+from dce.models import ServiceView
+
+ATTRS = {
+    'ID': 'abc',
+    'Version': {'Index': 7},
+    'Spec': {'Name': 'web', 'Labels': {'io.daocloud.dce.authz.tenant': 't1',
+                                       'com.docker.stack.namespace': 'stack'}},
+    'Endpoint': {'Ports': [{'TargetPort': 80, 'PublishedPort': 8080}, {'TargetPort': 53}]},
+}
+
+
+class FakeClient(object):
+    def inspect_service(self, service_id):
+        return dict(ATTRS, Loaded=True)
+
+
+class ServiceViewTest(unittest.TestCase):
+    def test_projection(self):
+        view = ServiceView(ATTRS)
+        self.assertEqual(view.id, 'abc')
+        self.assertEqual(view.version, 7)
+        self.assertEqual(view.tenant, 't1')
+        self.assertEqual(view.app_name, 'stack')
+        self.assertIsNone(view.owner)
+        self.assertEqual(view.published_ports, (8080,))
+
+    def test_unprojected_field(self):
+        view = ServiceView(ATTRS, fields=('name',))
+        self.assertEqual(view.id, 'abc')
+        with self.assertRaises(AttributeError):
+            view.tenant
+
+    def test_read_only(self):
+        with self.assertRaises(AttributeError):
+            ServiceView(ATTRS).name = 'x'
+
+    def test_lazy_attrs(self):
+        self.assertTrue(ServiceView(ATTRS, client=FakeClient()).attrs['Loaded'])
+        self.assertIs(ServiceView(ATTRS, keep_attrs=True).attrs, ATTRS)
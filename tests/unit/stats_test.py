@@ -0,0 +1,135 @@
+# coding=utf-8
+import unittest
+
+from dce.dockerutils import stats
+from dce.dockerutils.stats import FIELDS, StatsRing, StatsSampler, extract_counters, percentiles
+
+
+def sample(second, cpu, system, rx=0, memory=100, pids=3):
+    return {
+        'read': '2018-01-01T00:00:%02d.000000000Z' % second,
+        'cpu_stats': {'cpu_usage': {'total_usage': cpu, 'percpu_usage': [0, 0]}, 'system_cpu_usage': system},
+        'memory_stats': {'usage': memory, 'limit': 1000, 'stats': {'cache': 20}},
+        'networks': {'eth0': {'rx_bytes': rx, 'tx_bytes': 1}, 'eth1': {'rx_bytes': rx, 'tx_bytes': 1}},
+        'blkio_stats': {'io_service_bytes_recursive': [{'op': 'Read', 'value': 7}, {'op': 'Write', 'value': 9}]},
+        'pids_stats': {'current': pids},
+    }
+
+
+class FakeResponse(object):
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeClient(object):
+    def __init__(self, node, containers):
+        self.node_addr = node
+        self.containers_stats = containers
+
+    def containers(self, quiet=False, filters=None):
+        return [{'Id': c} for c in sorted(self.containers_stats)]
+
+    def _url(self, path, container):
+        return path.format(container)
+
+    def _get(self, url, params=None):
+        return FakeResponse(self.containers_stats[url.split('/')[2]].pop(0))
+
+    def _raise_for_status(self, response):
+        pass
+
+
+class StatsRingTest(unittest.TestCase):
+    def test_extract_counters(self):
+        values = dict(zip(FIELDS, extract_counters(sample(1, 10, 100, rx=5))))
+        self.assertEqual((values['online_cpus'], values['rx_bytes'], values['tx_bytes']), (2, 10, 2))
+        self.assertEqual((values['blkio_read'], values['blkio_write'], values['memory_cache']), (7, 9, 20))
+        self.assertIsNone(extract_counters({'read': '0001-01-01T00:00:00Z'}))
+
+    def test_wraps_with_fixed_memory(self):
+        ring = StatsRing(capacity=4)
+        nbytes = ring.nbytes
+        for i in range(6):
+            ring.append(extract_counters(sample(i, i * 10, i * 100, rx=i * 50)))
+        self.assertEqual(ring.nbytes, nbytes)
+        self.assertEqual(list(ring.column('time')), [1514764802.0, 1514764803.0, 1514764804.0, 1514764805.0])
+        self.assertEqual(list(ring.column('cpu_total', window=2)), [40, 50])
+        self.assertEqual(list(ring.rate('rx_bytes')), [100.0] * 3)
+        self.assertEqual(list(ring.cpu_percent()), [20.0] * 3)
+        self.assertEqual(list(ring.series('memory_percent', window=1)), [8.0])
+
+    def test_counter_reset_is_dropped(self):
+        ring = StatsRing(capacity=8)
+        for i, rx in enumerate((100, 200, 10, 110)):
+            ring.append(extract_counters(sample(i, 0, i, rx=rx)))
+        self.assertEqual(list(ring.series('rx_rate')), [200.0, 200.0])
+
+    def test_copy(self):
+        ring = StatsRing(capacity=4)
+        for i in range(6):
+            ring.append(extract_counters(sample(i, i * 10, i * 100)))
+        full, last = ring.copy(), ring.copy(window=3)
+        ring.append(extract_counters(sample(6, 60, 600)))
+        self.assertEqual(list(full.column('cpu_total')), [20, 30, 40, 50])
+        self.assertEqual(list(last.column('cpu_total')), [30, 40, 50])
+        self.assertEqual(list(last.cpu_percent()), list(ring.copy(window=4).cpu_percent(window=3))[:2])
+
+    def test_percentiles(self):
+        self.assertEqual(percentiles([1, 2, 3, 4, 5], [0, 50, 100]), [1, 3, 5])
+        self.assertEqual(percentiles([1, 2], 50), 1.5)
+
+
+class StatsSamplerTest(unittest.TestCase):
+    def test_sample_and_query(self):
+        a = FakeClient('10.0.0.1', {'c1': [sample(1, 0, 0), sample(2, 50, 100), sample(3, 100, 200)],
+                                    'c2': [sample(1, 0, 0), sample(2, 10, 100), sample(3, 20, 200)]})
+        sampler = StatsSampler([a], capacity=8)
+        for _ in range(3):
+            sampler.sample()
+        self.assertEqual(sampler.keys(), [('10.0.0.1', 'c1'), ('10.0.0.1', 'c2')])
+        self.assertEqual(sampler.top('cpu_percent', 1), [(('10.0.0.1', 'c1'), 100.0)])
+        self.assertEqual(sampler.percentiles('cpu_percent', q=[50])[('10.0.0.1', 'c2')], [20.0])
+
+        # containers gone from a sweep are dropped
+        del a.containers_stats['c1']
+        a.containers_stats['c2'].append(sample(4, 30, 300))
+        sampler.sample()
+        self.assertEqual(sampler.keys(), [('10.0.0.1', 'c2')])
+        self.assertEqual(sampler.stats()['bytes'], 8 * len(FIELDS) * 8)
+
+
+@unittest.skipIf(stats.np is None, 'numpy is not installed, covered by StatsRingTest')
+class PurePythonStatsRingTest(StatsRingTest):
+    def setUp(self):
+        self.np, stats.np = stats.np, None
+
+    def tearDown(self):
+        stats.np = self.np
+
+    def test_same_as_numpy(self):
+        ring = StatsRing(capacity=16)
+        for i in range(20):
+            ring.append(extract_counters(sample(i, i * i * 7, i * 100, rx=(i % 7) * 300, memory=100 + i * 13)))
+        for metric in list(stats.METRICS) + ['pids']:
+            for window in (None, 5):
+                expected = [float(v) for v in self.np_series(ring, metric, window)]
+                self.assertEqual(list(ring.series(metric, window)), expected, (metric, window))
+                self.assertAlmostEqual(percentiles(ring.series(metric, window), 90),
+                                       self.np_percentile(expected, 90), (metric, window))
+
+    def np_series(self, ring, metric, window):
+        stats.np = self.np
+        try:
+            return ring.series(metric, window)
+        finally:
+            stats.np = None
+
+    def np_percentile(self, values, q):
+        stats.np = self.np
+        try:
+            return percentiles(values, q)
+        finally:
+            stats.np = None
@@ -0,0 +1,34 @@
+import calendar
+import datetime
+import unittest
+
+from dce.dockerutils.timestamps import parse_docker_timestamp, parse_docker_timestamps
+
+
+class TimestampsTest(unittest.TestCase):
+    def test_utc(self):
+        expected = calendar.timegm(datetime.datetime(2017, 11, 8, 9, 30, 52).timetuple())
+        self.assertAlmostEqual(parse_docker_timestamp('2017-11-08T09:30:52.5Z'), expected + 0.5)
+        self.assertEqual(parse_docker_timestamp('2017-11-08T09:30:52Z'), expected)
+
+    def test_offset(self):
+        self.assertEqual(parse_docker_timestamp('2017-11-08T17:30:52+08:00'),
+                         parse_docker_timestamp('2017-11-08T09:30:52Z'))
+        self.assertEqual(parse_docker_timestamp('2017-11-08T04:30:52-05:00'),
+                         parse_docker_timestamp('2017-11-08T09:30:52Z'))
+
+    def test_nanoseconds(self):
+        ns = parse_docker_timestamp('2017-11-08T09:30:52.123456789Z', nanoseconds=True)
+        self.assertEqual(ns % 1000000000, 123456789)
+        self.assertEqual(parse_docker_timestamp('2017-11-08T09:30:52.1Z', nanoseconds=True) % 1000000000, 100000000)
+
+    def test_batch(self):
+        values = ['2017-11-08T09:30:52.1Z', None, '2017-11-08T09:30:53.1Z']
+        result = parse_docker_timestamps(values, as_array=True)
+        self.assertEqual(result.typecode, 'd')
+        self.assertEqual(result[1], 0)
+        self.assertAlmostEqual(result[2] - result[0], 1.0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_docker_timestamp('yesterday')
@@ -0,0 +1,129 @@
+import unittest
+
+from dce.dockerutils import tools
+from dce.dockerutils.registry import ClientRegistry
+from dce.dockerutils.topology import ClusterTopology, advertised_address, parse_dce_ports
+from dce.errors import NoControllerError
+
+
+def node(i, role='worker', state='ready'):
+    return {
+        'ID': 'n%d' % i,
+        'Spec': {'Role': role},
+        'Status': {'State': state, 'Addr': '10.0.0.%d' % i},
+        'ManagerStatus': {'Addr': '10.0.0.%d:2377' % i} if role == 'manager' else None,
+    }
+
+
+DCE_BASE = {'Spec': {'TaskTemplate': {'ContainerSpec': {'Env': [
+    'SWARM_PORT=2376', 'CONTROLLER_PORT=80', 'CONTROLLER_SSL_PORT=443']}}}}
+
+
+class FakeDocker(object):
+    def __init__(self, nodes):
+        self.node_list = nodes
+        self.inspected = 0
+
+    def nodes(self):
+        return self.node_list
+
+    def info(self):
+        return {'Swarm': {'NodeAddr': '10.0.0.1'}}
+
+    def inspect_service(self, name):
+        self.inspected += 1
+        return DCE_BASE
+
+
+class FakeNodeClient(object):
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Topology(ClusterTopology):
+    def node_url(self, addr):
+        return 'http://%s:%s/dce/nodes/%s/docker' % (self.controllers[0], self.ports[1], addr)
+
+
+class ClusterTopologyTest(unittest.TestCase):
+    def test_membership_diff(self):
+        docker = FakeDocker([node(1, 'manager'), node(2), node(3)])
+        topology = Topology(docker, client_factory=FakeNodeClient)
+        self.assertEqual(topology.refresh(), {'joined': ['10.0.0.1', '10.0.0.2', '10.0.0.3'], 'left': []})
+        self.assertEqual(topology.controller_url(), 'http://10.0.0.1:80')
+        kept, departed = topology.node_client('10.0.0.1'), topology.node_client('10.0.0.3')
+
+        docker.node_list = [node(1, 'manager'), node(2), node(3, state='down'), node(4)]
+        self.assertEqual(topology.refresh(), {'joined': ['10.0.0.4'], 'left': ['10.0.0.3']})
+        self.assertIs(topology.node_client('10.0.0.1'), kept)
+        self.assertTrue(departed.closed)
+        self.assertEqual([c.base_url.split('/')[-2] for c in topology.node_clients()],
+                         ['10.0.0.1', '10.0.0.2', '10.0.0.4'])
+        # ports are only re-detected when the controllers change
+        self.assertEqual(docker.inspected, 1)
+
+    def test_failed_client_is_retried(self):
+        attempts = []
+
+        def flaky(base_url, **kwargs):
+            attempts.append(base_url)
+            if len(attempts) == 1:
+                raise IOError('connection refused')
+            return FakeNodeClient(base_url)
+
+        topology = Topology(FakeDocker([node(1, 'manager')]), client_factory=flaky)
+        self.assertEqual(topology.refresh(), {'joined': [], 'left': []})
+        self.assertEqual(topology.refresh(), {'joined': ['10.0.0.1'], 'left': []})
+
+    def test_helpers(self):
+        self.assertEqual(parse_dce_ports(DCE_BASE), (2376, 80, 443))
+        manager = node(5, 'manager')
+        manager['Status']['Addr'] = '0.0.0.0'
+        self.assertEqual(advertised_address(manager), '10.0.0.5')
+
+    def test_managers_without_address(self):
+        manager = node(2, 'manager')
+        manager['Status']['Addr'] = '0.0.0.0'
+        manager['ManagerStatus'] = None
+        topology = Topology(FakeDocker([node(1, 'manager'), manager]), client_factory=FakeNodeClient)
+        topology.refresh()
+        self.assertEqual(topology.controllers, ['10.0.0.1'])
+
+        topology = Topology(FakeDocker([manager]), client_factory=FakeNodeClient)
+        topology.refresh()
+        self.assertEqual(topology.controllers, [])
+        self.assertRaises(NoControllerError, topology.controller_url)
+
+
+class StartedTopology(object):
+    def __init__(self, client, **kwargs):
+        self.client = client
+        self.stopped = False
+
+    def start(self):
+        return self
+
+    def close(self):
+        self.stopped = True
+
+
+class GetClusterTopologyTest(unittest.TestCase):
+    def setUp(self):
+        self.topologies, self.topology_class = tools.TOPOLOGIES, tools.ClusterTopology
+        tools.TOPOLOGIES, tools.ClusterTopology = ClientRegistry(maxsize=1), StartedTopology
+
+    def tearDown(self):
+        tools.TOPOLOGIES, tools.ClusterTopology = self.topologies, self.topology_class
+
+    def test_evicted_topology_is_stopped(self):
+        a = FakeNodeClient('http://10.0.0.1:2375')
+        first = tools.get_cluster_topology(token='t', client=a)
+        self.assertIs(tools.get_cluster_topology(token='t', client=FakeNodeClient(a.base_url)), first)
+        other = tools.get_cluster_topology(token='u', client=a)
+        self.assertIsNot(other, first)
+        self.assertTrue(first.stopped)
+        self.assertFalse(other.stopped)